@@ -9,5 +9,6 @@ from catkin_pkg.python_setup import generate_distutils_setup
 setup_kwargs = generate_distutils_setup()
 setup_kwargs['packages'] = ['zyxel_gs1200_api']
 setup_kwargs['package_dir'] = {'': 'src'}
+setup_kwargs['entry_points'] = {'console_scripts': ['zyxel-stats = zyxel_gs1200_api.cli:main']}
 
 setup(**setup_kwargs)
@@ -3,9 +3,10 @@
 
 """High-level API for collecting information about the Zyxel switch using a low-level backend."""
 
+import time
+
 from .backend import Backend
-from .test_backend import TestBackend
-from .web_backend import WebBackend
+from .counters import CounterEngine
 
 __all__ = ['ZyxelAPI']
 
@@ -13,23 +14,54 @@ __all__ = ['ZyxelAPI']
 class ZyxelAPI:
     """High-level API for collecting information about the Zyxel switch using a low-level backend."""
 
-    def __init__(self, address_or_backend, password=""):
+    def __init__(self, address_or_backend, password="", counter_engine=None, push_updates=False, **kwargs):
         """
-        :param address_or_backend: Address of the web/serial interface of the switch, word "test", or a backend instance
+        :param address_or_backend: Address of the web/serial interface of the switch, `shm://<name>` of a snapshot
+                                   published by another process, word "test", or a backend instance
         :type address_or_backend: str or Backend
         :param str password: Password or another parameter required by the autodetected backend.
+        :param CounterEngine counter_engine: The engine extending packet counters and computing traffic rates. If None,
+                                             an engine with default settings is created.
+        :param bool push_updates: If True and the address is a web interface, use
+                                  :class:`~zyxel_gs1200_api.websocket_backend.WebSocketBackend` receiving the port
+                                  states pushed by switches with the `websock` capability (and polling the others).
+        :param kwargs: Further arguments of the autodetected backend (e.g. `session_store` or `response_ttl` of
+                       :class:`WebBackend` or `baudrate` of :class:`~zyxel_gs1200_api.serial_backend.SerialBackend`).
         """
-        if address_or_backend.startswith('http'):
-            self._backend = WebBackend(address_or_backend, password)
+        self.counter_engine = counter_engine if counter_engine is not None else CounterEngine()
+        """The engine extending packet counters to 64 bits and computing traffic rates."""
+        if isinstance(address_or_backend, Backend):
+            self._backend = address_or_backend
+        # The backends are imported only when needed, the web backend pulls in the slow to import requests library
+        elif address_or_backend.startswith('http') and push_updates:
+            from .websocket_backend import WebSocketBackend
+            self._backend = WebSocketBackend(address_or_backend, password, **kwargs)
+        elif address_or_backend.startswith('http'):
+            from .web_backend import WebBackend
+            self._backend = WebBackend(address_or_backend, password, **kwargs)
         elif address_or_backend == "test":
+            from .test_backend import TestBackend
             self._backend = TestBackend()
-        elif address_or_backend.startswith("/dev/tty") or address_or_backend.startswith("file:///dev/tty"):
-            raise NotImplementedError("Serial console backend is not yet implemented")
-        elif isinstance(address_or_backend, Backend):
-            self._backend = address_or_backend
+        elif address_or_backend.startswith("/dev/") or address_or_backend.startswith("file:///dev/"):
+            from .serial_backend import SerialBackend
+            kwargs.pop("session_store", None)  # the console has no sessions to store
+            kwargs.pop("response_ttl", None)  # all commands of a call are sent in one round trip anyway
+            self._backend = SerialBackend(address_or_backend, password, **kwargs)
+        elif address_or_backend.startswith("shm://"):
+            from .snapshot_backend import SnapshotBackend
+            # Another process polls the switch, so only the arguments of the reader apply
+            self._backend = SnapshotBackend(address_or_backend, kwargs.get("max_age", 60.0),
+                                            kwargs.get("instrumentation"))
         else:
             raise NotImplementedError("Unknown address. To type the Web GUI address, start with http://")
 
+    @property
+    def backend(self):
+        """The low-level backend used by this API.
+        :rtype: Backend
+        """
+        return self._backend
+
     def get_switch(self):
         """Connect to the switch and read its static or semi-static configuration. The status fields will not be filled.
         :return: The populated switch instance.
@@ -49,11 +81,60 @@ class ZyxelAPI:
 
     def update_port_states(self, switch):
         """Update dynamic status of the switch. Should be called periodically.
+
+        The packet counters are extended to monotonic 64-bit values and :attr:`PortStatus.rates` are recomputed by
+        :attr:`counter_engine`.
+
         :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`. This instance
                               will be updated.
         :raises: RuntimeError
         """
         self._backend.update_port_states(switch)
+        self.counter_engine.update(switch)
+
+    def update_scheduled(self, switch, scheduler, extra_sources=()):
+        """Update the data sources of the switch whose poll is due according to the scheduler.
+
+        Should be called often enough (e.g. at :meth:`PollScheduler.next_time`). The scheduler adapts the poll
+        interval of each source based on whether its data changed. Counters count as changed only if the traffic rates
+        changed (see :meth:`PollScheduler.rates_changed`).
+
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`. This instance
+                              will be updated.
+        :param PollScheduler scheduler: The scheduler of this switch.
+        :param extra_sources: Sources to poll even if they are not due.
+        :type extra_sources: iterable of str
+        :return: Tuple (polled sources, changed sources).
+        :rtype: tuple
+        :raises: RuntimeError
+        """
+        now = time.time()
+        sources = set(scheduler.due(now)) | set(extra_sources)
+        if len(sources) == 0:
+            return set(), set()
+        changed = self._backend.update_sources(switch, sources)
+        if "counters" in sources:
+            self.counter_engine.update(switch)
+            window = min(self.counter_engine.windows)
+            rates = [(r[window].rx_pps + r[window].tx_pps, r[window].rx_bps + r[window].tx_bps)
+                     for r in switch.port_table.rates]
+            changed.discard("counters")
+            if scheduler.rates_changed(rates):
+                changed.add("counters")
+        for source in sources:
+            scheduler.record(source, source in changed, now)
+        return sources, changed
+
+    def update_mac_table(self, switch):
+        """Update the MAC address forwarding table of the switch. Only the entries that changed since the previous call
+        are touched, so it is cheap to call this periodically even for large tables.
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`. Its
+                              :attr:`~Switch.mac_table` will be created or updated.
+        :return: The changes of the table since the previous update.
+        :rtype: MacTableDiff
+        :raises: RuntimeError
+        """
+        return self._backend.update_mac_table(switch)
 
     def __enter__(self):
         self._backend.login()
@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Asyncio variant of the high-level API for collecting information about the Zyxel switch."""
+
+from .async_web_backend import AsyncWebBackend
+from .counters import CounterEngine
+
+__all__ = ['AsyncZyxelAPI']
+
+
+class AsyncZyxelAPI:
+    """Asyncio variant of :class:`~zyxel_gs1200_api.api.ZyxelAPI`.
+
+    Use it as an async context manager::
+
+        async with AsyncZyxelAPI("http://192.168.1.3", "password") as api:
+            switch = await api.get_switch()
+            await api.update_port_states(switch)
+
+    Every method can be cancelled or wrapped in :func:`asyncio.wait_for` to limit its total duration.
+    """
+
+    def __init__(self, address_or_backend, password="", request_timeout=10.0, counter_engine=None):
+        """
+        :param address_or_backend: Address of the web interface of the switch or a backend instance
+        :type address_or_backend: str or AsyncWebBackend
+        :param str password: Password for the web interface.
+        :param float request_timeout: Timeout of a single request to the switch (in seconds).
+        :param CounterEngine counter_engine: The engine extending packet counters and computing traffic rates. If None,
+                                             an engine with default settings is created.
+        """
+        self.counter_engine = counter_engine if counter_engine is not None else CounterEngine()
+        """The engine extending packet counters to 64 bits and computing traffic rates."""
+        if isinstance(address_or_backend, AsyncWebBackend):
+            self._backend = address_or_backend
+        elif address_or_backend.startswith('http'):
+            self._backend = AsyncWebBackend(address_or_backend, password, request_timeout=request_timeout)
+        else:
+            raise NotImplementedError("Unknown address. To type the Web GUI address, start with http://")
+
+    async def get_switch(self):
+        """Connect to the switch and read its static or semi-static configuration. The status fields will not be filled.
+        :return: The populated switch instance.
+        :rtype: Switch
+        :raises: RuntimeError
+        """
+        return await self._backend.get_switch()
+
+    async def update_switch_config(self, switch):
+        """Update semi-static configuration of the switch. Should be called from time to time to update things like
+        port speeds or administrative status of individual ports.
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`. This instance
+                              will be updated.
+        :raises: RuntimeError
+        """
+        await self._backend.update_switch_config(switch)
+
+    async def update_port_states(self, switch):
+        """Update dynamic status of the switch. Should be called periodically.
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`. This instance
+                              will be updated.
+        :raises: RuntimeError
+        """
+        await self._backend.update_port_states(switch)
+        self.counter_engine.update(switch)
+
+    async def __aenter__(self):
+        await self._backend.auto_login()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await self._backend.logout()
+        except:  # noqa: E722
+            pass
+        await self._backend.close()
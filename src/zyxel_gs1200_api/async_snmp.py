@@ -0,0 +1,157 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Asyncio transport of the SNMP agent.
+
+The SNMP engine is driven by the callbacks of an asyncio event loop, so the responder can share the loop with other
+work (e.g. processing of switch polls) and stops as soon as the loop stops. The asyncio carrier shipped with pysnmp 4.4
+cannot be used, because it relies on :func:`asyncio.coroutine`, which was removed in Python 3.11.
+
+Usage::
+
+    loop = asyncio.new_event_loop()
+    snmp_engine.registerTransportDispatcher(AsyncioDispatcher(loop))
+    config.addTransport(snmp_engine, udp_domain, UdpAsyncioTransport(loop).openServerMode(("0.0.0.0", 1161)))
+    loop.run_forever()
+"""
+
+import asyncio
+import socket
+import time
+
+from pysnmp.carrier.base import AbstractTransport, AbstractTransportAddress, AbstractTransportDispatcher
+
+__all__ = ['AsyncioDispatcher', 'Udp6AsyncioTransport', 'UdpAsyncioTransport', 'udp6_domain', 'udp_domain']
+
+
+udp_domain = (1, 3, 6, 1, 6, 1, 1)
+"""Transport domain of SNMP over UDP (the same as `pysnmp.entity.config.snmpUDPDomain`)."""
+
+udp6_domain = (1, 3, 6, 1, 2, 1, 100, 1, 2)
+"""Transport domain of SNMP over UDPv6 (the same as `pysnmp.entity.config.snmpUDP6Domain`)."""
+
+
+class AsyncioDispatcher(AbstractTransportDispatcher):
+    """SNMP transport dispatcher running in an asyncio event loop."""
+
+    def __init__(self, loop=None):
+        """
+        :param asyncio.AbstractEventLoop loop: The event loop. If None, the current event loop is used.
+        """
+        AbstractTransportDispatcher.__init__(self)
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        """The event loop."""
+        self._timer = None
+
+    def registerTransport(self, tDomain, transport):
+        AbstractTransportDispatcher.registerTransport(self, tDomain, transport)
+        if self._timer is None:
+            self._timer = self.loop.call_soon(self._handle_timer)
+
+    def runDispatcher(self, timeout=0.0):
+        """Run the event loop until it is stopped (does nothing if the loop is already running)."""
+        if not self.loop.is_running():
+            self.loop.run_forever()
+
+    def closeDispatcher(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        AbstractTransportDispatcher.closeDispatcher(self)
+
+    def _handle_timer(self):
+        # The engine uses the timer ticks e.g. to expire the caches of unanswered requests
+        self._timer = self.loop.call_later(self.getTimerResolution(), self._handle_timer)
+        self.handleTimerTick(time.time())
+
+
+class UdpTransportAddress(tuple, AbstractTransportAddress):
+    """Address of an SNMP peer on UDP."""
+    pass
+
+
+class Udp6TransportAddress(tuple, AbstractTransportAddress):
+    """Address of an SNMP peer on UDPv6."""
+    pass
+
+
+class UdpAsyncioTransport(asyncio.DatagramProtocol, AbstractTransport):
+    """SNMP transport over UDP running in an asyncio event loop."""
+
+    protoTransportDispatcher = AsyncioDispatcher
+    addressType = UdpTransportAddress
+    sockFamily = socket.AF_INET
+
+    def __init__(self, loop=None):
+        """
+        :param asyncio.AbstractEventLoop loop: The event loop. If None, the current event loop is used.
+        """
+        self.loop = loop if loop is not None else asyncio.get_event_loop()
+        """The event loop."""
+        self.transport = None
+        """The asyncio datagram transport (None until the socket is open)."""
+        self._local_address = None
+        self._send_queue = []
+        self._opening = None
+
+    def openServerMode(self, iface):
+        """Open the socket listening at the given address.
+
+        If the event loop is not running yet, the socket is opened immediately, so that e.g. an occupied port is
+        reported by an exception from this function.
+
+        :param tuple iface: The listening address and port.
+        :return: This transport.
+        :rtype: UdpAsyncioTransport
+        """
+        endpoint = self.loop.create_datagram_endpoint(lambda: self, local_addr=iface, family=self.sockFamily)
+        if self.loop.is_running():
+            self._opening = asyncio.ensure_future(endpoint, loop=self.loop)
+        else:
+            self.loop.run_until_complete(endpoint)
+        return self
+
+    def openClientMode(self, iface=None):
+        return self.openServerMode(iface if iface is not None else ('', 0))
+
+    def closeTransport(self):
+        if self._opening is not None:
+            self._opening.cancel()
+            self._opening = None
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        AbstractTransport.closeTransport(self)
+
+    def sendMessage(self, outgoingMessage, transportAddress):
+        if self.transport is None:
+            self._send_queue.append((outgoingMessage, transportAddress))
+        else:
+            self.transport.sendto(outgoingMessage, tuple(transportAddress))
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._local_address = transport.get_extra_info('sockname')
+        queue, self._send_queue = self._send_queue, []
+        for message, address in queue:
+            self.sendMessage(message, address)
+
+    def datagram_received(self, data, addr):
+        if self._cbFun is None:
+            return
+        try:
+            self._cbFun(self, self.addressType(addr).setLocalAddress(self._local_address), data)
+        except Exception as e:
+            # A malformed message must not close the transport
+            self.loop.call_exception_handler({
+                'message': 'Error processing an SNMP message from %s' % (addr,), 'exception': e, 'protocol': self})
+
+    def error_received(self, exc):
+        pass  # e.g. ICMP port unreachable from a manager that did not wait for the response
+
+
+class Udp6AsyncioTransport(UdpAsyncioTransport):
+    """SNMP transport over UDPv6 running in an asyncio event loop."""
+
+    addressType = Udp6TransportAddress
+    sockFamily = socket.AF_INET6
@@ -0,0 +1,233 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Asyncio low-level backend of Zyxel (X)GS-1200 series switches utilizing the web browser API.
+
+Independent requests of one API call are sent to the switch concurrently, so e.g. :meth:`update_port_states` takes
+roughly one round trip to the switch instead of two.
+"""
+
+import asyncio
+
+import aiohttp
+import requests
+import yarl
+
+from .parsing import parse_port_states, parse_switch, parse_switch_config
+from .resilience import Backoff
+from .web_backend import formalize_request, encrypt_password, json_loads, login_auth_payload, login_status_payload
+
+__all__ = ['AsyncWebBackend']
+
+
+class AsyncWebBackend(object):
+    """Asyncio low-level backend of Zyxel (X)GS-1200 series switches utilizing the web browser API.
+
+    All requests are signed by the same :func:`~zyxel_gs1200_api.web_backend.formalize_request` function and use the
+    same login flow as :class:`~zyxel_gs1200_api.web_backend.WebBackend`.
+    """
+
+    def __init__(self, address, password, max_login_attempts=3, request_timeout=10.0):
+        """
+        :param str address: The HTTP(S) address of the switch API.
+        :param str password: Password for the switch administration.
+        :param int max_login_attempts: Maximum number of login retries before an exception is raised. The retries are
+                                       delayed by an exponential backoff.
+        :param float request_timeout: Default timeout of a single request (in seconds). None means no timeout.
+        """
+        self.address = address
+        self.password = password
+
+        self.max_login_attempts = max_login_attempts
+        self.failed_login_attempts = 0
+        self.login_backoff = Backoff(initial=1.0, maximum=10.0)
+        """Delays between the login attempts."""
+        self.request_timeout = request_timeout
+
+        self.session = None
+        self.logged_in = False
+        self._login_lock = None
+        self._login_generation = 0
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            # The switch is usually accessed by IP address, so the cookie jar has to accept cookies from IP hosts.
+            self.session = aiohttp.ClientSession(cookie_jar=aiohttp.CookieJar(unsafe=True))
+        return self.session
+
+    async def close(self):
+        """Close the HTTP session."""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def send_request(self, method, url, auto_login=True, timeout=None, **kwargs):
+        """Send a HTTP request to the switch API.
+        :param str method: GET or POST
+        :param url: The URL part after address.
+        :param bool auto_login: If True, login is performed before the request if needed.
+        :param float timeout: Timeout of this request in seconds. If None, :attr:`request_timeout` is used.
+        :param kwargs: `json`, `data` or `params` of the request.
+        :return: The decoded JSON response or None if the response is not a JSON.
+        :rtype: dict
+        :raises aiohttp.ClientError:
+        :raises asyncio.TimeoutError:
+        :raises RuntimeError:
+        """
+        if auto_login and not self.logged_in:
+            await self.auto_login()
+
+        req = requests.Request(method=method, url=self.address + "/" + url, **kwargs)
+        req = formalize_request(req).prepare()
+
+        if timeout is None:
+            timeout = self.request_timeout
+        login_generation = self._login_generation
+        session = self._get_session()
+        async with session.request(method, yarl.URL(req.url, encoded=True), data=req.body, headers=req.headers,
+                                   timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
+            resp.raise_for_status()
+            content = await resp.read()
+
+        # Some non-existent pages return empty page
+        if content == b"\n":
+            raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=400, message="Not found")
+
+        content = content.lstrip()
+        if content[:1] not in (b"{", b"["):
+            return None  # The response is not a JSON
+        try:
+            data = json_loads(content)
+        except ValueError:
+            return None  # The response is not a JSON
+
+        if isinstance(data, dict) and "logout" in data:
+            if auto_login and login_generation != self._login_generation:
+                # A concurrent request has already logged in again while this one was in flight
+                return await self.send_request(method, url, auto_login=False, timeout=timeout, **kwargs)
+            self.logged_in = False
+            if auto_login:
+                await self.auto_login()
+                return await self.send_request(method, url, auto_login=False, timeout=timeout, **kwargs)
+            raise RuntimeError("Authentication session has expired")
+        return data
+
+    async def get(self, cmd, **kwargs):
+        """Perform a get action on the API.
+        :param cmd: The command to execute (`cmd` argument of the URL).
+        :param kwargs: Passed to :meth:`send_request`.
+        :return: The decoded JSON response.
+        :rtype: dict
+        """
+        return await self.send_request("GET", "cgi/get.cgi?cmd=" + cmd, **kwargs)
+
+    async def set(self, cmd, **kwargs):
+        """Perform a set action on the API.
+        :param cmd: The command to execute (`cmd` argument of the URL).
+        :param kwargs: Passed to :meth:`send_request`.
+        :return: The decoded JSON response.
+        :rtype: dict
+        """
+        return await self.send_request("POST", "cgi/set.cgi?cmd=" + cmd, **kwargs)
+
+    async def get_many(self, *cmds, **kwargs):
+        """Perform several independent get actions concurrently.
+
+        If one of the requests fails, the others are cancelled and the exception is propagated.
+
+        :param cmds: The commands to execute.
+        :param kwargs: Passed to :meth:`send_request`.
+        :return: Tuple with `data` fields of the responses (in the same order as `cmds`).
+        :rtype: tuple
+        """
+        if not self.logged_in:
+            await self.auto_login()
+        tasks = [asyncio.ensure_future(self.get(cmd, **kwargs)) for cmd in cmds]
+        try:
+            responses = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+        return tuple(r["data"] for r in responses)
+
+    async def auto_login(self):
+        """Automatically log in the web API if it is needed.
+
+        Concurrent callers wait for a single login instead of each of them logging in.
+
+        :raises RuntimeError:
+        """
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            if self.logged_in:
+                return
+            self.failed_login_attempts = 0
+            self.login_backoff.reset()
+            while self.failed_login_attempts < self.max_login_attempts:
+                try:
+                    await self.login()
+                    return
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    if "errLoginPwdInvalid" in str(e):
+                        self.failed_login_attempts = self.max_login_attempts
+                        raise RuntimeError("Login failed: Invalid password")
+                    self.failed_login_attempts += 1
+                    print(e)
+                    if self.failed_login_attempts < self.max_login_attempts:
+                        await asyncio.sleep(self.login_backoff.next_delay())
+            raise RuntimeError("Login failed too many times, exiting")
+
+    async def login(self):
+        """Perform login to the switch."""
+        print("Authenticating {}/{}".format(self.failed_login_attempts + 1, self.max_login_attempts))
+        modulus = (await self.get("home_loginInfo", auto_login=False))["data"]["modulus"]
+        loop = asyncio.get_event_loop()
+        # RSA encryption is done in pure Python, so do not block the event loop
+        enc_pass = await loop.run_in_executor(None, encrypt_password, self.password, modulus)
+
+        auth_id = (await self.set('home_loginAuth', json=login_auth_payload(enc_pass), auto_login=False))["authId"]
+        resp = await self.set("home_loginStatus", json=login_status_payload(auth_id), auto_login=False)
+
+        if resp["data"]["status"] != "ok":
+            raise RuntimeError("Login failed: {}".format(resp["data"]))
+        print("Successfully authenticated")
+
+        self.logged_in = True
+        self.failed_login_attempts = 0
+        self._login_generation += 1
+
+    async def logout(self):
+        """Perform logout from the switch."""
+        await self.set("home_logout", data={})
+        self.logged_in = False
+        self.failed_login_attempts = 0
+        print("Logged out")
+
+    async def get_switch(self):
+        """Connect to the switch and read its static or semi-static configuration. The status fields will not be filled.
+        :return: The populated switch instance.
+        :rtype: Switch
+        :raises: RuntimeError
+        """
+        main_data, port_data = await self.get_many("home_main", "port_portInfo")
+        return parse_switch(main_data, port_data)
+
+    async def update_switch_config(self, switch):
+        """Update semi-static configuration of the switch.
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`.
+        :raises: RuntimeError
+        """
+        main_data, port_data = await self.get_many("home_main", "port_portInfo")
+        parse_switch_config(switch, main_data, port_data)
+
+    async def update_port_states(self, switch):
+        """Update dynamic status of the switch.
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`.
+        :raises: RuntimeError
+        """
+        sys_data, link_data = await self.get_many("home_systemData", "home_linkData")
+        parse_port_states(switch, sys_data, link_data)
@@ -5,7 +5,18 @@
 
 from .types import Switch
 
-__all__ = ['Backend']
+__all__ = ['Backend', 'data_sources']
+
+
+data_sources = ("link", "counters", "loop", "main", "port_info")
+"""Data sources of the switch that can be updated independently by :meth:`Backend.update_sources`:
+
+- `link`: Link state, speed and overheat status of the ports.
+- `counters`: Packet counters of the ports.
+- `loop`: Loop detection status of the ports and the network configuration of the switch.
+- `main`: General information about the switch (name, firmware, network configuration).
+- `port_info`: Configuration of the ports (maximum speed, administrative status).
+"""
 
 
 class Backend(object):
@@ -43,3 +54,35 @@ class Backend(object):
         :raises: RuntimeError
         """
         raise NotImplementedError()
+
+    def update_mac_table(self, switch):
+        """Update the MAC address forwarding table of the switch.
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`. Its
+                              :attr:`~Switch.mac_table` will be created or updated.
+        :return: The changes of the table since the previous update.
+        :rtype: MacTableDiff
+        :raises: RuntimeError
+        """
+        raise NotImplementedError()
+
+    def update_sources(self, switch, sources):
+        """Update only the given data sources of the switch.
+
+        Backends that cannot read the sources separately update everything the sources need and report all of them as
+        changed. Counters may always be reported as changed, :meth:`ZyxelAPI.update_scheduled` tells the changes of
+        traffic rates apart.
+
+        :param Switch switch: The switch instance prepopulated by a previous call to :meth:`~get_switch`. This instance
+                              will be updated.
+        :param sources: The sources to update (items of :data:`data_sources`).
+        :type sources: iterable of str
+        :return: The sources whose data changed.
+        :rtype: set
+        :raises: RuntimeError
+        """
+        sources = set(sources)
+        if "main" in sources or "port_info" in sources:
+            self.update_switch_config(switch)
+        if "link" in sources or "counters" in sources or "loop" in sources:
+            self.update_port_states(switch)
+        return sources
@@ -0,0 +1,346 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Benchmarks of the poll-to-MIB hot path.
+
+Run ``python -m zyxel_gs1200_api.benchmark --help`` for the options. The results are printed (or saved) as JSON, so
+that results of two versions can be compared by ``--compare baseline.json``.
+
+The benchmarks do not need a real switch. They use :class:`SyntheticBackend`, which generates web API responses for
+an arbitrary number of ports and can simulate the latency of the switch.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sys
+import threading
+import time
+
+from .api import ZyxelAPI
+from .emulator import VirtualSwitch
+from .test_backend import TestBackend
+from .web_backend import json_loads
+
+__all__ = ['SyntheticBackend', 'SyntheticResponse', 'benchmark_api', 'benchmark_json_decode', 'benchmark_snmp_walk',
+           'benchmark_write_vars', 'compare', 'run_benchmarks', 'summarize']
+
+
+class SyntheticResponse(object):
+    """Response of :class:`SyntheticBackend` decoded from JSON text just like a real HTTP response."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def json(self):
+        return json_loads(self.text)
+
+
+class SyntheticBackend(TestBackend):
+    """Backend generating web API responses of a switch with any number of ports.
+
+    The data come from a :class:`~zyxel_gs1200_api.emulator.VirtualSwitch` whose packet counters grow with time. The
+    responses are serialized to JSON text and decoded by the caller, so JSON decoding is part of the measured cost.
+    """
+
+    def __init__(self, num_ports=12, latency=0.0, num_mac_entries=64, seed=0):
+        """
+        :param int num_ports: Number of ports of the switch.
+        :param float latency: Simulated duration of each request (in seconds).
+        :param int num_mac_entries: Number of entries of the MAC address table.
+        :param int seed: Seed of the random generator of the counters.
+        """
+        super(SyntheticBackend, self).__init__()
+        self.num_ports = num_ports
+        self.latency = latency
+        self.num_requests = 0
+        """Number of requests served."""
+        self.switch = VirtualSwitch(num_ports, name="synthetic-sw", num_mac_entries=num_mac_entries, seed=seed)
+        """The virtual switch generating the data."""
+
+    def generate_data(self, cmd):
+        """Generate the `data` field of the response to the given command.
+        :param str cmd: The command.
+        :rtype: dict
+        """
+        data = self.switch.get_data(cmd)
+        if data is None:
+            raise RuntimeError("Unknown command " + cmd)
+        return data
+
+    def get(self, cmd, *args, **kwargs):
+        self.num_requests += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+        return SyntheticResponse(json.dumps({"data": self.generate_data(cmd)}))
+
+
+def summarize(samples):
+    """Compute statistics of durations.
+
+    :param list samples: The measured durations in seconds.
+    :return: Dict with keys `n`, `mean`, `median`, `p95`, `min` and `max` (in seconds).
+    :rtype: dict
+    """
+    samples = sorted(samples)
+    n = len(samples)
+    if n == 0:
+        return {"n": 0}
+    return {
+        "n": n,
+        "mean": sum(samples) / n,
+        "median": samples[n // 2],
+        "p95": samples[min(int(n * 0.95), n - 1)],
+        "min": samples[0],
+        "max": samples[-1],
+    }
+
+
+def _measure(func, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.time()
+        func()
+        samples.append(time.time() - start)
+    return summarize(samples)
+
+
+def benchmark_api(num_ports, latency, iterations):
+    """Measure the latency of the :class:`~zyxel_gs1200_api.api.ZyxelAPI` calls.
+
+    :param int num_ports: Number of ports of the synthetic switch.
+    :param float latency: Simulated latency of each request (in seconds).
+    :param int iterations: Number of measured calls.
+    :return: Dict mapping benchmark names to results of :func:`summarize`.
+    :rtype: dict
+    """
+    api = ZyxelAPI(SyntheticBackend(num_ports, latency))
+    switch = api.get_switch()
+    return {
+        "api.get_switch": _measure(api.get_switch, iterations),
+        "api.update_switch_config": _measure(lambda: api.update_switch_config(switch), iterations),
+        "api.update_port_states": _measure(lambda: api.update_port_states(switch), iterations),
+        "api.update_mac_table": _measure(lambda: api.update_mac_table(switch), iterations),
+    }
+
+
+def benchmark_json_decode(num_ports, iterations):
+    """Measure the cost of decoding the JSON responses of one poll.
+
+    :param int num_ports: Number of ports of the synthetic switch.
+    :param int iterations: Number of measured decodes.
+    :return: Dict mapping benchmark names to results of :func:`summarize`.
+    :rtype: dict
+    """
+    backend = SyntheticBackend(num_ports)
+    results = {}
+    for cmd in ("home_main", "port_portInfo", "home_systemData", "home_linkData", backend.mac_table_cmd):
+        text = backend.get(cmd).text
+        results["json_decode." + cmd] = _measure(lambda: json_loads(text), iterations)
+    return results
+
+
+def _create_mib(num_ports):
+    from pysnmp.smi import builder, instrum
+    from .snmp import SwitchMib
+
+    api = ZyxelAPI(SyntheticBackend(num_ports))
+    switch = api.get_switch()
+    mib = SwitchMib(instrum.MibInstrumController(builder.MibBuilder()))
+    mib.init_switch(switch)
+    mib.init_bridge(switch)
+    api.update_port_states(switch)
+    mib.update(switch)
+    mib.update_mac_table(switch, api.update_mac_table(switch))
+    return api, switch, mib
+
+
+def benchmark_write_vars(num_ports, iterations):
+    """Measure the cost of writing one poll into the MIB.
+
+    :param int num_ports: Number of ports of the synthetic switch.
+    :param int iterations: Number of measured updates.
+    :return: Dict mapping benchmark names to results of :func:`summarize`.
+    :rtype: dict
+    """
+    api, switch, mib = _create_mib(num_ports)
+    return {
+        "write_vars.update": _measure(lambda: mib.update(switch), iterations),
+        "write_vars.init_switch": _measure(lambda: mib.init_switch(switch), max(iterations // 10, 1)),
+    }
+
+
+def benchmark_snmp_walk(num_ports, iterations, snmp_port=16100, max_repetitions=25):
+    """Measure GETBULK walks of MIB-2 and BRIDGE-MIB against a locally started agent.
+
+    :param int num_ports: Number of ports of the synthetic switch.
+    :param int iterations: Number of measured walks.
+    :param int snmp_port: Local UDP port of the agent.
+    :param int max_repetitions: Max-repetitions of the GETBULK requests.
+    :return: Dict mapping benchmark names to results of :func:`summarize` (with an extra key `varbinds_per_s`).
+    :rtype: dict
+    """
+    from pysnmp.carrier.asyncore.dispatch import AsyncoreDispatcher
+    from pysnmp.carrier.asyncore.dgram import udp
+    from pysnmp.entity import config, engine
+    from pysnmp.entity.rfc3413 import context
+    from pysnmp import hlapi
+    from .snmp import SwitchMib, add_community, add_context, add_responders
+
+    stopped = []
+
+    class StoppableDispatcher(AsyncoreDispatcher):
+        def jobsArePending(self):
+            return len(stopped) == 0 and AsyncoreDispatcher.jobsArePending(self)
+
+        def transportsAreWorking(self):
+            return len(stopped) == 0 and AsyncoreDispatcher.transportsAreWorking(self)
+
+    snmp_engine = engine.SnmpEngine()
+    snmp_engine.registerTransportDispatcher(StoppableDispatcher())
+    config.addTransport(snmp_engine, udp.domainName, udp.UdpTransport().openServerMode(("127.0.0.1", snmp_port)))
+    snmp_context = context.SnmpContext(snmp_engine)
+    add_responders(snmp_engine, snmp_context)
+    mib = SwitchMib(add_context(snmp_context, ""))
+    add_community(snmp_engine, "public", "")
+
+    api = ZyxelAPI(SyntheticBackend(num_ports))
+    switch = api.get_switch()
+    mib.init_switch(switch)
+    mib.init_bridge(switch)
+    api.update_port_states(switch)
+    mib.update(switch)
+    mib.update_mac_table(switch, api.update_mac_table(switch))
+
+    def run():
+        snmp_engine.transportDispatcher.jobStarted(1)
+        while len(stopped) == 0:
+            snmp_engine.transportDispatcher.runDispatcher(timeout=0.1)
+        snmp_engine.transportDispatcher.closeDispatcher()
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+
+    client_engine = hlapi.SnmpEngine()
+    target = hlapi.UdpTransportTarget(("127.0.0.1", snmp_port), timeout=5, retries=0)
+    results = {}
+    try:
+        for name, oid in (("snmp_walk.mib2", "1.3.6.1.2.1.2"), ("snmp_walk.bridge", "1.3.6.1.2.1.17")):
+            num_varbinds = [0]
+
+            def walk():
+                for error_indication, error_status, _, var_binds in hlapi.bulkCmd(
+                        client_engine, hlapi.CommunityData("public"), target, hlapi.ContextData(),
+                        0, max_repetitions, hlapi.ObjectType(hlapi.ObjectIdentity(oid)), lexicographicMode=False):
+                    if error_indication or error_status:
+                        raise RuntimeError("SNMP walk failed: %s" % (error_indication or error_status.prettyPrint()))
+                    num_varbinds[0] += len(var_binds)
+
+            results[name] = _measure(walk, iterations)
+            total_time = results[name].get("mean", 0.0) * results[name]["n"]
+            results[name]["varbinds_per_s"] = num_varbinds[0] / total_time if total_time > 0 else 0.0
+    finally:
+        stopped.append(True)
+        thread.join()
+    return results
+
+
+def run_benchmarks(benchmarks, ports, latencies, iterations, snmp_port=16100):
+    """Run the selected benchmarks for all combinations of parameters.
+
+    :param list benchmarks: Names of the benchmarks (`api`, `json`, `write_vars`, `snmp_walk`).
+    :param list ports: Numbers of ports of the synthetic switch.
+    :param list latencies: Simulated latencies (used by the `api` benchmark only).
+    :param int iterations: Number of measured iterations of each benchmark.
+    :param int snmp_port: Local UDP port of the agent of the `snmp_walk` benchmark.
+    :return: The report (dict with keys `meta` and `results`).
+    :rtype: dict
+    """
+    results = []
+
+    def add(results_dict, num_ports, latency=None):
+        for name in sorted(results_dict.keys()):
+            result = {"benchmark": name, "ports": num_ports, "latency": latency, "unit": "s"}
+            result.update(results_dict[name])
+            results.append(result)
+
+    for num_ports in ports:
+        if "api" in benchmarks:
+            for latency in latencies:
+                add(benchmark_api(num_ports, latency, iterations), num_ports, latency)
+        if "json" in benchmarks:
+            add(benchmark_json_decode(num_ports, iterations), num_ports)
+        if "write_vars" in benchmarks:
+            add(benchmark_write_vars(num_ports, iterations), num_ports)
+        if "snmp_walk" in benchmarks:
+            add(benchmark_snmp_walk(num_ports, max(iterations // 10, 1), snmp_port), num_ports)
+
+    return {
+        "meta": {
+            "time": time.time(),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "iterations": iterations,
+        },
+        "results": results,
+    }
+
+
+def _key(result):
+    return result["benchmark"], result["ports"], result["latency"]
+
+
+def compare(report, baseline):
+    """Compare mean durations of two reports.
+
+    :param dict report: The current report returned by :func:`run_benchmarks`.
+    :param dict baseline: The baseline report.
+    :return: Human-readable lines with relative changes of the mean durations.
+    :rtype: list
+    """
+    baseline_results = dict((_key(r), r) for r in baseline.get("results", []))
+    lines = []
+    for result in report["results"]:
+        base = baseline_results.get(_key(result))
+        if base is None or base.get("mean", 0) <= 0 or "mean" not in result:
+            continue
+        lines.append("%-40s ports %3i latency %-6s %10.6f s -> %10.6f s (%+.1f %%)" % (
+            result["benchmark"], result["ports"], result["latency"], base["mean"], result["mean"],
+            (result["mean"] / base["mean"] - 1) * 100))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks of the poll-to-MIB hot path.")
+    parser.add_argument("--benchmarks", nargs="+", default=["api", "json", "write_vars", "snmp_walk"],
+                        choices=["api", "json", "write_vars", "snmp_walk"], help="Benchmarks to run.")
+    parser.add_argument("--ports", nargs="+", type=int, default=[12], help="Numbers of ports of the switch.")
+    parser.add_argument("--latency", nargs="+", type=float, default=[0.0],
+                        help="Simulated latencies of the switch in seconds (api benchmark only).")
+    parser.add_argument("--iterations", type=int, default=100, help="Number of measured iterations.")
+    parser.add_argument("--snmp-port", type=int, default=16100, help="Local UDP port of the benchmarked agent.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--compare", help="Compare the results with this baseline JSON report.")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.benchmarks, args.ports, args.latency, args.iterations, args.snmp_port)
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        print("\n".join(compare(report, baseline)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Terminal dashboard of the port statistics of one or more switches, usable without ROS::
+
+    python -m zyxel_gs1200_api.cli http://192.168.1.3 http://192.168.1.4 --password admin
+
+The module imports only what it needs to parse the arguments, so that it starts quickly. The backends (and the
+libraries they use) are imported when the first switch is connected. In a terminal, the dashboard is drawn once and then
+only the cells whose text changed are rewritten using ANSI escape sequences. When the output is not a terminal (or with
+`--plain`), whole tables are printed.
+"""
+
+from __future__ import print_function
+
+import argparse
+import sys
+import time
+
+__all__ = ['Dashboard', 'format_rate', 'format_speed', 'main', 'switch_rows']
+
+
+def format_rate(value):
+    """Format a rate with an SI prefix (e.g. `12.3 M`).
+    :param float value: The rate.
+    :rtype: str
+    """
+    for prefix, scale in (("G", 1e9), ("M", 1e6), ("k", 1e3)):
+        if value >= scale:
+            return "%.1f %s" % (value / scale, prefix)
+    return "%.0f" % (value,)
+
+
+def format_speed(speed):
+    """Format the speed of a port (e.g. `2.5 Gbps`).
+    :param int speed: The speed in bps.
+    :rtype: str
+    """
+    if speed >= 1000000000:
+        return "%g Gbps" % (speed / 1e9,)
+    return "%g Mbps" % (speed / 1e6,)
+
+
+header = ("port", "status", "Rx pps", "Tx pps", "Rx bps", "Tx bps", "flags")
+"""Column titles of the port table."""
+
+
+def switch_rows(title, switch, window, error=None):
+    """Rows of the dashboard describing one switch: a title, the column titles and one row per port.
+
+    :param str title: Title of the switch (e.g. its address).
+    :param Switch switch: The switch updated with a :class:`~zyxel_gs1200_api.counters.CounterEngine` computing rates
+                          over `window`. None if the switch has not been connected yet.
+    :param float window: The window of the shown rates.
+    :param Exception error: Error of the last poll (None if it succeeded).
+    :return: List of rows, each a list of cell texts. The title row has a single cell.
+    :rtype: list
+    """
+    if switch is None:
+        return [[title + ": " + ("connecting" if error is None else str(error))]]
+    status = switch.description if error is None else "%s (last poll failed: %s)" % (switch.description, error)
+    rows = [[title + ": " + status], list(header)]
+    table = switch.port_table
+    for i, port in enumerate(switch.ports):
+        rates = port.status.rates.get(window)
+        if table.enabled[i] <= 0:
+            link = "Disabled"
+        elif table.connected[i] < 0:
+            link = "?"
+        else:
+            link = format_speed(table.speed[i]) if table.connected[i] > 0 else "Down"
+        flags = ("LOOP " if table.loop_detected[i] > 0 else "") + ("HOT" if table.overheat_detected[i] > 0 else "")
+        rows.append([port.alias or port.name, link] + ([
+            format_rate(rates.rx_pps), format_rate(rates.tx_pps), format_rate(rates.rx_bps), format_rate(rates.tx_bps)
+        ] if rates is not None else [""] * 4) + [flags.strip()])
+    return rows
+
+
+class Dashboard(object):
+    """Table on a terminal redrawn incrementally.
+
+    Each call of :meth:`draw` gets the whole table, but only the cells whose text differs from the previous call are
+    written (positioned by ANSI escape sequences). Without ANSI, the whole table is printed each time.
+    """
+
+    def __init__(self, out=None, ansi=None):
+        """
+        :param out: The output stream (`sys.stdout` if None).
+        :param bool ansi: Whether to redraw incrementally. If None, it is used if `out` is a terminal.
+        """
+        self.out = out if out is not None else sys.stdout
+        self.ansi = ansi if ansi is not None else (hasattr(self.out, "isatty") and self.out.isatty())
+        """Whether the table is redrawn incrementally."""
+        self.num_cells_written = 0
+        """Number of cells written to the terminal (to measure the savings of the incremental redraw)."""
+        self._cells = {}  # (row, column) -> text written at the position
+        self._row_lengths = []  # number of cells of each written row
+        self._widths = None
+
+    def draw(self, rows, widths):
+        """Draw the table.
+
+        :param list rows: Rows of the table, each a list of cell texts. A row with a single cell spans all columns.
+        :param widths: Widths of the columns. Cells are separated by a space and cut to the width of their column.
+        :type widths: list of int
+        """
+        total_width = sum(widths) + len(widths) - 1
+        offsets = [sum(widths[:j]) + j for j in range(len(widths))]
+        chunks = []
+        if not self.ansi:
+            for row in rows:
+                if len(row) == 1:
+                    chunks.append(row[0][:total_width])
+                else:
+                    chunks.append(" ".join("%-*s" % (w, c[:w]) if j == 0 else "%*s" % (w, c[:w])
+                                           for j, (c, w) in enumerate(zip(row, widths))).rstrip())
+                self.num_cells_written += len(row)
+            self.out.write("\n".join(chunks) + "\n\n")
+            self.out.flush()
+            return
+        if widths != self._widths:
+            # A changed layout moves all cells
+            chunks.append("\033[?25l\033[H\033[2J")
+            self._cells = {}
+            self._row_lengths = []
+            self._widths = list(widths)
+        for r, row in enumerate(rows):
+            if r < len(self._row_lengths) and self._row_lengths[r] != len(row):
+                # A title row replaced a port row or vice versa
+                chunks.append("\033[%i;1H\033[K" % (r + 1,))
+                for j in range(self._row_lengths[r]):
+                    self._cells.pop((r, j), None)
+            for j, cell in enumerate(row):
+                if len(row) == 1:
+                    text = "%-*s" % (total_width, cell[:total_width])
+                elif j == 0:
+                    text = "%-*s" % (widths[j], cell[:widths[j]])
+                else:
+                    text = "%*s" % (widths[j], cell[:widths[j]])
+                if self._cells.get((r, j)) != text:
+                    chunks.append("\033[%i;%iH%s" % (r + 1, offsets[j] + 1, text))
+                    self._cells[(r, j)] = text
+                    self.num_cells_written += 1
+        for r in range(len(rows), len(self._row_lengths)):
+            chunks.append("\033[%i;1H\033[K" % (r + 1,))
+            for j in range(self._row_lengths[r]):
+                self._cells.pop((r, j), None)
+        self._row_lengths = [len(row) for row in rows]
+        chunks.append("\033[%i;1H" % (len(rows) + 1,))
+        self.out.write("".join(chunks))
+        self.out.flush()
+
+    def close(self):
+        """Show the cursor again."""
+        if self.ansi:
+            self.out.write("\033[%i;1H\033[?25h" % (len(self._row_lengths) + 1,))
+            self.out.flush()
+
+
+class _LastMessage(object):
+    """Replacement of `sys.stdout` keeping the last printed line, so that messages of the backends (e.g. about logins)
+    do not garble the dashboard."""
+
+    def __init__(self):
+        self.line = ""
+
+    def write(self, text):
+        lines = [line for line in text.splitlines() if len(line.strip()) > 0]
+        if len(lines) > 0:
+            self.line = lines[-1]
+
+    def flush(self):
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show live port statistics of Zyxel (X)GS-1200 series switches.")
+    parser.add_argument("addresses", nargs="+", metavar="address",
+                        help="Address of the web API of a switch (including 'http://'), serial console, "
+                             "'shm://<name>' of a switch published by snmp_agent, or 'test'.")
+    parser.add_argument("-p", "--password", default="", help="Password of the web API (the same for all switches).")
+    parser.add_argument("-r", "--rate", type=float, default=1.0, help="Refresh frequency in Hz.")
+    parser.add_argument("-w", "--rate-window", type=float, default=10.0,
+                        help="Length of the window over which the rates are averaged (in seconds).")
+    parser.add_argument("-n", "--num-prints", type=int, default=0,
+                        help="If nonzero, exit after this number of refreshes.")
+    parser.add_argument("--session-store", help="File where web API sessions are stored for reuse.")
+    parser.add_argument("--plain", action="store_true", help="Print whole tables instead of redrawing the changes.")
+    args = parser.parse_args(argv)
+
+    # Imported only after the arguments are parsed, so that e.g. --help is instant
+    from .api import ZyxelAPI
+    from .counters import CounterEngine
+    from .fleet import Fleet
+    from .session_store import SessionStore
+
+    session_store = SessionStore(args.session_store) if args.session_store else None
+    fleet = Fleet(max_workers=len(args.addresses))
+    for address in args.addresses:
+        fleet.add(address, ZyxelAPI(address, args.password, counter_engine=CounterEngine(windows=(args.rate_window,)),
+                                    session_store=session_store if address.startswith("http") else None))
+
+    dashboard = Dashboard(ansi=False if args.plain else None)
+    messages = _LastMessage()
+    stdout = sys.stdout
+    if dashboard.ansi:
+        sys.stdout = messages
+    period = 1.0 / args.rate
+    errors = {}
+    num_prints = 0
+    try:
+        while True:
+            start = time.time()
+            fleet.poll()
+            for member, connected, error in fleet.collect(timeout=period):
+                errors[member.name] = error
+                if connected:
+                    for port in member.switch.ports:
+                        port.alias = port.name
+            rows = []
+            for member in fleet.members:
+                rows.extend(switch_rows(member.name, member.switch, args.rate_window, errors.get(member.name)))
+                rows.append([""])
+            rows.append([messages.line])
+            widths = [max([4] + [len(p.alias or p.name) for m in fleet.members if m.switch is not None
+                                 for p in m.switch.ports]), 9, 9, 9, 9, 9, 8]
+            dashboard.draw(rows, widths)
+            num_prints += 1
+            if 0 < args.num_prints <= num_prints:
+                break
+            time.sleep(max(period - (time.time() - start), 0.0))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.shutdown()
+        sys.stdout = stdout
+        dashboard.close()
+
+
+if __name__ == "__main__":
+    main()
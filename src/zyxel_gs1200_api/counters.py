@@ -0,0 +1,176 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Extension of raw switch counters to monotonic 64-bit counters and computation of traffic rates."""
+
+import time
+from array import array
+
+from .types import CounterColumns, PortRates
+
+__all__ = ['CounterEngine']
+
+
+# Counters of PacketCounter tracked by the engine
+counter_fields = CounterColumns.fields
+
+_max_counter = 2 ** 64 - 1
+
+
+class CounterEngine(object):
+    """Extension of raw switch counters to monotonic 64-bit counters and computation of traffic rates.
+
+    After each update of the switch by a backend, :meth:`update` has to be called. It replaces the raw counter values
+    in :attr:`PortStatus.rx_packets` and :attr:`PortStatus.tx_packets` by monotonic 64-bit values:
+
+    - If a counter goes back from the upper half of its range to the lower half, it is considered a wrap-around.
+    - Any other decrease is considered a reset of the counter (e.g. the switch rebooted). The counter continues from
+      its last value and :attr:`PortStatus.last_packet_jump_back_time` is set (reported as a counter discontinuity).
+
+    The counters are read from and written to the columns of :attr:`Switch.port_table` directly. The extended counters
+    of all ports are stored in a fixed-size ring buffer of timestamped samples. The rates of all
+    ports are then computed in one pass for each of the configured windows and stored in :attr:`PortStatus.rates`.
+    """
+
+    def __init__(self, history_size=64, windows=(10.0, 60.0), counter_bits=32):
+        """
+        :param int history_size: Number of samples kept in the ring buffer.
+        :param windows: Lengths of the windows over which rates are computed (in seconds). The real window can be
+                        shorter if the history does not contain old enough samples.
+        :type windows: tuple of float
+        :param int counter_bits: Width of the raw counters of the switch.
+        """
+        self.history_size = history_size
+        self.windows = tuple(windows)
+        self.counter_modulus = 2 ** counter_bits
+
+        self._switch_id = None
+        self._num_ports = 0
+        self._raw = None  # array of last raw values, index [(direction * num_fields + field) * num_ports + port]
+        self._extended = None  # same layout as _raw
+        self._stamps = array('d', [0.0] * history_size)
+        self._history = None  # array of extended values, index [slot * row_size + same index as _raw]
+        self._head = 0  # slot where the next sample will be written
+        self._count = 0  # number of valid samples
+
+    def reset(self):
+        """Forget all history. The next update will start from scratch."""
+        self._switch_id = None
+
+    def update(self, switch, stamp=None):
+        """Extend the raw counters of the switch, record them in the history and compute the rates.
+
+        :param Switch switch: The switch just updated by :meth:`ZyxelAPI.update_port_states`.
+        :param float stamp: Time of the sample. If None, current time is used.
+        """
+        if stamp is None:
+            stamp = time.time()
+        num_fields = len(counter_fields)
+        row_size = switch.num_ports * 2 * num_fields
+
+        if self._switch_id != id(switch) or self._num_ports != switch.num_ports:
+            self._switch_id = id(switch)
+            self._num_ports = switch.num_ports
+            self._raw = None
+            self._extended = array('Q', [0] * row_size)
+            self._history = array('Q', [0] * (row_size * self.history_size))
+            self._head = 0
+            self._count = 0
+
+        first_update = self._raw is None
+        if first_update:
+            self._raw = array('Q', [0] * row_size)
+
+        raw = self._raw
+        extended = self._extended
+        modulus = self.counter_modulus
+        half = modulus // 2
+        history = self._history
+        base = self._head * row_size
+
+        table = switch.port_table
+        num_ports = switch.num_ports
+        discontinuity = [False] * num_ports
+        for direction, columns in enumerate((table.rx, table.tx)):
+            for field_index, field in enumerate(counter_fields):
+                column = getattr(columns, field)
+                offset = (direction * num_fields + field_index) * num_ports
+                for port_index in range(num_ports):
+                    i = offset + port_index
+                    value = column[port_index]
+                    if first_update:
+                        new = value
+                    else:
+                        last = raw[i]
+                        if value >= last:
+                            new = extended[i] + (value - last)
+                        elif half <= last < modulus and value < half:
+                            new = extended[i] + (value + modulus - last)  # wrap-around
+                        else:
+                            new = extended[i] + value  # reset
+                            discontinuity[port_index] = True
+                    raw[i] = value
+                    extended[i] = min(new, _max_counter)
+                    history[base + i] = extended[i]
+                column[:] = extended[offset:offset + num_ports]
+        for port_index in range(num_ports):
+            if discontinuity[port_index]:
+                table.last_packet_jump_back_time[port_index] = stamp
+
+        self._stamps[self._head] = stamp
+        self._head = (self._head + 1) % self.history_size
+        self._count = min(self._count + 1, self.history_size)
+
+        self._compute_rates(switch, stamp)
+
+    def _slot(self, age):
+        """Physical slot of the sample `age` samples before the newest one."""
+        return (self._head - 1 - age) % self.history_size
+
+    def _find_oldest_in_window(self, stamp, window):
+        """Binary search for the oldest sample not older than `stamp - window` (returns its age)."""
+        lo = 0
+        hi = self._count - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self._stamps[self._slot(mid)] >= stamp - window:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def _compute_rates(self, switch, stamp):
+        num_fields = len(counter_fields)
+        row_size = switch.num_ports * 2 * num_fields
+        bytes_field = counter_fields.index("num_bytes")
+        packet_fields = [counter_fields.index(f)
+                         for f in ("num_unicast_packets", "num_multicast_packets", "num_broadcast_packets")]
+        history = self._history
+        new_base = self._slot(0) * row_size
+
+        num_ports = switch.num_ports
+        all_rates = [dict() for _ in range(num_ports)]
+        for window in self.windows:
+            age = self._find_oldest_in_window(stamp, window)
+            old_slot = self._slot(age)
+            old_base = old_slot * row_size
+            duration = stamp - self._stamps[old_slot]
+
+            for port_index in range(num_ports):
+                rates = PortRates()
+                rates.window = duration
+                if age > 0 and duration > 0:
+                    values = []
+                    for direction in (0, 1):
+                        offset = direction * num_fields * num_ports + port_index
+                        num_packets = 0
+                        for field_index in packet_fields:
+                            i = offset + field_index * num_ports
+                            num_packets += history[new_base + i] - history[old_base + i]
+                        i = offset + bytes_field * num_ports
+                        num_bytes = history[new_base + i] - history[old_base + i]
+                        values.append((num_packets / duration, num_bytes * 8 / duration))
+                    (rates.rx_pps, rates.rx_bps), (rates.tx_pps, rates.tx_bps) = values
+                all_rates[port_index][window] = rates
+
+        switch.port_table.rates[:] = all_rates
@@ -0,0 +1,156 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""On-disk cache of the static descriptions of switches allowing a restarted process to publish them before the switch
+responds.
+
+The descriptor contains what :meth:`ZyxelAPI.get_switch` reads from the switch: model, firmware, addresses, capabilities
+and the names, types, speeds and MTUs of the ports. It does not contain any port states or counters.
+"""
+
+import os
+import threading
+import time
+
+from .json_file import read_json_file, write_json_file
+from .mac_table import mac_to_bin
+from .types import Capabilities, Port, PortTable, Switch
+
+__all__ = ['DescriptorCache', 'descriptor_matches', 'switch_descriptor', 'switch_from_descriptor']
+
+
+descriptor_version = 1
+"""Version of the format of the descriptors. Descriptors of other versions are ignored."""
+
+_switch_fields = ("model_name", "device_name", "firmware_version", "firmware_build_date", "description", "mac_str",
+                  "ip_addr", "ip_subnet", "ip_gateway", "dhcp_enabled", "max_mtu", "num_ports")
+_capability_fields = ("debug_img", "mgmt_vlan", "https", "websock", "overheat_protect", "ssh")
+_port_fields = ("name", "short_name", "max_speed", "mtu", "is_copper")
+
+
+def switch_descriptor(switch):
+    """Describe the static part of a switch.
+
+    :param Switch switch: The switch returned by :meth:`ZyxelAPI.get_switch`.
+    :return: The descriptor (a JSON-serializable dict).
+    :rtype: dict
+    """
+    descriptor = dict((field, getattr(switch, field)) for field in _switch_fields)
+    descriptor["version"] = descriptor_version
+    descriptor["capabilities"] = dict((field, getattr(switch.capabilities, field)) for field in _capability_fields)
+    descriptor["ports"] = [dict([(field, getattr(port, field)) for field in _port_fields] +
+                                [("enabled", bool(port.status.enabled))]) for port in switch.ports]
+    return descriptor
+
+
+def switch_from_descriptor(descriptor):
+    """Create a switch from its descriptor.
+
+    The port states are unknown (as if the switch was not polled yet).
+
+    :param dict descriptor: The descriptor created by :func:`switch_descriptor`.
+    :return: The switch.
+    :rtype: Switch
+    :raises KeyError: If the descriptor is incomplete.
+    """
+    switch = Switch()
+    for field in _switch_fields:
+        setattr(switch, field, descriptor[field])
+    switch.first_login = False
+    switch.mac_bin = mac_to_bin(switch.mac_str)
+    switch.capabilities = Capabilities()
+    for field in _capability_fields:
+        setattr(switch.capabilities, field, bool(descriptor["capabilities"].get(field, False)))
+    switch.port_table = PortTable(switch.num_ports)
+    switch.ports = []
+    for i, port_descriptor in enumerate(descriptor["ports"][:switch.num_ports]):
+        port = Port(switch.port_table.status(i))
+        port.index = i
+        for field in _port_fields:
+            setattr(port, field, port_descriptor[field])
+        port.alias = port.name
+        port.mac_bin = switch.mac_bin
+        port.mac_str = switch.mac_str
+        port.status.enabled = bool(port_descriptor.get("enabled", True))
+        switch.ports.append(port)
+    if len(switch.ports) != switch.num_ports:
+        raise KeyError("ports")
+    return switch
+
+
+def descriptor_matches(descriptor, switch):
+    """Check whether a cached descriptor describes the given switch.
+
+    A switch replaced by another one or updated to another firmware can have different ports or a different web API.
+
+    :param dict descriptor: The cached descriptor.
+    :param Switch switch: The switch read from the switch.
+    :rtype: bool
+    """
+    return descriptor.get("mac_str") == switch.mac_str and \
+        descriptor.get("firmware_version") == switch.firmware_version and \
+        descriptor.get("num_ports") == switch.num_ports
+
+
+class DescriptorCache(object):
+    """On-disk cache of the static descriptions of switches.
+
+    The cache is a JSON file mapping switch addresses to descriptors (see :func:`switch_descriptor`). One file can be
+    shared by several switches.
+    """
+
+    def __init__(self, path):
+        """
+        :param str path: Path to the cache file. It will be created if it does not exist.
+        """
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def load(self, address):
+        """Load the cached descriptor of a switch.
+
+        :param str address: Address of the switch.
+        :return: The descriptor (with key `time` of its last save) or None if none is cached or it is not usable.
+        :rtype: dict or None
+        """
+        with self._lock:
+            descriptor = self._read().get(address)
+        if not isinstance(descriptor, dict) or descriptor.get("version") != descriptor_version:
+            return None
+        return descriptor
+
+    def save(self, address, switch):
+        """Cache the descriptor of a switch. The file is not rewritten if the descriptor did not change.
+
+        :param str address: Address of the switch.
+        :param Switch switch: The switch read from the switch.
+        :return: Whether the cached descriptor changed.
+        :rtype: bool
+        """
+        descriptor = switch_descriptor(switch)
+        with self._lock:
+            data = self._read()
+            old = data.get(address)
+            if isinstance(old, dict) and dict((k, v) for k, v in old.items() if k != "time") == descriptor:
+                return False
+            descriptor["time"] = time.time()
+            data[address] = descriptor
+            self._write(data)
+        return True
+
+    def clear(self, address):
+        """Remove the cached descriptor of a switch.
+
+        :param str address: Address of the switch.
+        """
+        with self._lock:
+            data = self._read()
+            if address in data:
+                del data[address]
+                self._write(data)
+
+    def _read(self):
+        return read_json_file(self.path)
+
+    def _write(self, data):
+        write_json_file(self.path, data, indent=1, sort_keys=True)
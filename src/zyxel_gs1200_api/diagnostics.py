@@ -0,0 +1,192 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Contents of diagnostic status messages describing a switch and its ports.
+
+The functions return the level, the message and the key-value pairs of a status (the fields of
+`diagnostic_msgs/DiagnosticStatus`), but do not depend on ROS. Static configuration, dynamic port states and traffic
+rates are separate, so that each can be published at its own rate. :class:`ChangeFilter` tells which of the statuses
+changed since they were last published.
+"""
+
+__all__ = ['ChangeFilter', 'ERROR', 'OK', 'STALE', 'WARN', 'port_config_values', 'port_state', 'rates_values',
+           'switch_config_values', 'switch_state']
+
+
+OK = 0
+"""Level of a status without problems (the same as `diagnostic_msgs.msg.DiagnosticStatus.OK`)."""
+WARN = 1
+"""Level of a status with a problem that does not stop the traffic (`DiagnosticStatus.WARN`)."""
+ERROR = 2
+"""Level of a status with a problem stopping the traffic (`DiagnosticStatus.ERROR`)."""
+STALE = 3
+"""Level of a status whose data are too old (`DiagnosticStatus.STALE`)."""
+
+
+def _flag(value):
+    return "True" if value > 0 else "False"
+
+
+def switch_config_values(switch):
+    """Static configuration of a switch.
+
+    :param Switch switch: The switch.
+    :return: Key-value pairs.
+    :rtype: list of tuple
+    """
+    return [
+        ("model", switch.model_name),
+        ("device_name", switch.device_name),
+        ("firmware_version", switch.firmware_version),
+        ("firmware_build_date", switch.firmware_build_date),
+        ("mac", switch.mac_str),
+        ("ip", switch.ip_addr),
+        ("subnet", switch.ip_subnet),
+        ("gateway", switch.ip_gateway),
+        ("dhcp", str(switch.dhcp_enabled)),
+        ("max_mtu", str(switch.max_mtu)),
+        ("num_ports", str(switch.num_ports)),
+    ]
+
+
+def port_config_values(port):
+    """Static configuration of a port.
+
+    :param Port port: The port.
+    :return: Key-value pairs.
+    :rtype: list of tuple
+    """
+    return [
+        ("name", port.name),
+        ("short_name", port.short_name),
+        ("alias", port.alias),
+        ("index", str(port.index + 1)),
+        ("max_speed", str(port.max_speed)),
+        ("mtu", str(port.mtu)),
+        ("copper", str(port.is_copper)),
+        ("mac", port.mac_str),
+    ]
+
+
+def port_state(switch, index, expected_speed=None):
+    """Dynamic state of a port (without packet counters, which change with every poll).
+
+    A disconnected port is an error only if it has an expected speed. A connected port running at a different than the
+    expected speed is a warning. A detected loop or overheat is an error.
+
+    :param Switch switch: The switch.
+    :param int index: Index of the port.
+    :param int expected_speed: Speed the port should run at (in bps). If None, the port may also be disconnected.
+    :return: Tuple (level, message, values), values are key-value pairs.
+    :rtype: tuple
+    """
+    table = switch.port_table
+    connected = table.connected[index]
+    speed = table.speed[index]
+    values = [
+        ("enabled", _flag(table.enabled[index])),
+        ("link", "unknown" if connected < 0 else ("up" if connected > 0 else "down")),
+        ("speed", str(speed if connected > 0 else 0)),
+        ("loop_detected", _flag(table.loop_detected[index])),
+        ("overheat_detected", _flag(table.overheat_detected[index])),
+        ("last_change_time", "%.3f" % (table.last_change_time[index],)),
+        ("counter_discontinuity_time", "%.3f" % (table.last_packet_jump_back_time[index],)),
+    ]
+    if table.overheat_detected[index] > 0:
+        return ERROR, "Overheat detected", values
+    if table.loop_detected[index] > 0:
+        return ERROR, "Loop detected", values
+    if connected < 0:
+        return STALE, "Unknown link state", values
+    if connected == 0:
+        return (ERROR if expected_speed else OK), "Down", values
+    if expected_speed and speed != expected_speed:
+        return WARN, "Wrong speed %i Mbps (expected %i Mbps)" % (speed // 1000000, expected_speed // 1000000), values
+    return OK, "Up, %i Mbps" % (speed // 1000000,), values
+
+
+def switch_state(switch, health="ok", port_levels=()):
+    """Overall state of a switch.
+
+    :param Switch switch: The switch.
+    :param str health: Health of the switch (one of :data:`~zyxel_gs1200_api.resilience.health_states`).
+    :param port_levels: Levels of the states of the ports (see :func:`port_state`). Errors of ports are reported as a
+                        warning of the switch.
+    :type port_levels: list of int
+    :return: Tuple (level, message, values), values are key-value pairs.
+    :rtype: tuple
+    """
+    table = switch.port_table
+    n = switch.num_ports
+    values = [
+        ("health", health),
+        ("ports_up", str(sum(1 for c in table.connected[:n] if c > 0))),
+        ("loop_detected", _flag(max(table.loop_detected[:n]) if n > 0 else 0)),
+        ("overheat_detected", _flag(max(table.overheat_detected[:n]) if n > 0 else 0)),
+    ]
+    if health == "unreachable":
+        return ERROR, "Unreachable", values
+    if health == "stale":
+        return STALE, "Polls failing, data are stale", values
+    problems = [switch.ports[i].short_name for i, level in enumerate(port_levels) if level != OK]
+    if problems:
+        return WARN, "Problems on ports " + ", ".join(problems), values
+    return OK, "OK", values
+
+
+def rates_values(switch, window):
+    """Traffic rates of all ports and their sums.
+
+    The keys are `<short name of the port>/<rate>` and `total/<rate>`, where rate is `rx_bps`, `tx_bps`, `rx_pps` or
+    `tx_pps`.
+
+    :param Switch switch: The switch updated with a :class:`~zyxel_gs1200_api.counters.CounterEngine` computing rates.
+    :param float window: The window of the rates (one of the windows of the counter engine).
+    :return: Key-value pairs.
+    :rtype: list of tuple
+    """
+    fields = ("rx_bps", "tx_bps", "rx_pps", "tx_pps")
+    totals = [0.0] * len(fields)
+    values = []
+    for port in switch.ports:
+        rates = port.status.rates.get(window)
+        if rates is None:
+            continue
+        for i, field in enumerate(fields):
+            value = getattr(rates, field)
+            totals[i] += value
+            values.append(("%s/%s" % (port.short_name, field), "%.1f" % (value,)))
+    return [("total/%s" % (field,), "%.1f" % (total,)) for field, total in zip(fields, totals)] + values
+
+
+class ChangeFilter(object):
+    """Remembers the last published contents under a key and tells whether new contents differ from them."""
+
+    def __init__(self):
+        self._last = {}
+        self.num_changed = 0
+        """Number of contents that differed from the last published ones."""
+        self.num_unchanged = 0
+        """Number of contents that were the same as the last published ones."""
+
+    def changed(self, key, contents):
+        """Check whether the contents changed since the last call with the same key and remember them.
+
+        :param key: Identifier of the published item (e.g. a tuple of switch name and port index).
+        :param contents: The contents (any value that can be compared with `==`).
+        :return: True if the contents differ from the last ones (or the key is new).
+        :rtype: bool
+        """
+        if key in self._last and self._last[key] == contents:
+            self.num_unchanged += 1
+            return False
+        self._last[key] = contents
+        self.num_changed += 1
+        return True
+
+    def forget(self, key):
+        """Forget the last contents, so that the next call of :meth:`changed` with this key returns True.
+
+        :param key: Identifier of the published item.
+        """
+        self._last.pop(key, None)
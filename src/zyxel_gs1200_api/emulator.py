@@ -0,0 +1,830 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Emulator of the web API of Zyxel (X)GS-1200 series switches.
+
+The emulator is an HTTP server hosting any number of virtual switches. It speaks the same `cgi/get.cgi` and
+`cgi/set.cgi` protocol as the real switches, including the RSA login flow, checking of the `bj4` request signatures,
+limited number of sessions and session expiry. It allows testing and load-testing :class:`~zyxel_gs1200_api.WebBackend`
+and fleet polling without any hardware::
+
+    python -m zyxel_gs1200_api.emulator --switches 20 --latency 0.05 --error-rate 0.01
+
+Each virtual switch is available at its own path prefix, e.g. `http://127.0.0.1:8080/sw0`, which is directly usable
+as the address of :class:`~zyxel_gs1200_api.ZyxelAPI`.
+
+:class:`ConsoleEmulator` provides the serial consoles of virtual switches on pseudo-terminals for testing
+:class:`~zyxel_gs1200_api.serial_backend.SerialBackend` (`--consoles` on the command line).
+"""
+
+from __future__ import print_function
+
+import argparse
+import base64
+import hashlib
+import json
+import os
+import random
+import select
+import threading
+import time
+import uuid
+
+import rsa
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = tty = None
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlsplit
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlsplit
+
+from .serial_backend import console_port_types
+from .websocket_backend import OP_CLOSE, OP_PING, OP_PONG, OP_TEXT, accept_key, decode_frame, encode_frame, \
+    merge_update
+
+__all__ = ['ConsoleEmulator', 'EmulatorServer', 'VirtualConsole', 'VirtualSwitch', 'VirtualSwitchSessions']
+
+
+class VirtualSwitch(object):
+    """Data model of a virtual switch generating the `data` fields of the web API responses.
+
+    Packet counters of connected ports grow with time (and wrap around at 32 bits like on the real switches). Links can
+    randomly go up and down.
+    """
+
+    def __init__(self, num_ports=12, name="virtual-sw", mac="00:E0:4C:00:00:01", ip="192.168.1.3",
+                 num_mac_entries=64, max_pps=100000, flap_probability=0.0, seed=0, websock=True):
+        """
+        :param int num_ports: Number of ports of the switch.
+        :param str name: Device name of the switch.
+        :param str mac: MAC address of the switch.
+        :param str ip: IP address of the switch.
+        :param int num_mac_entries: Number of entries of the MAC address table.
+        :param int max_pps: Maximum packet rate of each port in each direction.
+        :param float flap_probability: Probability that a port changes its link state between two reads of the link
+                                       data.
+        :param int seed: Seed of the random generator.
+        :param bool websock: Whether the switch has the `websock` capability (pushes its data over a WebSocket).
+        """
+        self.num_ports = num_ports
+        self.name = name
+        self.mac = mac
+        self.ip = ip
+        self.num_mac_entries = num_mac_entries
+        self.max_pps = max_pps
+        self.flap_probability = flap_probability
+        self.websock = websock
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        # Copper gigabit ports with a few 10G uplinks at the end
+        self._port_types = [2] * max(num_ports - 2, 0) + [6] * min(num_ports, 2)
+        self._connected = [i % 3 != 0 for i in range(num_ports)]
+        self._stats = [[0, 0] for _ in range(num_ports)]
+        self._pps = [[self._random.randint(0, max_pps), self._random.randint(0, max_pps)] for _ in range(num_ports)]
+        self._last_advance_time = time.time()
+
+    def advance(self, now=None):
+        """Let the counters grow according to the time elapsed since the last call and randomly flap the links.
+
+        :param float now: Current time. If None, :func:`time.time` is used.
+        """
+        if now is None:
+            now = time.time()
+        with self._lock:
+            dt = max(now - self._last_advance_time, 0.0)
+            self._last_advance_time = now
+            for i in range(self.num_ports):
+                if self.flap_probability > 0 and self._random.random() < self.flap_probability:
+                    self._connected[i] = not self._connected[i]
+                if self._connected[i]:
+                    for direction in (0, 1):
+                        self._stats[i][direction] = int(self._stats[i][direction] + self._pps[i][direction] * dt) \
+                            % 2 ** 32
+
+    def _sys_data(self):
+        return {
+            'Max_port': self.num_ports,
+            'model_name': 'XGS1210-%i' % (self.num_ports,),
+            'sys_dev_name': self.name,
+            'sys_fmw_ver': 'V1.00(ABTY.6)C0',
+            'sys_bld_date': 'Aug 19 2022 - 17:18:42',
+            'sys_MAC': self.mac,
+            'sys_IP': self.ip,
+            'sys_sbnt_msk': '255.255.255.0',
+            'sys_gateway': '0.0.0.0',
+            'sys_dhcp_state': '0',
+        }
+
+    def get_data(self, cmd):
+        """Generate the `data` field of the response to the given command.
+
+        :param str cmd: The command.
+        :return: The data or None if the command is not known.
+        :rtype: dict
+        """
+        if cmd == "home_systemData":
+            data = {'loop_status': ['Normal'] * self.num_ports, 'loop': 'Normal'}
+            data.update(self._sys_data())
+            return data
+        elif cmd == "home_linkData":
+            self.advance()
+            with self._lock:
+                return {
+                    'portstatus': ['Up' if c else 'Down' for c in self._connected],
+                    'speed': [('10 Gbps' if t == 6 else '1 Gbps') if c else 'auto'
+                              for t, c in zip(self._port_types, self._connected)],
+                    'Stats': [list(s) for s in self._stats],
+                }
+        elif cmd == "port_portInfo":
+            return {
+                'portType': self._port_types,
+                'isCopper': [1 if t == 2 else 0 for t in self._port_types],
+                'portSpeed': [255] * self.num_ports,
+                'portState': 2 ** self.num_ports - 1,
+            }
+        elif cmd == "home_main":
+            data = {
+                'sys_first_login': '0',
+                'capability': {'debug_img': 0, 'mgmt_vlan': 1, 'https': 1, 'websock': int(self.websock),
+                               'overheat_protect': 0},
+            }
+            data.update(self._sys_data())
+            return data
+        elif cmd == "mac_macTable":
+            return {'macTable': [
+                {'mac': '3C:52:82:%02X:%02X:%02X' % (i >> 16 & 0xff, i >> 8 & 0xff, i & 0xff), 'vid': 1,
+                 'port': 1 + i % self.num_ports, 'type': 'dynamic'} for i in range(self.num_mac_entries)]}
+        return None
+
+
+class VirtualSwitchSessions(object):
+    """Login and session management of a virtual switch (the part of the web API protocol around the data)."""
+
+    def __init__(self, password, max_sessions=4, session_timeout=300.0, key_bits=1024):
+        """
+        :param str password: The administration password.
+        :param int max_sessions: Maximum number of concurrently logged in sessions.
+        :param float session_timeout: Sessions unused for this time expire (in seconds).
+        :param int key_bits: Size of the RSA key used for encrypting the password.
+        """
+        self.password = password
+        self.max_sessions = max_sessions
+        self.session_timeout = session_timeout
+        self.key_bits = key_bits
+        self.num_logins = 0
+        """Number of successful logins."""
+        self.num_rejected_logins = 0
+        """Number of logins rejected because of a wrong password or too many sessions."""
+        self.num_expired_requests = 0
+        """Number of requests answered by the "logout" response."""
+        self._keys = None
+        self._auth_ids = {}  # authId -> whether the password was correct
+        self._sessions = {}  # session ID -> time of the last request
+        self._lock = threading.Lock()
+
+    @property
+    def modulus(self):
+        """Hex representation of the RSA modulus (the key is generated on first use)."""
+        with self._lock:
+            if self._keys is None:
+                self._keys = rsa.newkeys(self.key_bits)
+            return "%x" % (self._keys[0].n,)
+
+    def authenticate(self, enc_pass):
+        """Check the encrypted password of the `home_loginAuth` request.
+
+        :param str enc_pass: The encrypted password (base64 with `+` and `=` already unquoted).
+        :return: The `authId` to be passed to `home_loginStatus`.
+        :rtype: str
+        """
+        self.modulus  # make sure the key exists
+        try:
+            password = rsa.decrypt(base64.b64decode(enc_pass), self._keys[1]).decode("ascii")
+        except (rsa.DecryptionError, ValueError, TypeError):
+            password = None
+        auth_id = uuid.uuid4().hex
+        with self._lock:
+            self._auth_ids[auth_id] = password == self.password
+        return auth_id
+
+    def login(self, auth_id):
+        """Finish the login started by :meth:`authenticate`.
+
+        :param str auth_id: The `authId` returned by :meth:`authenticate`.
+        :return: Tuple (status, session ID). Session ID is None if the login failed.
+        :rtype: tuple
+        """
+        with self._lock:
+            self._expire()
+            password_ok = self._auth_ids.pop(auth_id, None)
+            if not password_ok:
+                self.num_rejected_logins += 1
+                return "errLoginPwdInvalid", None
+            if len(self._sessions) >= self.max_sessions:
+                self.num_rejected_logins += 1
+                return "errLoginMaxSession", None
+            session_id = uuid.uuid4().hex
+            self._sessions[session_id] = time.time()
+            self.num_logins += 1
+            return "ok", session_id
+
+    def check(self, session_id):
+        """Check whether the session is valid and mark it as used.
+
+        :param str session_id: The session ID from the cookie.
+        :rtype: bool
+        """
+        with self._lock:
+            self._expire()
+            if session_id not in self._sessions:
+                self.num_expired_requests += 1
+                return False
+            self._sessions[session_id] = time.time()
+            return True
+
+    def logout(self, session_id):
+        """End the session.
+
+        :param str session_id: The session ID from the cookie.
+        """
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def expire_all(self):
+        """Expire all sessions immediately (as if the switch rebooted or the sessions timed out)."""
+        with self._lock:
+            self._sessions.clear()
+
+    @property
+    def num_sessions(self):
+        """Number of currently valid sessions."""
+        with self._lock:
+            self._expire()
+            return len(self._sessions)
+
+    def _expire(self):
+        now = time.time()
+        for session_id in [s for s, t in self._sessions.items() if now - t > self.session_timeout]:
+            del self._sessions[session_id]
+
+
+def _check_bj4(query):
+    """Check the `bj4` signature computed by :func:`~zyxel_gs1200_api.web_backend.formalize_request`."""
+    index = query.rfind("&bj4=")
+    if index < 0:
+        return False
+    digest = hashlib.md5(query[:index].encode("utf8")).hexdigest()
+    return query[index + len("&bj4="):] == digest
+
+
+def _parse_form_body(body):
+    """Parse the JSON body of login requests (one key containing form-encoded fields)."""
+    try:
+        data = json.loads(body.decode("utf8"))
+        return dict((k, v[0]) for key in data for k, v in parse_qs(key, keep_blank_values=True).items())
+    except (ValueError, AttributeError):
+        return {}
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    server_version = "Zyxel-emulator/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def do_GET(self):
+        if self.headers.get("Upgrade", "").lower() == "websocket":
+            self._handle_websocket()
+        else:
+            self._handle("get.cgi")
+
+    def do_POST(self):
+        self._handle("set.cgi")
+
+    def _send(self, status, body=b"", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for header in headers:
+            self.send_header(*header)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data, headers=()):
+        self._send(200, json.dumps(data).encode("utf8"), headers)
+
+    def _session_id(self):
+        for cookie in self.headers.get("Cookie", "").split(";"):
+            key, _, value = cookie.strip().partition("=")
+            if key == "HTTP_SESSID":
+                return value
+        return None
+
+    def _handle_websocket(self):
+        """Push the data of the subscribed commands: first the full data, then only the changed items."""
+        server = self.server
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        if len(parts) != 2 or parts[0] not in server.switches or parts[1] != "ws" or \
+                not server.switches[parts[0]][0].websock:
+            self._send(404)
+            return
+        switch, sessions = server.switches[parts[0]]
+        session_id = self._session_id()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept_key(self.headers.get("Sec-WebSocket-Key", "")))
+        self.end_headers()
+        self.close_connection = True
+
+        # The client waits for the handshake response, so nothing is left in the buffer of rfile
+        connection = self.connection
+        buffer = [b""]
+
+        def read(n):
+            data = buffer[0]
+            while len(data) < n:
+                chunk = connection.recv(4096)
+                if len(chunk) == 0:
+                    raise EOFError()
+                data += chunk
+            buffer[0] = data[n:]
+            return data[:n]
+
+        def send(message):
+            self.wfile.write(encode_frame(OP_TEXT, json.dumps(message).encode("utf8"), mask=False))
+
+        topics = ()
+        sent = {}  # command -> the data known by the client
+        last_counters_time = 0.0
+        try:
+            while not server.stopping:
+                if len(buffer[0]) > 0 or len(select.select([connection], [], [], server.push_interval)[0]) > 0:
+                    opcode, payload = decode_frame(read)
+                    if opcode == OP_CLOSE:
+                        self.wfile.write(encode_frame(OP_CLOSE, b"", mask=False))
+                        return
+                    elif opcode == OP_PING:
+                        self.wfile.write(encode_frame(OP_PONG, payload, mask=False))
+                    elif opcode == OP_TEXT:
+                        message = json.loads(payload.decode("utf8"))
+                        if message.get("cmd") == "subscribe":
+                            topics = [t for t in message.get("topics", ()) if switch.get_data(t) is not None]
+                            sent = {}
+                if not sessions.check(session_id):
+                    send({"logout": 1})
+                    return
+                send_counters = time.time() - last_counters_time >= server.counter_push_interval
+                if send_counters:
+                    last_counters_time = time.time()
+                for cmd in topics:
+                    data = switch.get_data(cmd)
+                    if cmd not in sent:
+                        send({"cmd": cmd, "data": data})
+                        sent[cmd] = data
+                        continue
+                    update = {}
+                    for key, value in data.items():
+                        old = sent[cmd].get(key)
+                        if key == "Stats" and not send_counters:
+                            continue
+                        if isinstance(value, list) and isinstance(old, list) and len(value) == len(old):
+                            changes = dict((str(i), v) for i, (o, v) in enumerate(zip(old, value)) if o != v)
+                            if len(changes) > 0:
+                                update[key] = changes
+                        elif value != old:
+                            update[key] = value
+                    if len(update) > 0:
+                        send({"cmd": cmd, "update": update})
+                        merge_update(sent[cmd], update)
+        except (EOFError, IOError, OSError, ValueError):
+            pass
+
+    def _handle(self, expected_cgi):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        body = self.rfile.read(length) if length > 0 else b""
+
+        url = urlsplit(self.path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 3 or parts[0] not in server.switches or parts[1] != "cgi" or parts[2] != expected_cgi:
+            self._send(404)
+            return
+        name = parts[0]
+        switch, sessions = server.switches[name]
+
+        if server.latency > 0:
+            time.sleep(server.latency * server.random.uniform(0.5, 1.5))
+        if server.error_rate > 0 and server.random.random() < server.error_rate:
+            self._send(500)
+            return
+
+        if not _check_bj4(url.query):
+            self._send(403)
+            return
+        cmd = parse_qs(url.query).get("cmd", [""])[0]
+
+        session_id = self._session_id()
+        if cmd == "home_loginInfo":
+            self._send_json({"data": {"modulus": sessions.modulus}})
+        elif cmd == "home_loginAuth":
+            form = _parse_form_body(body)
+            self._send_json({"authId": sessions.authenticate(form.get("password", "")), "data": {}})
+        elif cmd == "home_loginStatus":
+            form = _parse_form_body(body)
+            status, new_session_id = sessions.login(form.get("authId", ""))
+            headers = []
+            if new_session_id is not None:
+                headers.append(("Set-Cookie", "HTTP_SESSID=%s; path=/%s" % (new_session_id, name)))
+            self._send_json({"data": {"status": status}}, headers)
+        elif not sessions.check(session_id):
+            self._send_json({"logout": 1})
+        elif cmd == "home_logout":
+            sessions.logout(session_id)
+            self._send_json({"data": {}})
+        elif expected_cgi == "set.cgi":
+            self._send_json({"data": {}})
+        else:
+            data = switch.get_data(cmd)
+            if data is None:
+                self._send(200, b"\n")  # the real switches return an empty page for unknown commands
+            else:
+                self._send_json({"data": data})
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class EmulatorServer(object):
+    """HTTP server hosting virtual switches with the web API of Zyxel (X)GS-1200 series switches.
+
+    Switch `i` is available at address `http://<host>:<port>/sw<i>`.
+    """
+
+    def __init__(self, num_switches=1, host="127.0.0.1", port=0, password="admin", num_ports=12, latency=0.0,
+                 error_rate=0.0, max_sessions=4, session_timeout=300.0, flap_probability=0.0, key_bits=1024,
+                 verbose=False, websock=True, push_interval=0.1, counter_push_interval=1.0):
+        """
+        :param int num_switches: Number of virtual switches.
+        :param str host: Listening address.
+        :param int port: Listening port. Zero selects a free port.
+        :param str password: Administration password of all switches.
+        :param int num_ports: Number of ports of each switch.
+        :param float latency: Average latency of each request (in seconds). The real latency is random between 50 %
+                              and 150 % of this value.
+        :param float error_rate: Probability of answering a request with HTTP error 500.
+        :param int max_sessions: Maximum number of concurrently logged in sessions of each switch.
+        :param float session_timeout: Sessions unused for this time expire (in seconds).
+        :param float flap_probability: Probability that a port changes its link state between two reads.
+        :param int key_bits: Size of the RSA keys.
+        :param bool verbose: Whether to log all requests.
+        :param bool websock: Whether the switches have the `websock` capability and push their data over WebSockets
+                             at `<address>/ws`.
+        :param float push_interval: How often the switches check for changes of the pushed data (in seconds).
+        :param float counter_push_interval: Changed packet counters are pushed at most this often (in seconds).
+        """
+        self._server = _ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.verbose = verbose
+        self._server.latency = latency
+        self._server.error_rate = error_rate
+        self._server.random = random.Random()
+        self._server.push_interval = push_interval
+        self._server.counter_push_interval = counter_push_interval
+        self._server.stopping = False
+        self._server.switches = {}
+        for i in range(num_switches):
+            switch = VirtualSwitch(num_ports, name="virtual-sw%i" % (i,),
+                                   mac="00:E0:4C:00:%02X:%02X" % (i >> 8 & 0xff, i & 0xff),
+                                   ip="192.168.%i.%i" % (1 + i // 250, 3 + i % 250),
+                                   flap_probability=flap_probability, seed=i, websock=websock)
+            sessions = VirtualSwitchSessions(password, max_sessions, session_timeout, key_bits)
+            self._server.switches["sw%i" % (i,)] = (switch, sessions)
+        self._thread = None
+
+    @property
+    def port(self):
+        """The listening port."""
+        return self._server.server_address[1]
+
+    @property
+    def addresses(self):
+        """Addresses of the virtual switches usable by :class:`~zyxel_gs1200_api.ZyxelAPI`.
+        :rtype: list
+        """
+        host = self._server.server_address[0]
+        return ["http://%s:%i/sw%i" % (host, self.port, i) for i in range(len(self._server.switches))]
+
+    @property
+    def switches(self):
+        """List of tuples (:class:`VirtualSwitch`, :class:`VirtualSwitchSessions`) of all switches."""
+        return [self._server.switches["sw%i" % (i,)] for i in range(len(self._server.switches))]
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve in the calling thread until :meth:`stop` is called."""
+        self._server.serve_forever()
+
+    def stop(self):
+        """Stop the server."""
+        self._server.stopping = True
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class VirtualConsole(object):
+    """Command line of the serial console of a virtual switch.
+
+    It understands the `show` commands used by :class:`~zyxel_gs1200_api.serial_backend.SerialBackend`. Input lines are
+    echoed and the output of each command ends with the prompt, like on a terminal.
+    """
+
+    def __init__(self, switch, password, session_timeout=300.0):
+        """
+        :param VirtualSwitch switch: The switch whose data are shown.
+        :param str password: The console password.
+        :param float session_timeout: The console logs out after this time without input (in seconds).
+        """
+        self.switch = switch
+        self.password = password
+        self.session_timeout = session_timeout
+        self.logged_in = False
+        self.num_logins = 0
+        """Number of successful logins."""
+        self.num_commands = 0
+        """Number of executed commands."""
+        self._last_input_time = 0.0
+
+    @property
+    def prompt(self):
+        """The prompt shown after the output of the last command."""
+        return self.switch.name + "# " if self.logged_in else "Password: "
+
+    def handle(self, line, now=None):
+        """Process one input line.
+
+        :param str line: The line without the line ending.
+        :param float now: Current time. If None, :func:`time.time` is used.
+        :return: Tuple (output, discard). Output is the text to be sent (including the next prompt). Discard tells
+                 that the input typed ahead should be discarded (after the session timed out).
+        :rtype: tuple
+        """
+        if now is None:
+            now = time.time()
+        timed_out = now - self._last_input_time > self.session_timeout
+        self._last_input_time = now
+        if not self.logged_in:
+            if len(line) == 0:
+                return "\r\n" + self.prompt, False
+            if line != self.password:
+                return "\r\n% Invalid password\r\n" + self.prompt, False
+            self.logged_in = True
+            self.num_logins += 1
+            return "\r\n" + self.prompt, False
+        if timed_out:
+            self.logged_in = False
+            return "\r\nSession timed out\r\n" + self.prompt, True
+
+        command = " ".join(line.split())
+        lines = [line]
+        if command in ("exit", "logout"):
+            self.logged_in = False
+            return "\r\n".join(lines) + "\r\n" + self.prompt, False
+        elif command == "show system-information":
+            lines.extend(self._system_information())
+        elif command == "show interfaces config":
+            lines.extend(self._interfaces_config())
+        elif command == "show interfaces status":
+            lines.extend(self._interfaces_status())
+        elif command == "show loop-guard":
+            lines.extend(self._loop_guard())
+        elif command == "show mac address-table":
+            lines.extend(self._mac_address_table())
+        elif command not in ("", "terminal length 0"):
+            lines.append("% Invalid command: " + command)
+        if len(command) > 0:
+            self.num_commands += 1
+        return "\r\n".join(lines) + "\r\n" + self.prompt, False
+
+    def _system_information(self):
+        data = self.switch.get_data("home_main")
+        return [
+            "Product Model        : " + data["model_name"],
+            "System Name          : " + data["sys_dev_name"],
+            "Firmware Version     : " + data["sys_fmw_ver"],
+            "Build Date           : " + data["sys_bld_date"],
+            "MAC Address          : " + data["sys_MAC"],
+            "IP Address           : " + data["sys_IP"],
+            "Subnet Mask          : " + data["sys_sbnt_msk"],
+            "Default Gateway      : " + data["sys_gateway"],
+            "DHCP Client          : " + ("Enabled" if data["sys_dhcp_state"] != "0" else "Disabled"),
+            "Number of Ports      : %i" % (data["Max_port"],),
+            "Capabilities         : " + " ".join(sorted(c for c, v in data["capability"].items() if v)),
+        ]
+
+    def _interfaces_config(self):
+        data = self.switch.get_data("port_portInfo")
+        return ["Port  Type  Media   State", "----  ----  ------  --------"] + [
+            "%-4i  %-4s  %-6s  %s" % (i + 1, console_port_types[t], "copper" if c else "fiber",
+                                      "Enabled" if (data["portState"] >> i) & 1 else "Disabled")
+            for i, (t, c) in enumerate(zip(data["portType"], data["isCopper"]))]
+
+    def _interfaces_status(self):
+        data = self.switch.get_data("home_linkData")
+        return ["Port  Link  Speed     Overheat  Rx Packets  Tx Packets",
+                "----  ----  --------  --------  ----------  ----------"] + [
+            "%-4i  %-4s  %-8s  %-8s  %10i  %10i" % (i + 1, s, speed if s == "Up" else "-", "Normal", rx, tx)
+            for i, (s, speed, (rx, tx)) in enumerate(zip(data["portstatus"], data["speed"], data["Stats"]))]
+
+    def _loop_guard(self):
+        data = self.switch.get_data("home_systemData")
+        return ["Port  Loop Status", "----  -----------"] + [
+            "%-4i  %s" % (i + 1, status) for i, status in enumerate(data["loop_status"])]
+
+    def _mac_address_table(self):
+        data = self.switch.get_data("mac_macTable")
+        return ["MAC Address        VLAN  Port  Type", "-----------------  ----  ----  -------"] + [
+            "%-17s  %-4i  %-4i  %s" % (e["mac"], e["vid"], e["port"], e["type"]) for e in data["macTable"]]
+
+
+class ConsoleEmulator(object):
+    """Serial consoles of virtual switches on pseudo-terminals.
+
+    The paths of the terminals in :attr:`addresses` are directly usable as addresses of
+    :class:`~zyxel_gs1200_api.ZyxelAPI`. Each console is served by its own thread.
+    """
+
+    def __init__(self, num_switches=1, password="admin", num_ports=12, latency=0.0, session_timeout=300.0,
+                 flap_probability=0.0, baudrate=0, switches=None):
+        """
+        :param int num_switches: Number of virtual switches (ignored if `switches` are given).
+        :param str password: Console password of all switches.
+        :param int num_ports: Number of ports of each switch (ignored if `switches` are given).
+        :param float latency: Delay before a console reacts to input that arrived while it was idle (in seconds). It
+                              models the round trip of USB serial adapters, which is paid once by pipelined commands.
+        :param float session_timeout: The consoles log out after this time without input (in seconds).
+        :param float flap_probability: Probability that a port changes its link state between two reads.
+        :param int baudrate: If nonzero, the output is slowed down to the throughput of a serial line of this speed.
+        :param switches: The virtual switches (e.g. those of an :class:`EmulatorServer`). If None, new ones are
+                         created.
+        :type switches: list of VirtualSwitch
+        """
+        if termios is None:
+            raise NotImplementedError("Console emulator requires a POSIX system")
+        if switches is None:
+            switches = [VirtualSwitch(num_ports, name="virtual-sw%i" % (i,),
+                                      mac="00:E0:4C:00:%02X:%02X" % (i >> 8 & 0xff, i & 0xff),
+                                      ip="192.168.%i.%i" % (1 + i // 250, 3 + i % 250),
+                                      flap_probability=flap_probability, seed=i) for i in range(num_switches)]
+        self.latency = latency
+        self.baudrate = baudrate
+        self.consoles = [VirtualConsole(switch, password, session_timeout) for switch in switches]
+        """The consoles of the switches."""
+        self._terminals = []  # (master fd, slave fd) of each console
+        for _ in switches:
+            master, slave = os.openpty()
+            # The console does its own echo, the line discipline must not change the data
+            tty.setraw(slave)
+            self._terminals.append((master, slave))
+        self._stop_pipe = os.pipe()
+        self._threads = []
+
+    @property
+    def addresses(self):
+        """Paths of the terminals of the consoles usable by :class:`~zyxel_gs1200_api.ZyxelAPI`.
+        :rtype: list
+        """
+        return [os.ttyname(slave) for _, slave in self._terminals]
+
+    def start(self):
+        """Start serving in background threads."""
+        for console, (master, _) in zip(self.consoles, self._terminals):
+            thread = threading.Thread(target=self._serve, args=(console, master))
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """Stop serving and close the terminals."""
+        os.write(self._stop_pipe[1], b"x")
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for master, slave in self._terminals:
+            os.close(master)
+            os.close(slave)
+        self._terminals = []
+        for fd in self._stop_pipe:
+            os.close(fd)
+
+    def _read_available(self, master):
+        data = b""
+        while len(select.select([master], [], [], 0.0)[0]) > 0:
+            data += os.read(master, 4096)
+        return data
+
+    def _serve(self, console, master):
+        buffer = b""
+        while True:
+            if self._stop_pipe[0] in select.select([master, self._stop_pipe[0]], [], [])[0]:
+                return
+            if self.latency > 0 and len(buffer) == 0:
+                time.sleep(self.latency)
+            buffer += self._read_available(master)
+            lines = buffer.replace(b"\r\n", b"\r").replace(b"\n", b"\r").split(b"\r")
+            buffer = lines.pop()
+            for line in lines:
+                output, discard = console.handle(line.decode("ascii", "replace"))
+                self._write(master, output.encode("ascii"))
+                if discard:
+                    self._read_available(master)
+                    buffer = b""
+                    break
+
+    def _write(self, master, data):
+        if self.baudrate > 0:
+            # 10 bits per byte with the start and stop bits
+            time.sleep(len(data) * 10.0 / self.baudrate)
+        while len(data) > 0:
+            data = data[os.write(master, data):]
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Emulator of the web API of Zyxel (X)GS-1200 series switches.")
+    parser.add_argument("--switches", type=int, default=1, help="Number of virtual switches.")
+    parser.add_argument("--host", default="127.0.0.1", help="Listening address.")
+    parser.add_argument("--port", type=int, default=8080, help="Listening port.")
+    parser.add_argument("--password", default="admin", help="Administration password of the switches.")
+    parser.add_argument("--ports", type=int, default=12, help="Number of ports of each switch.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Average latency of requests in seconds.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability of HTTP 500 responses.")
+    parser.add_argument("--max-sessions", type=int, default=4, help="Maximum number of sessions of each switch.")
+    parser.add_argument("--session-timeout", type=float, default=300.0, help="Session expiry time in seconds.")
+    parser.add_argument("--flap-probability", type=float, default=0.0,
+                        help="Probability that a port changes its link state between two reads.")
+    parser.add_argument("--no-websock", action="store_true",
+                        help="Emulate switches without the websock capability (no pushed updates).")
+    parser.add_argument("--push-interval", type=float, default=0.1,
+                        help="How often the switches push changed data over WebSockets (in seconds).")
+    parser.add_argument("--consoles", action="store_true",
+                        help="Also emulate the serial consoles of the switches on pseudo-terminals.")
+    parser.add_argument("--verbose", action="store_true", help="Log all requests.")
+    args = parser.parse_args(argv)
+
+    server = EmulatorServer(args.switches, args.host, args.port, args.password, args.ports, args.latency,
+                            args.error_rate, args.max_sessions, args.session_timeout, args.flap_probability,
+                            verbose=args.verbose, websock=not args.no_websock, push_interval=args.push_interval)
+    print("Emulating %i switches with password '%s':" % (args.switches, args.password))
+    for address in server.addresses:
+        print("  " + address)
+    consoles = None
+    if args.consoles:
+        consoles = ConsoleEmulator(password=args.password, latency=args.latency,
+                                   session_timeout=args.session_timeout,
+                                   switches=[switch for switch, _ in server.switches]).start()
+        print("Serial consoles:")
+        for address in consoles.addresses:
+            print("  " + address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if consoles is not None:
+            consoles.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Concurrent polling of a fleet of switches from a single process."""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .instrumentation import no_timer
+
+__all__ = ['Fleet', 'FleetMember', 'OnDemandPolling', 'PollStatistics']
+
+
+class PollStatistics(object):
+    """Statistics of polling a single switch."""
+
+    def __init__(self):
+        self.num_polls = 0
+        """Number of finished polls (both successful and failed)."""
+        self.num_failures = 0
+        """Number of failed polls."""
+        self.num_skipped = 0
+        """Number of polls that were not started because the previous poll was still running."""
+        self.consecutive_failures = 0
+        """Number of failed polls since the last successful one."""
+        self.last_duration = 0.0
+        """Duration of the last poll in seconds."""
+        self.max_duration = 0.0
+        """Maximum duration of a poll in seconds."""
+        self.total_duration = 0.0
+        """Sum of durations of all polls in seconds."""
+        self.last_success_time = 0.0
+        """Time of the end of the last successful poll."""
+        self.last_error = None
+        """The exception that caused the last failed poll (or None)."""
+
+    @property
+    def avg_duration(self):
+        """Average duration of a poll in seconds."""
+        return self.total_duration / self.num_polls if self.num_polls > 0 else 0.0
+
+    def record(self, duration, error=None):
+        """Record a finished poll.
+
+        :param float duration: Duration of the poll in seconds.
+        :param Exception error: The exception that made the poll fail (None if the poll was successful).
+        """
+        self.num_polls += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        self.total_duration += duration
+        if error is None:
+            self.consecutive_failures = 0
+            self.last_success_time = time.time()
+        else:
+            self.num_failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+
+    def __str__(self):
+        return "polls %i, failures %i (%i consecutive), skipped %i, latency last %.3f s, avg %.3f s, max %.3f s" % (
+            self.num_polls, self.num_failures, self.consecutive_failures, self.num_skipped,
+            self.last_duration, self.avg_duration, self.max_duration)
+
+
+class FleetMember(object):
+    """One switch of the fleet."""
+
+    def __init__(self, name, api, user_data=None, scheduler=None, breaker=None):
+        """
+        :param str name: Unique name of the switch in the fleet.
+        :param ZyxelAPI api: The API connected to the switch.
+        :param user_data: Arbitrary data associated with the switch by the user of the fleet.
+        :param PollScheduler scheduler: If set, the data sources of the switch are polled according to this scheduler.
+        :param CircuitBreaker breaker: If set, the switch is not polled while this circuit breaker is open.
+        """
+        self.name = name
+        """Unique name of the switch in the fleet."""
+        self.api = api
+        """The API connected to the switch."""
+        self.user_data = user_data
+        """Arbitrary data associated with the switch by the user of the fleet."""
+        self.switch = None
+        """The switch instance (None until the first successful connection)."""
+        self.stats = PollStatistics()
+        """Statistics of polling this switch."""
+        self.logged_in = False
+        """Whether the API has been logged in."""
+        self.mac_table_diff = None
+        """Changes of the MAC table found by the last poll (None if the MAC table was not updated)."""
+        self.mac_table_error = None
+        """Error of the MAC table update of the last poll (it does not make the poll fail)."""
+        self.poll_start_time = 0.0
+        """Time when the last poll started (the data read by the poll are not older than this)."""
+        self.scheduler = scheduler
+        """The scheduler of polls of the individual data sources (None if everything is polled each time)."""
+        self.polled_sources = set()
+        """Data sources polled by the last poll."""
+        self.changed_sources = set()
+        """Data sources whose data changed during the last poll."""
+        self.breaker = breaker
+        """The circuit breaker stopping polls of an unreachable switch (None if the switch is always polled)."""
+        self._future = None
+
+    @property
+    def busy(self):
+        """Whether a poll of this switch is currently running."""
+        return self._future is not None and not self._future.done()
+
+    @property
+    def reachable(self):
+        """Whether the switch may be polled now (False while its circuit breaker is open)."""
+        return self.breaker is None or self.breaker.available()
+
+    def health(self, stale_timeout, now=None):
+        """Return the health of the switch (one of :data:`~zyxel_gs1200_api.resilience.health_states`).
+
+        :param float stale_timeout: The data are stale if the polls are failing and the last successful poll is older
+                                    than this (in seconds).
+        :param float now: Current time (:func:`time.time` if None).
+        :rtype: str
+        """
+        if now is None:
+            now = time.time()
+        if self.breaker is not None and not self.breaker.available(now):
+            return "unreachable"
+        if self.stats.consecutive_failures > 0 and now - self.stats.last_success_time > stale_timeout:
+            return "stale"
+        return "ok"
+
+
+class Fleet(object):
+    """Concurrent polling of a fleet of switches using a bounded pool of worker threads.
+
+    Each poll of each switch runs as a separate job in the pool. A switch whose previous poll has not finished yet is
+    skipped, so a slow or unreachable switch does not hold up the other switches. A switch with an open circuit breaker
+    is not polled at all until the breaker allows a trial poll.
+
+    The jobs only talk to the switches. Processing of the results (e.g. publishing the data) should happen in the
+    thread calling :meth:`collect`.
+    """
+
+    def __init__(self, max_workers=8, instrumentation=None, on_finished=None):
+        """
+        :param int max_workers: Maximum number of switches polled in parallel.
+        :param Instrumentation instrumentation: If set, durations of the polls (`poll.total`) and their phases
+                                                (`poll.login`, `poll.connect`, `poll.update`, `poll.mac_table`) are
+                                                recorded here.
+        :param on_finished: If set, this callable is called without arguments from the worker thread after each poll
+                            finishes (e.g. to wake up an event loop that calls :meth:`collect`).
+        :type on_finished: callable or None
+        """
+        self.members = []
+        """List of :class:`FleetMember` instances."""
+        self.instrumentation = instrumentation
+        self.on_finished = on_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._finished = []
+        self._num_running = 0
+        self._cond = threading.Condition()
+
+    def add(self, name, api, user_data=None, scheduler=None, breaker=None):
+        """Add a switch to the fleet.
+
+        :param str name: Unique name of the switch in the fleet.
+        :param ZyxelAPI api: The API connected to the switch.
+        :param user_data: Arbitrary data associated with the switch by the user of the fleet.
+        :param PollScheduler scheduler: If set, the data sources of the switch are polled according to this scheduler.
+        :param CircuitBreaker breaker: If set, the switch is not polled while this circuit breaker is open.
+        :return: The new member of the fleet.
+        :rtype: FleetMember
+        """
+        if any(m.name == name for m in self.members):
+            raise ValueError("Duplicate switch name '%s' in the fleet" % (name,))
+        member = FleetMember(name, api, user_data, scheduler, breaker)
+        self.members.append(member)
+        return member
+
+    def poll(self, update_config=False, update_mac_table=False, members=None, force_sources=(), retry_interval=0.0):
+        """Start a new poll of each switch whose previous poll has already finished.
+
+        Switches that have not been connected yet are logged in and :meth:`ZyxelAPI.get_switch` and
+        :meth:`ZyxelAPI.update_port_states` are called for them. Connected switches with a scheduler get
+        :meth:`ZyxelAPI.update_scheduled` called (they are not polled at all if no data source is due). Other switches
+        get :meth:`ZyxelAPI.update_port_states` called (preceded by :meth:`ZyxelAPI.update_switch_config` if
+        `update_config` is True). All polls are followed by :meth:`ZyxelAPI.update_mac_table` if `update_mac_table` is
+        True. Failures of the MAC table update are stored in :attr:`FleetMember.mac_table_error` and do not make the
+        poll fail.
+
+        :param bool update_config: Whether to also update the semi-static switch configuration (switches without a
+                                   scheduler only).
+        :param bool update_mac_table: Whether to also update the MAC address table. The changes of the table are
+                                      stored in :attr:`FleetMember.mac_table_diff`.
+        :param list members: If set, only these members are polled.
+        :param force_sources: Data sources polled even if they are not due (switches with a scheduler only).
+        :type force_sources: iterable of str
+        :param float retry_interval: Switches without a scheduler or not connected yet are not polled sooner than this
+                                     after the start of their previous poll (in seconds). It allows calling this
+                                     function more often than the switches should be polled.
+        """
+        now = time.time()
+        for member in (members if members is not None else self.members):
+            if member.scheduler is not None and member.switch is not None and len(force_sources) == 0 and \
+                    member.scheduler.next_time() > now and not update_mac_table:
+                continue
+            if (member.scheduler is None or member.switch is None) and not update_mac_table and \
+                    now < member.poll_start_time + retry_interval:
+                continue
+            if member.busy:
+                member.stats.num_skipped += 1
+                continue
+            if member.breaker is not None and not member.breaker.allow(now):
+                continue
+            with self._cond:
+                self._num_running += 1
+            member._future = self._executor.submit(
+                self._poll_member, member, update_config, update_mac_table, force_sources)
+
+    def collect(self, timeout=0.0):
+        """Return the members whose poll finished since the last call to this function.
+
+        :param float timeout: Maximum time to wait for the running polls to finish (in seconds). Zero means to return
+                              immediately, None means to wait until all running polls finish.
+        :return: List of tuples (member, connected, error). `connected` is True if the poll was the first successful
+                 one (i.e. :attr:`FleetMember.switch` has just been created). `error` is the exception raised by the
+                 poll or None.
+        :rtype: list
+        """
+        with self._cond:
+            if timeout is None or timeout > 0:
+                self._cond.wait_for(lambda: self._num_running == 0, timeout)
+            finished = self._finished
+            self._finished = []
+        return finished
+
+    def next_poll_time(self, retry_interval=0.0):
+        """Return the time when a poll of any switch that is not being polled right now is due.
+
+        :param float retry_interval: Switches without a scheduler or not connected yet are due this long after the
+                                     start of their previous poll (in seconds).
+        :rtype: float
+        """
+        next_time = float('inf')
+        for member in self.members:
+            if member.busy:
+                continue
+            if member.scheduler is None or member.switch is None:
+                member_time = member.poll_start_time + retry_interval
+            else:
+                member_time = member.scheduler.next_time()
+            if member.breaker is not None and member.breaker.state == member.breaker.open:
+                member_time = max(member_time, member.breaker.open_until)
+            next_time = min(next_time, member_time)
+        return next_time
+
+    def shutdown(self):
+        """Wait for the running polls to finish and log out of all switches."""
+        self._executor.shutdown(wait=True)
+        for member in self.members:
+            if member.logged_in:
+                member.api.__exit__(None, None, None)
+                member.logged_in = False
+
+    def report(self):
+        """Return a human-readable report of polling statistics of all switches.
+
+        :return: One line per switch (followed by the schedules of its data sources if it has a scheduler).
+        :rtype: list
+        """
+        lines = []
+        for member in self.members:
+            lines.append("%s: %s" % (member.name if len(member.name) > 0 else "default", member.stats))
+            if member.breaker is not None and (member.breaker.state != member.breaker.closed or
+                                               member.breaker.num_opened > 0):
+                lines.append("  %s" % (member.breaker,))
+            if member.scheduler is not None:
+                lines.extend("  " + line for line in member.scheduler.report())
+        return lines
+
+    def _phase(self, name):
+        if self.instrumentation is None:
+            return no_timer
+        return self.instrumentation.timer("poll." + name)
+
+    def _poll_member(self, member, update_config, update_mac_table, force_sources):
+        start = time.time()
+        member.poll_start_time = start
+        connected = False
+        error = None
+        member.mac_table_diff = None
+        member.mac_table_error = None
+        phase = self._phase
+        try:
+            if not member.logged_in:
+                with phase("login"):
+                    member.api.__enter__()
+                member.logged_in = True
+            member.polled_sources = set()
+            member.changed_sources = set()
+            if member.switch is None:
+                with phase("connect"):
+                    member.switch = member.api.get_switch()
+                    connected = True
+                    member.api.update_port_states(member.switch)
+                if member.scheduler is not None:
+                    member.scheduler.start()
+            elif member.scheduler is not None:
+                with phase("update"):
+                    member.polled_sources, member.changed_sources = member.api.update_scheduled(
+                        member.switch, member.scheduler, force_sources)
+            else:
+                with phase("update"):
+                    if update_config:
+                        member.api.update_switch_config(member.switch)
+                    member.api.update_port_states(member.switch)
+        except Exception as e:
+            error = e
+        # The MAC table is optional (not all firmwares have it), so its errors do not count as failed polls
+        if update_mac_table and error is None:
+            try:
+                with phase("mac_table"):
+                    member.mac_table_diff = member.api.update_mac_table(member.switch)
+            except Exception as e:
+                member.mac_table_error = e
+        member.stats.record(time.time() - start, error)
+        if member.breaker is not None:
+            if error is None:
+                member.breaker.record_success()
+            else:
+                member.breaker.record_failure()
+        if self.instrumentation is not None:
+            self.instrumentation.observe("poll.total", time.time() - start, error is not None)
+        with self._cond:
+            self._finished.append((member, connected, error))
+            self._num_running -= 1
+            self._cond.notify_all()
+        if self.on_finished is not None:
+            self.on_finished()
+
+
+class OnDemandPolling(object):
+    """Polling of fleet members only when their data are requested by a client and are older than a TTL.
+
+    Clients (e.g. SNMP command responders running in another thread) call :meth:`request`. It returns immediately if
+    the data are fresh enough. Otherwise it asks the polling thread for a refresh and waits until the refresh is
+    processed. Clients running in the polling thread (e.g. in the same event loop) call :meth:`request_future`
+    instead, which does not block. Concurrent requests for the same member are served by a single refresh. The polling
+    thread gets the members to poll from :meth:`due` and reports the processed results by :meth:`processed`. Each
+    member is polled at most once per `min_poll_interval` regardless of the number of requests.
+    """
+
+    def __init__(self, ttl=5.0, min_poll_interval=1.0, wait_timeout=3.0, on_request=None):
+        """
+        :param float ttl: Maximum age of the data (in seconds) that does not need a refresh.
+        :param float min_poll_interval: Minimum time between starts of two polls of a member (in seconds).
+        :param float wait_timeout: Maximum time a request waits for the refresh (in seconds). If the refresh does not
+                                   finish in time, the client gets the older data.
+        :param on_request: If set, this callable is called without arguments whenever a refresh is requested (e.g. to
+                           wake up a polling loop that does not wait in :meth:`due`).
+        :type on_request: callable or None
+        """
+        self.ttl = ttl
+        self.min_poll_interval = min_poll_interval
+        self.wait_timeout = wait_timeout
+        self.on_request = on_request
+        self.num_requests = 0
+        """Number of requests."""
+        self.num_refreshes = 0
+        """Number of requests that found the data stale and waited for a refresh."""
+        self._cond = threading.Condition()
+        self._requested = {}  # name -> member
+        self._data_time = {}  # name -> start time of the last processed successful poll
+        self._last_poll_time = {}  # name -> start time of the last poll
+        self._processed_count = {}  # name -> number of processed polls
+        self._waiters = []  # (member, future) of the pending calls to request_future()
+
+    def data_age(self, member):
+        """Age of the processed data of the member in seconds (infinity if there are no data)."""
+        with self._cond:
+            return time.time() - self._data_time.get(member.name, float('-inf'))
+
+    def request(self, member):
+        """Make sure the data of the member are not older than the TTL, polling the switch if needed.
+
+        Blocks for at most :attr:`wait_timeout`.
+
+        :param FleetMember member: The member whose data are requested.
+        :return: Whether the data are fresh (False if the refresh failed, did not finish in time or the switch is not
+                 reachable).
+        :rtype: bool
+        """
+        with self._cond:
+            self.num_requests += 1
+            if self._is_fresh(member):
+                return True
+            if not member.reachable:
+                return False  # Do not wait for a switch whose circuit breaker is open
+            self.num_refreshes += 1
+            self._requested[member.name] = member
+            processed_count = self._processed_count.get(member.name, 0)
+            self._cond.notify_all()
+            if self.on_request is not None:
+                self.on_request()
+            # Wait until the data are fresh or until a poll finishes without making them fresh (i.e. it failed)
+            self._cond.wait_for(
+                lambda: self._is_fresh(member) or (
+                    member.name not in self._requested and
+                    self._processed_count.get(member.name, 0) != processed_count),
+                self.wait_timeout)
+            return self._is_fresh(member)
+
+    def request_future(self, member):
+        """Non-blocking variant of :meth:`request`.
+
+        The returned future is resolved when the refresh is processed (see :meth:`processed`) or when :meth:`expire` is
+        called for it. The caller is responsible for calling :meth:`expire` after :attr:`wait_timeout`.
+
+        :param FleetMember member: The member whose data are requested.
+        :return: Future resolved with the same value :meth:`request` would return.
+        :rtype: concurrent.futures.Future
+        """
+        future = Future()
+        with self._cond:
+            self.num_requests += 1
+            if self._is_fresh(member) or not member.reachable:
+                future.set_result(self._is_fresh(member))
+                return future
+            self.num_refreshes += 1
+            self._requested[member.name] = member
+            self._waiters.append((member, future))
+            self._cond.notify_all()
+        if self.on_request is not None:
+            self.on_request()
+        return future
+
+    def expire(self, future):
+        """Resolve a pending future returned by :meth:`request_future` with the current freshness of the data.
+
+        :param concurrent.futures.Future future: The future. Nothing happens if it has already been resolved.
+        """
+        with self._cond:
+            waiters = [w for w in self._waiters if w[1] is future]
+            self._waiters = [w for w in self._waiters if w[1] is not future]
+            results = [self._is_fresh(member) for member, _ in waiters]
+        for (_, f), result in zip(waiters, results):
+            f.set_result(result)
+
+    def due(self, timeout):
+        """Wait for members that have requested a refresh and are allowed to be polled.
+
+        :param float timeout: Maximum time to wait (in seconds).
+        :return: The members that should be polled now. The caller is expected to start their polls immediately.
+        :rtype: list
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                due = []
+                next_time = deadline
+                for name, member in self._requested.items():
+                    if member.busy:
+                        continue  # the running poll will be processed first
+                    allowed_time = self._last_poll_time.get(name, float('-inf')) + self.min_poll_interval
+                    if allowed_time <= now:
+                        due.append(member)
+                    else:
+                        next_time = min(next_time, allowed_time)
+                if len(due) > 0 or now >= deadline:
+                    for member in due:
+                        self._last_poll_time[member.name] = now
+                    return due
+                self._cond.wait(max(next_time - now, 0.001))
+
+    def processed(self, member, success):
+        """Report that a poll of the member has been processed (e.g. its data have been published).
+
+        :param FleetMember member: The polled member.
+        :param bool success: Whether the poll was successful.
+        """
+        with self._cond:
+            if success:
+                self._data_time[member.name] = max(self._data_time.get(member.name, 0.0), member.poll_start_time)
+            self._last_poll_time[member.name] = max(
+                self._last_poll_time.get(member.name, float('-inf')), member.poll_start_time)
+            self._processed_count[member.name] = self._processed_count.get(member.name, 0) + 1
+            # A failed refresh is not retried until a new request comes
+            if not success or self._is_fresh(member):
+                self._requested.pop(member.name, None)
+            self._cond.notify_all()
+            # Same condition as in request()
+            waiters = [w for w in self._waiters if w[0] is member and (
+                self._is_fresh(member) or member.name not in self._requested)]
+            self._waiters = [w for w in self._waiters if w not in waiters]
+            result = self._is_fresh(member)
+        # The futures are resolved without holding the lock, their callbacks can make new requests
+        for _, future in waiters:
+            future.set_result(result)
+
+    def _is_fresh(self, member):
+        return time.time() - self._data_time.get(member.name, float('-inf')) <= self.ttl
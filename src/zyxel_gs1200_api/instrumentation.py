@@ -0,0 +1,254 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Lightweight instrumentation of the hot paths of the API and the SNMP agent.
+
+:class:`Instrumentation` collects latency histograms and event counts under string names, e.g.:
+
+- `http.<cmd>`: Requests to the web API of the switch (errors are HTTP or connection failures).
+- `http.relogin`: Re-logins triggered by an expired session.
+- `poll.<phase>`: Phases of a poll of a fleet member (`login`, `connect`, `update`, `mac_table`) and `poll.total`.
+- `mib.<method>`: Writing the polled data into the MIB (`writeVars`).
+- `snmp.<pdu>`: SNMP requests handled by the agent per PDU type.
+
+:class:`StackSampler` is a sampling profiler of all threads of the process, usable on a running agent.
+"""
+
+import bisect
+import collections
+import sys
+import threading
+import time
+import traceback
+
+__all__ = ['Histogram', 'Instrumentation', 'StackSampler', 'no_timer']
+
+
+class Histogram(object):
+    """Histogram of durations with fixed exponential buckets, plus the number of events and errors."""
+
+    bounds = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 5.0, 10.0, float('inf'))
+    """Upper bounds of the buckets (in seconds)."""
+
+    def __init__(self, name):
+        """
+        :param str name: Name of the measured operation.
+        """
+        self.name = name
+        """Name of the measured operation."""
+        self.count = 0
+        """Number of events."""
+        self.errors = 0
+        """Number of events that failed."""
+        self.total = 0.0
+        """Sum of the durations of all events (in seconds)."""
+        self.max = 0.0
+        """Maximum duration (in seconds)."""
+        self.buckets = [0] * len(self.bounds)
+        """Number of events in each bucket."""
+
+    def observe(self, duration, error=False):
+        """Record one event.
+
+        :param float duration: Duration of the event in seconds. None records the event without a duration.
+        :param bool error: Whether the event failed.
+        """
+        self.count += 1
+        if error:
+            self.errors += 1
+        if duration is not None:
+            self.total += duration
+            self.max = max(self.max, duration)
+            self.buckets[bisect.bisect_left(self.bounds, duration)] += 1
+
+    @property
+    def mean(self):
+        """Mean duration (in seconds)."""
+        timed = sum(self.buckets)
+        return self.total / timed if timed > 0 else 0.0
+
+    def percentile(self, fraction):
+        """Return the upper bound of the bucket containing the given percentile.
+
+        :param float fraction: The percentile (0-1).
+        :return: The duration in seconds (:attr:`max` for the last bucket).
+        :rtype: float
+        """
+        timed = sum(self.buckets)
+        if timed == 0:
+            return 0.0
+        threshold = fraction * timed
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.buckets):
+            cumulative += count
+            if cumulative >= threshold:
+                return min(bound, self.max)
+        return self.max
+
+    def __str__(self):
+        if sum(self.buckets) == 0:
+            return "%s: count %i, errors %i" % (self.name, self.count, self.errors)
+        return "%s: count %i, errors %i, mean %.1f ms, p95 %.1f ms, max %.1f ms" % (
+            self.name, self.count, self.errors, self.mean * 1000, self.percentile(0.95) * 1000, self.max * 1000)
+
+
+class _Timer(object):
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.instrumentation.observe(self.name, time.time() - self.start, exc_type is not None)
+
+
+class _NoTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+no_timer = _NoTimer()
+"""Context manager doing nothing, a stand-in for :meth:`Instrumentation.timer` when there is no instrumentation."""
+
+
+class Instrumentation(object):
+    """Thread-safe registry of :class:`Histogram` objects keyed by name."""
+
+    def __init__(self):
+        self._histograms = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.start_time = time.time()
+        """Time of creation of the registry."""
+
+    def histogram(self, name):
+        """Return the histogram of the given name (it is created if it does not exist).
+        :param str name: The name.
+        :rtype: Histogram
+        """
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram(name)
+            return histogram
+
+    def observe(self, name, duration, error=False):
+        """Record one event.
+
+        :param str name: Name of the operation.
+        :param float duration: Duration of the event in seconds. None records the event without a duration.
+        :param bool error: Whether the event failed.
+        """
+        histogram = self.histogram(name)
+        with self._lock:
+            histogram.observe(duration, error)
+
+    def increment(self, name, error=False):
+        """Count one event without a duration.
+
+        :param str name: Name of the event.
+        :param bool error: Whether the event is an error.
+        """
+        self.observe(name, None, error)
+
+    def timer(self, name):
+        """Return a context manager measuring the duration of the enclosed block. An exception counts as an error.
+
+        :param str name: Name of the operation.
+        """
+        return _Timer(self, name)
+
+    def histograms(self):
+        """Return all histograms in the order of their creation.
+        :rtype: list of Histogram
+        """
+        with self._lock:
+            return list(self._histograms.values())
+
+    def report(self):
+        """Return a human-readable report of all histograms.
+
+        :return: One line per histogram.
+        :rtype: list
+        """
+        return [str(h) for h in self.histograms()]
+
+
+class StackSampler(object):
+    """Sampling profiler of all threads of the running process.
+
+    A background thread periodically captures the stacks of all other threads. The result is in the "folded stacks"
+    format (one line per unique stack with the number of its samples) accepted by flame graph tools.
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        :param float interval: Sampling interval in seconds.
+        """
+        self.interval = interval
+        self.stacks = collections.Counter()
+        """Number of samples of each folded stack."""
+        self.num_samples = 0
+        """Number of sampling rounds."""
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="StackSampler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def run(self, duration):
+        """Sample for the given duration (blocks).
+        :param float duration: Duration of the sampling in seconds.
+        """
+        self.start()
+        self._stop.wait(duration)
+        self.stop()
+
+    def _run(self):
+        own_id = threading.current_thread().ident
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = ";".join("%s (%s:%i)" % (f[2], f[0], f[1]) for f in traceback.extract_stack(frame))
+                self.stacks["%s;%s" % (names.get(thread_id, thread_id), stack)] += 1
+            self.num_samples += 1
+
+    def folded(self):
+        """Return the profile in the folded stacks format.
+        :rtype: str
+        """
+        return "".join("%s %i\n" % (stack, count) for stack, count in self.stacks.most_common())
+
+    def top_functions(self, num=20):
+        """Return the functions most often found on top of the stacks.
+
+        :param int num: Number of functions to return.
+        :return: List of tuples (function, fraction of samples).
+        :rtype: list
+        """
+        counts = collections.Counter()
+        for stack, count in self.stacks.items():
+            counts[stack.rsplit(";", 1)[-1]] += count
+        total = float(sum(counts.values())) or 1.0
+        return [(function, count / total) for function, count in counts.most_common(num)]
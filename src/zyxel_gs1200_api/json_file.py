@@ -0,0 +1,42 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Reading and atomic writing of small JSON files holding the state kept by the nodes across restarts."""
+
+import json
+import os
+
+__all__ = ['read_json_file', 'write_json_file']
+
+
+def read_json_file(path):
+    """Read a JSON file holding a dict.
+
+    :param str path: Path to the file.
+    :return: The dict. Empty if the file does not exist, cannot be parsed or does not hold a dict.
+    :rtype: dict
+    """
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def write_json_file(path, data, mode=0o666, **kwargs):
+    """Atomically replace a JSON file. Missing directories are created.
+
+    :param str path: Path to the file.
+    :param data: The JSON-serializable data.
+    :param int mode: Permissions of a newly written file (limited by the umask).
+    :param kwargs: Arguments of :func:`json.dump`.
+    """
+    directory = os.path.dirname(path)
+    if len(directory) > 0 and not os.path.isdir(directory):
+        os.makedirs(directory)
+    tmp_path = path + ".tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, mode)
+    with os.fdopen(fd, "w") as f:
+        json.dump(data, f, **kwargs)
+    os.rename(tmp_path, path)
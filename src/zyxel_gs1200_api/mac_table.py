@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""MAC address forwarding table with incremental updates and indices by MAC address and port."""
+
+__all__ = ['MacTable', 'MacTableDiff', 'mac_to_bin']
+
+
+def mac_to_bin(mac):
+    """Convert a MAC address to its binary representation.
+    :param mac: The MAC address either as a string (with ':' or '-' separators) or as bytes.
+    :type mac: str or bytes
+    :return: The 6-byte binary representation.
+    :rtype: bytes
+    """
+    if isinstance(mac, bytes) and len(mac) == 6:
+        return mac
+    mac = mac.replace(":", "").replace("-", "").lower()
+    try:
+        return bytes.fromhex(mac)
+    except AttributeError:  # Python 2
+        return mac.decode('hex')
+
+
+class MacTableDiff(object):
+    """Changes of the MAC table caused by one update."""
+
+    def __init__(self):
+        self.added = []
+        """List of :class:`MacTableEntry` that were added."""
+        self.removed = []
+        """List of :class:`MacTableEntry` that were removed."""
+        self.changed = []
+        """List of :class:`MacTableEntry` whose port or type changed (the new versions of the entries)."""
+
+    def __bool__(self):
+        return len(self.added) > 0 or len(self.removed) > 0 or len(self.changed) > 0
+
+    __nonzero__ = __bool__  # Python 2
+
+    def __str__(self):
+        return "%i added, %i removed, %i changed" % (len(self.added), len(self.removed), len(self.changed))
+
+
+class MacTable(object):
+    """MAC address forwarding table with incremental updates and indices by MAC address and port.
+
+    Entries are identified by the (VLAN, MAC address) pair. Each update only touches the indices of the entries that
+    were added, removed or changed since the previous update.
+    """
+
+    def __init__(self):
+        self._entries = {}  # (vlan, mac_bin) -> MacTableEntry
+        self._by_mac = {}  # mac_bin -> {vlan: MacTableEntry}
+        self._by_port = {}  # port_index -> {(vlan, mac_bin): MacTableEntry}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        """Iterate over the entries ordered by VLAN and MAC address."""
+        for key in sorted(self._entries):
+            yield self._entries[key]
+
+    def update(self, entries):
+        """Replace the table contents with a new snapshot of the switch MAC table.
+
+        :param entries: The complete current MAC table.
+        :type entries: list of MacTableEntry
+        :return: What changed compared to the previous snapshot.
+        :rtype: MacTableDiff
+        """
+        diff = MacTableDiff()
+        new_entries = {}
+        for entry in entries:
+            key = (entry.vlan, entry.mac_bin)
+            new_entries[key] = entry
+            old = self._entries.get(key)
+            if old is None:
+                diff.added.append(entry)
+            elif old.port_index != entry.port_index or old.is_static != entry.is_static:
+                diff.changed.append(entry)
+                self._unindex(key, old)
+            else:
+                # Keep the old object so that references held by users stay valid
+                new_entries[key] = old
+
+        for key, old in self._entries.items():
+            if key not in new_entries:
+                diff.removed.append(old)
+                self._unindex(key, old)
+
+        for entry in diff.added:
+            self._index((entry.vlan, entry.mac_bin), entry)
+        for entry in diff.changed:
+            self._index((entry.vlan, entry.mac_bin), entry)
+
+        self._entries = new_entries
+        return diff
+
+    def lookup_mac(self, mac):
+        """Find the entries of the given MAC address.
+
+        :param mac: The MAC address either as a string or as bytes.
+        :type mac: str or bytes
+        :return: The entries of the address (one per VLAN it was seen in).
+        :rtype: list of MacTableEntry
+        """
+        return list(self._by_mac.get(mac_to_bin(mac), {}).values())
+
+    def lookup_port(self, port_index):
+        """Find the entries learned on the given port.
+
+        :param int port_index: Index of the port (same as :attr:`Port.index`).
+        :return: The entries of the port.
+        :rtype: list of MacTableEntry
+        """
+        return list(self._by_port.get(port_index, {}).values())
+
+    def _index(self, key, entry):
+        self._by_mac.setdefault(entry.mac_bin, {})[entry.vlan] = entry
+        self._by_port.setdefault(entry.port_index, {})[key] = entry
+
+    def _unindex(self, key, entry):
+        by_mac = self._by_mac.get(entry.mac_bin)
+        if by_mac is not None:
+            by_mac.pop(entry.vlan, None)
+            if len(by_mac) == 0:
+                del self._by_mac[entry.mac_bin]
+        by_port = self._by_port.get(entry.port_index)
+        if by_port is not None:
+            by_port.pop(key, None)
+            if len(by_port) == 0:
+                del self._by_port[entry.port_index]
@@ -0,0 +1,151 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""MIB instrumentation serving selected subtrees from immutable snapshots.
+
+The poller builds a complete :class:`MibSnapshot` of the subtrees (e.g. `ifTable` and `ifXTable`) and publishes it by
+a single reference assignment. Each SNMP request reads from the snapshot that was current when the request came, so
+walks never see a half-updated table and the responder never waits for the poller. GET and GETNEXT in the snapshot are
+binary searches in a sorted list of OIDs. All other objects are served by the wrapped pysnmp MIB instrumentation.
+"""
+
+import bisect
+
+from pysnmp.smi import error, exval, instrum
+
+__all__ = ['MibSnapshot', 'SnapshotMibInstrumController']
+
+
+class MibSnapshot(object):
+    """Immutable values of MIB object instances sorted by OID."""
+
+    __slots__ = ('oids', 'values')
+
+    def __init__(self, oids=(), values=()):
+        """
+        :param oids: The OIDs of the instances (tuples of ints) in ascending order.
+        :type oids: tuple or list
+        :param values: Values of the instances (pysnmp syntax objects) in the order of `oids`.
+        :type values: tuple or list
+        """
+        self.oids = oids
+        self.values = values
+
+
+class SnapshotMibInstrumController(instrum.AbstractMibInstrumController):
+    """MIB instrumentation controller answering reads of some subtrees from a :class:`MibSnapshot`.
+
+    The objects in the snapshot subtrees must not be instantiated in the wrapped controller. Writes are passed to the
+    wrapped controller.
+    """
+
+    def __init__(self, mib_instrum, subtrees=()):
+        """
+        :param mib_instrum: The wrapped MIB instrumentation controller.
+        :type mib_instrum: pysnmp.smi.instrum.MibInstrumController
+        :param subtrees: OIDs of the subtrees served from the snapshot.
+        :type subtrees: iterable of tuple
+        """
+        self.mib_instrum = mib_instrum
+        """The wrapped MIB instrumentation controller."""
+        self.subtrees = tuple(tuple(s) for s in subtrees)
+        """OIDs of the subtrees served from the snapshot."""
+        self.snapshot = MibSnapshot()
+        """The published snapshot."""
+
+    def getMibBuilder(self):
+        return self.mib_instrum.getMibBuilder()
+
+    def add_subtree(self, oid):
+        """Serve the given subtree from the snapshot.
+        :param tuple oid: OID of the subtree.
+        """
+        if tuple(oid) not in self.subtrees:
+            self.subtrees += (tuple(oid),)
+
+    def publish(self, snapshot):
+        """Replace the served snapshot. Requests being handled finish with the previous one.
+        :param MibSnapshot snapshot: The new snapshot. It must not be changed afterwards.
+        """
+        self.snapshot = snapshot
+
+    def readVars(self, varBinds, acInfo=(None, None)):
+        snapshot = self.snapshot
+        names = [tuple(name) for name, _ in varBinds]
+        delegated = [idx for idx, name in enumerate(names) if self._subtree(name) is None]
+        if len(delegated) == len(names):
+            return self.mib_instrum.readVars(varBinds, acInfo)
+        result = [None] * len(names)
+        for idx, name in enumerate(names):
+            if self._subtree(name) is None:
+                continue
+            i = bisect.bisect_left(snapshot.oids, name)
+            if i == len(snapshot.oids) or snapshot.oids[i] != name:
+                result[idx] = (name, exval.noSuchInstance)
+            elif not self._readable(name, snapshot.values[i], idx, acInfo):
+                raise error.NoAccessError(idx=idx, name=name)
+            else:
+                result[idx] = (name, snapshot.values[i])
+        if len(delegated) > 0:
+            for idx, var_bind in zip(delegated, self._delegate(self.mib_instrum.readVars, varBinds, delegated, acInfo)):
+                result[idx] = var_bind
+        return result
+
+    def readNextVars(self, varBinds, acInfo=(None, None)):
+        snapshot = self.snapshot
+        names = [tuple(name) for name, _ in varBinds]
+        result = [None] * len(names)
+        candidates = [None] * len(names)
+        delegated = []  # Indices of the var-binds whose successor can be in the wrapped MIB
+        for idx, name in enumerate(names):
+            candidate = self._next_in_snapshot(snapshot, name, idx, acInfo)
+            subtree = self._subtree(name)
+            if candidate is not None and subtree is not None and candidate[0][:len(subtree)] == subtree:
+                # The wrapped MIB has no instances in the subtree, so there is nothing in between
+                result[idx] = candidate
+            else:
+                candidates[idx] = candidate
+                delegated.append(idx)
+        if len(delegated) > 0:
+            for idx, (next_name, next_val) in zip(delegated, self._delegate(
+                    self.mib_instrum.readNextVars, varBinds, delegated, acInfo)):
+                candidate = candidates[idx]
+                if candidate is not None and (next_val.tagSet == exval.endOfMib.tagSet or
+                                              candidate[0] < tuple(next_name)):
+                    result[idx] = candidate
+                else:
+                    result[idx] = (next_name, next_val)
+        return result
+
+    def writeVars(self, varBinds, acInfo=(None, None)):
+        return self.mib_instrum.writeVars(varBinds, acInfo)
+
+    def _subtree(self, name):
+        for subtree in self.subtrees:
+            if name[:len(subtree)] == subtree:
+                return subtree
+        return None
+
+    def _next_in_snapshot(self, snapshot, name, idx, acInfo):
+        oids = snapshot.oids
+        for i in range(bisect.bisect_right(oids, name), len(oids)):
+            try:
+                if self._readable(oids[i], snapshot.values[i], idx, acInfo):
+                    return oids[i], snapshot.values[i]
+            except error.NoAccessError:
+                pass  # e.g. Counter64 objects are skipped in SNMPv1 GETNEXT
+        return None
+
+    @staticmethod
+    def _readable(name, value, idx, acInfo):
+        ac_fun, ac_ctx = acInfo
+        return ac_fun is None or not ac_fun(name, value, idx, 'read', ac_ctx)
+
+    @staticmethod
+    def _delegate(fun, varBinds, indices, acInfo):
+        try:
+            return fun([varBinds[idx] for idx in indices], acInfo)
+        except error.MibOperationError as e:
+            if 'idx' in e:
+                e.update({'idx': indices[e['idx']]})  # Report the position of the var-bind in the whole request
+            raise
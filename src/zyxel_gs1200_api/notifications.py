@@ -0,0 +1,351 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""SNMP notifications (traps and informs) about changes of the port states.
+
+:class:`PortEventDetector` compares the port states of successive polls and reports link, loop and overheat changes.
+:class:`FlapLimiter` drops notifications that would repeat the last sent state and limits the number of notifications
+per port with a token bucket. A port that keeps flapping gets a notification of its final state once the bucket
+refills. :class:`NotificationSender` turns the events into IF-MIB `linkUp`/`linkDown` and private loop/overheat
+notifications and sends them to the configured targets.
+"""
+
+import time
+
+from pysnmp.entity import config
+from pysnmp.entity.rfc3413 import ntforg
+from pysnmp.proto.acmod import void
+from pysnmp.proto.api import v2c
+
+from .snmp import default_private_oid
+
+__all__ = ['FlapLimiter', 'NotificationSender', 'PortEvent', 'PortEventDetector', 'event_kinds', 'link_down_oid',
+           'link_up_oid', 'private_notification_oid', 'snmp_trap_oid']
+
+
+event_kinds = ("link", "loop", "overheat")
+"""Kinds of port events: link up/down, loop detected/cleared and overheat detected/cleared."""
+
+link_up_oid = (1, 3, 6, 1, 6, 3, 1, 1, 5, 4)
+"""IF-MIB `linkUp` notification."""
+
+link_down_oid = (1, 3, 6, 1, 6, 3, 1, 1, 5, 3)
+"""IF-MIB `linkDown` notification."""
+
+snmp_trap_oid = (1, 3, 6, 1, 6, 3, 1, 1, 4, 1, 0)
+"""SNMPv2-MIB `snmpTrapOID.0`, the first variable binding of a notification."""
+
+
+def private_notification_oid(kind, state, private_oid=default_private_oid):
+    """OID of the private notification of a loop or overheat event.
+
+    The notifications are `<private_oid>.0.1` (loop detected), `.0.2` (loop cleared), `.0.3` (overheat detected) and
+    `.0.4` (overheat cleared).
+
+    :param str kind: "loop" or "overheat".
+    :param bool state: Whether the condition has been detected (True) or cleared (False).
+    :param tuple private_oid: Root of the private subtree of the agent.
+    :rtype: tuple
+    """
+    return tuple(private_oid) + (0, (1 if kind == "loop" else 3) + (0 if state else 1))
+
+
+class PortEvent(object):
+    """A change of the state of a port."""
+
+    __slots__ = ('kind', 'port_index', 'state', 'time')
+
+    def __init__(self, kind, port_index, state, time=0.0):
+        """
+        :param str kind: One of :data:`event_kinds`.
+        :param int port_index: Index of the port.
+        :param bool state: The new state (link up, loop detected or overheat detected).
+        :param float time: Time of the change.
+        """
+        self.kind = kind
+        self.port_index = port_index
+        self.state = state
+        self.time = time
+
+    def __repr__(self):
+        return "PortEvent(%r, %i, %r)" % (self.kind, self.port_index, self.state)
+
+
+class PortEventDetector(object):
+    """Detects changes of link, loop and overheat states between successive polls of a switch."""
+
+    def __init__(self):
+        self._switch = None
+        self._states = {}  # kind -> list of states of the ports (None if unknown)
+
+    def update(self, switch, now=None):
+        """Compare the current port states with the ones from the previous call.
+
+        The first call for a switch instance only records the states, so no events are reported for the initial state
+        of the ports.
+
+        :param Switch switch: The polled switch.
+        :param float now: Time of the poll (:func:`time.time` if None).
+        :return: The changes since the previous call.
+        :rtype: list of PortEvent
+        """
+        if now is None:
+            now = time.time()
+        table = switch.port_table
+        n = switch.num_ports
+        states = {
+            "link": [None if c < 0 else c > 0 for c in table.connected[:n]],
+            "loop": [v > 0 for v in table.loop_detected[:n]],
+            "overheat": [v > 0 for v in table.overheat_detected[:n]],
+        }
+        events = []
+        if switch is self._switch:
+            for kind in event_kinds:
+                for i, (old, new) in enumerate(zip(self._states[kind], states[kind])):
+                    if old is not None and new is not None and old != new:
+                        events.append(PortEvent(kind, i, new, now))
+        self._switch = switch
+        self._states = states
+        return events
+
+
+class FlapLimiter(object):
+    """Deduplication and per-port rate limiting of notifications.
+
+    A notification is dropped if it reports the same state as the last notification sent for the same port and kind.
+    Each port has a token bucket of `burst` notifications refilled by one token per `interval`. When the bucket is
+    empty, the newest state is kept and :meth:`due` returns it once a token is available (unless it equals the last
+    sent state by then).
+    """
+
+    def __init__(self, burst=4, interval=30.0):
+        """
+        :param int burst: Maximum number of notifications of a port sent in a row.
+        :param float interval: Time to refill one token (in seconds). A flapping port sends one notification per this
+                               interval.
+        """
+        self.burst = burst
+        self.interval = interval
+        self.num_suppressed = 0
+        """Number of notifications delayed or dropped because of the rate limit."""
+        self.num_duplicates = 0
+        """Number of notifications dropped because they repeated the last sent state."""
+        self._sent = {}  # (context, kind, port) -> last sent state
+        self._pending = {}  # (context, kind, port) -> newest state not sent because of the rate limit
+        self._buckets = {}  # (context, port) -> (tokens, time of the last refill)
+
+    def allow(self, context, kind, port_index, state, now=None):
+        """Decide whether a notification should be sent now.
+
+        :param str context: Name of the switch (its SNMP context).
+        :param str kind: One of :data:`event_kinds`.
+        :param int port_index: Index of the port.
+        :param bool state: The reported state.
+        :param float now: Current time (:func:`time.time` if None).
+        :return: Whether to send the notification. If True, it is recorded as sent.
+        :rtype: bool
+        """
+        key = (context, kind, port_index)
+        if self._sent.get(key) == state:
+            self._pending.pop(key, None)
+            self.num_duplicates += 1
+            return False
+        if not self._take_token(context, port_index, now if now is not None else time.time()):
+            self._pending[key] = state
+            self.num_suppressed += 1
+            return False
+        self._pending.pop(key, None)
+        self._sent[key] = state
+        return True
+
+    def due(self, context, now=None):
+        """Return the delayed notifications of a switch that can be sent now. They are recorded as sent.
+
+        :param str context: Name of the switch (its SNMP context).
+        :param float now: Current time (:func:`time.time` if None).
+        :return: List of tuples (kind, port_index, state).
+        :rtype: list
+        """
+        if now is None:
+            now = time.time()
+        due = []
+        for key, state in list(self._pending.items()):
+            key_context, kind, port_index = key
+            if key_context != context:
+                continue
+            if self._sent.get(key) == state:
+                del self._pending[key]
+            elif self._take_token(context, port_index, now):
+                del self._pending[key]
+                self._sent[key] = state
+                due.append((kind, port_index, state))
+        return due
+
+    def _take_token(self, context, port_index, now):
+        tokens, last_time = self._buckets.get((context, port_index), (float(self.burst), now))
+        if self.interval > 0:
+            tokens = min(tokens + (now - last_time) / self.interval, float(self.burst))
+        else:
+            tokens = float(self.burst)
+        if tokens < 1.0:
+            self._buckets[(context, port_index)] = (tokens, now)
+            return False
+        self._buckets[(context, port_index)] = (tokens - 1.0, now)
+        return True
+
+
+class NotificationSender(object):
+    """Sends notifications about port events of the switches to SNMPv2c and SNMPv3 trap or inform receivers.
+
+    The notifications are sent through the transports of the SNMP engine (i.e. from the port of the agent), so the
+    engine needs a transport of the domain of each target.
+    """
+
+    def __init__(self, snmp_engine, private_oid=default_private_oid, limiter=None, instrumentation=None):
+        """
+        :param snmp_engine: The SNMP engine.
+        :type snmp_engine: pysnmp.entity.engine.SnmpEngine
+        :param tuple private_oid: Root of the private subtree of the agent (see :func:`private_notification_oid`).
+        :param FlapLimiter limiter: Deduplication and rate limiting. If None, a limiter with default settings is used.
+        :param Instrumentation instrumentation: If set, round trip times of acknowledged informs are recorded here
+                                                (`snmp.inform`).
+        """
+        self.snmp_engine = snmp_engine
+        self.private_oid = tuple(private_oid)
+        self.limiter = limiter if limiter is not None else FlapLimiter()
+        """Deduplication and rate limiting of the notifications."""
+        self.instrumentation = instrumentation
+        self.num_sent = 0
+        """Number of notifications sent (counting each target)."""
+        self.num_failed = 0
+        """Number of notifications that could not be sent or whose informs were not acknowledged."""
+        self._targets = []  # (name, version)
+        self._detectors = {}  # context -> PortEventDetector
+        # The targets are configured explicitly, so the notifications are not filtered by VACM views
+        self._originator = ntforg.NotificationOriginator()
+        self._originator.acmID = void.Vacm.accessModelID
+
+    def add_target(self, name, transport_domain, address, version="2c", community="public", user=None,
+                   security_level="noAuthNoPriv", inform=False, timeout=1.0, retries=3):
+        """Add a receiver of the notifications.
+
+        :param str name: Unique name of the target.
+        :param tuple transport_domain: Transport domain (e.g. :data:`~zyxel_gs1200_api.async_snmp.udp_domain`).
+        :param tuple address: Host and port of the receiver.
+        :param str version: "2c" or "3".
+        :param str community: SNMPv2c community.
+        :param str user: SNMPv3 user. It has to be configured in the SNMP engine (e.g. by `config.addV3User`).
+        :param str security_level: SNMPv3 security level ("noAuthNoPriv", "authNoPriv" or "authPriv").
+        :param bool inform: Whether to send informs (acknowledged and retried) instead of traps.
+        :param float timeout: Timeout of an inform (in seconds).
+        :param int retries: Number of retries of an unacknowledged inform.
+        """
+        if any(target_name == name for target_name, _ in self._targets):
+            raise ValueError("Duplicate notification target name '%s'" % (name,))
+        params = "notify-params-" + name
+        tag = "notify-" + name
+        if version == "2c":
+            security_name = "notify-" + name
+            # The tag of the community entry matches no target address, so the community is only used for sending
+            config.addV1System(self.snmp_engine, security_name, community, contextName="",
+                               transportTag="notify-community", securityName=security_name)
+            config.addTargetParams(self.snmp_engine, params, security_name, "noAuthNoPriv", 1)
+        elif version == "3":
+            if user is None:
+                raise ValueError("SNMPv3 notification target '%s' needs a user" % (name,))
+            config.addTargetParams(self.snmp_engine, params, user, security_level, 3)
+        else:
+            raise ValueError("Unsupported SNMP version '%s' of notification target '%s'" % (version, name))
+        config.addTargetAddr(self.snmp_engine, name, transport_domain, tuple(address), params,
+                             timeout=int(timeout * 100), retryCount=retries, tagList=tag)
+        config.addNotificationTarget(self.snmp_engine, tag, params, tag, "inform" if inform else "trap")
+        self._targets.append((name, version))
+
+    def update(self, context, mib, switch, now=None):
+        """Detect the port events of a polled switch and send the notifications allowed by the limiter.
+
+        Should be called after each successful poll of the switch. The first call (and the first call after the switch
+        has been reconnected) sends nothing.
+
+        :param str context: Name of the switch (its SNMP context).
+        :param SwitchMib mib: The MIB of the switch (for the types of the objects in the notifications).
+        :param Switch switch: The polled switch.
+        :param float now: Time of the poll (:func:`time.time` if None).
+        :return: The detected events (including the ones not sent).
+        :rtype: list of PortEvent
+        """
+        if now is None:
+            now = time.time()
+        detector = self._detectors.setdefault(context, PortEventDetector())
+        events = detector.update(switch, now)
+        notifications = [(e.kind, e.port_index, e.state) for e in events
+                         if self.limiter.allow(context, e.kind, e.port_index, e.state, now)]
+        notifications.extend(self.limiter.due(context, now))
+        for kind, port_index, state in notifications:
+            self.send(context, self.var_binds(mib, switch, kind, port_index, state))
+        return events
+
+    def var_binds(self, mib, switch, kind, port_index, state):
+        """Variable bindings of a notification (without `sysUpTime` and with `snmpTrapOID` first).
+
+        Link notifications are IF-MIB `linkUp`/`linkDown` with `ifIndex`, `ifAdminStatus` and `ifOperStatus`. Loop and
+        overheat notifications are private (see :func:`private_notification_oid`) with `ifIndex`. All notifications
+        also carry `ifName` of the port and `sysName` of the switch, so that the receiver can tell the switches of a
+        fleet apart even with SNMPv2c.
+
+        :param SwitchMib mib: The MIB of the switch.
+        :param Switch switch: The switch.
+        :param str kind: One of :data:`event_kinds`.
+        :param int port_index: Index of the port.
+        :param bool state: The new state.
+        :rtype: list
+        """
+        port = switch.ports[port_index]
+        if_index = (port_index + 1,)
+        if kind == "link":
+            var_binds = [
+                (snmp_trap_oid, v2c.ObjectIdentifier(link_up_oid if state else link_down_oid)),
+                (mib.ifIndex.name + if_index, mib.ifIndex.syntax.clone(port_index + 1)),
+                (mib.ifAdminStatus.name + if_index, mib.ifAdminStatus.syntax.clone(
+                    "up" if port.status.enabled else "down")),
+                (mib.ifOperStatus.name + if_index, mib.ifOperStatus.syntax.clone("up" if state else "down")),
+            ]
+        else:
+            var_binds = [
+                (snmp_trap_oid, v2c.ObjectIdentifier(private_notification_oid(kind, state, self.private_oid))),
+                (mib.ifIndex.name + if_index, mib.ifIndex.syntax.clone(port_index + 1)),
+            ]
+        var_binds.extend((
+            (mib.ifName.name + if_index, mib.ifName.syntax.clone(port.short_name)),
+            (mib.sysName.name + (0,), mib.sysName.syntax.clone(switch.device_name)),
+        ))
+        return var_binds
+
+    def send(self, context, var_binds):
+        """Send a notification to all targets.
+
+        :param str context: SNMP context of the notification (used by SNMPv3 targets).
+        :param list var_binds: The variable bindings (see :meth:`var_binds`).
+        """
+        for name, version in self._targets:
+            start = time.time()
+            try:
+                self._originator.sendVarBinds(
+                    self.snmp_engine, "notify-" + name, None, context if version == "3" else "", var_binds,
+                    self._sent_callback, start)
+                self.num_sent += 1
+            except Exception:
+                self.num_failed += 1
+
+    def _sent_callback(self, snmp_engine, send_request_handle, error_indication, error_status, error_index,
+                       var_binds, start):
+        # Called when an inform is acknowledged or times out, or when a notification could not be sent at all
+        failed = bool(error_indication) or bool(error_status)
+        if failed:
+            self.num_failed += 1
+        if self.instrumentation is not None:
+            self.instrumentation.observe("snmp.inform", time.time() - start, failed)
+
+    def __str__(self):
+        return "notifications: sent %i, failed %i, rate-limited %i, duplicates %i" % (
+            self.num_sent, self.num_failed, self.limiter.num_suppressed, self.limiter.num_duplicates)
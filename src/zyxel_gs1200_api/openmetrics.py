@@ -0,0 +1,220 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Export of the switch status as OpenMetrics text (Prometheus exposition format) over HTTP.
+
+The metrics are rendered when a switch is polled, not when they are scraped. Label strings of each switch and port
+are built once when the switch is connected, and each poll only formats the values. A scrape just joins the cached
+texts of all switches (or returns the whole cached page if nothing was polled since the last scrape), so it never
+waits for a switch and scraping many switches is cheap.
+"""
+
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+__all__ = ['MetricsExporter', 'MetricsRenderer', 'content_type', 'escape_label_value']
+
+
+content_type = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+"""Content type of the rendered metrics."""
+
+# Metric families: (name, type, help)
+_switch_families = (
+    ("zyxel_switch", "info", "Information about the switch."),
+    ("zyxel_switch_last_poll_timestamp_seconds", "gauge", "Time when the published data were read from the switch."),
+    ("zyxel_switch_loop_detected", "gauge", "Whether a loop is detected on any port."),
+)
+_port_families = (
+    ("zyxel_port_admin_up", "gauge", "Whether the port is administratively enabled."),
+    ("zyxel_port_up", "gauge", "Whether the port is connected."),
+    ("zyxel_port_speed_bits_per_second", "gauge", "Current speed of the port."),
+    ("zyxel_port_max_speed_bits_per_second", "gauge", "Maximum speed of the port."),
+    ("zyxel_port_loop_detected", "gauge", "Whether a loop is detected on the port."),
+    ("zyxel_port_overheat_detected", "gauge", "Whether the port is overheating."),
+    ("zyxel_port_last_change_timestamp_seconds", "gauge", "Time of the last change of the link state."),
+    ("zyxel_port_counter_discontinuity_timestamp_seconds", "gauge", "Time of the last reset of the packet counters."),
+    ("zyxel_port_received_packets", "counter", "Number of received packets."),
+    ("zyxel_port_transmitted_packets", "counter", "Number of transmitted packets."),
+)
+_families = _switch_families + _port_families
+
+
+def escape_label_value(value):
+    """Escape a label value for the OpenMetrics text format.
+    :param str value: The value.
+    :rtype: str
+    """
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join('%s="%s"' % (k, escape_label_value(str(v))) for k, v in sorted(labels.items())) + "}"
+
+
+class _SwitchMetrics(object):
+    """Pre-built label strings and the last rendered samples of one switch."""
+
+    def __init__(self, name, switch):
+        self.switch_labels = _labels(switch=name)
+        self.info_labels = _labels(switch=name, model=switch.model_name, device_name=switch.device_name,
+                                   firmware=switch.firmware_version, mac=switch.mac_str, ip=switch.ip_addr)
+        self.port_labels = [_labels(switch=name, port=port.name, alias=port.alias, index=port.index + 1)
+                            for port in switch.ports]
+        self.samples = [""] * len(_families)
+        """Rendered samples of each metric family (in the order of the families)."""
+
+
+class MetricsRenderer(object):
+    """Renderer of the status of multiple switches as OpenMetrics text.
+
+    Call :meth:`init_switch` whenever a switch is (re)connected or its configuration (e.g. port aliases) changes, and
+    :meth:`update` after each poll. :meth:`render` returns the cached page and can be called from other threads.
+    """
+
+    def __init__(self):
+        self._switches = {}
+        self._lock = threading.Lock()
+        self._page = None
+
+    def init_switch(self, name, switch):
+        """Build the label strings of the switch and its ports.
+
+        :param str name: Name of the switch (value of the `switch` label).
+        :param Switch switch: The switch.
+        """
+        metrics = _SwitchMetrics(name, switch)
+        with self._lock:
+            self._switches[name] = metrics
+            self._page = None
+
+    def remove_switch(self, name):
+        """Stop exporting the switch.
+
+        :param str name: Name of the switch.
+        """
+        with self._lock:
+            self._switches.pop(name, None)
+            self._page = None
+
+    def update(self, name, switch, stamp):
+        """Render the current status of the switch.
+
+        :param str name: Name of the switch given to :meth:`init_switch`.
+        :param Switch switch: The switch updated by a poll.
+        :param float stamp: Time when the data were read from the switch.
+        """
+        metrics = self._switches.get(name)
+        if metrics is None:
+            self.init_switch(name, switch)
+            metrics = self._switches[name]
+        table = switch.port_table
+        port_labels = metrics.port_labels
+        n = min(len(port_labels), switch.num_ports)
+
+        def render_ports(metric, values):
+            return "".join("%s%s %s\n" % (metric, port_labels[i], values[i]) for i in range(n))
+
+        def flags(column):
+            return [1 if v > 0 else 0 for v in column]
+
+        samples = [
+            "zyxel_switch_info%s 1\n" % (metrics.info_labels,),
+            "zyxel_switch_last_poll_timestamp_seconds%s %.3f\n" % (metrics.switch_labels, stamp),
+            "zyxel_switch_loop_detected%s %i\n" % (metrics.switch_labels, any(v > 0 for v in table.loop_detected)),
+            render_ports("zyxel_port_admin_up", flags(table.enabled)),
+            render_ports("zyxel_port_up", flags(table.connected)),
+            render_ports("zyxel_port_speed_bits_per_second", table.speed),
+            render_ports("zyxel_port_max_speed_bits_per_second", [p.max_speed for p in switch.ports]),
+            render_ports("zyxel_port_loop_detected", flags(table.loop_detected)),
+            render_ports("zyxel_port_overheat_detected", flags(table.overheat_detected)),
+            render_ports("zyxel_port_last_change_timestamp_seconds", ["%.3f" % t for t in table.last_change_time]),
+            render_ports("zyxel_port_counter_discontinuity_timestamp_seconds",
+                         ["%.3f" % t for t in table.last_packet_jump_back_time]),
+            render_ports("zyxel_port_received_packets_total", [
+                a + b + c for a, b, c in zip(
+                    table.rx.num_unicast_packets, table.rx.num_multicast_packets, table.rx.num_broadcast_packets)]),
+            render_ports("zyxel_port_transmitted_packets_total", [
+                a + b + c for a, b, c in zip(
+                    table.tx.num_unicast_packets, table.tx.num_multicast_packets, table.tx.num_broadcast_packets)]),
+        ]
+        with self._lock:
+            metrics.samples = samples
+            self._page = None
+
+    def render(self):
+        """Return the metrics of all switches.
+
+        :return: The OpenMetrics text encoded in UTF-8.
+        :rtype: bytes
+        """
+        with self._lock:
+            if self._page is None:
+                switches = [self._switches[name] for name in sorted(self._switches)]
+                parts = []
+                for i, (name, metric_type, help_text) in enumerate(_families):
+                    parts.append("# TYPE %s %s\n# HELP %s %s\n" % (name, metric_type, name, help_text))
+                    parts.extend(s.samples[i] for s in switches)
+                parts.append("# EOF\n")
+                self._page = "".join(parts).encode("utf-8")
+            return self._page
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.renderer.render()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsExporter(object):
+    """HTTP server publishing the metrics rendered by :class:`MetricsRenderer` at `/metrics`."""
+
+    def __init__(self, renderer, host="0.0.0.0", port=9125):
+        """
+        :param MetricsRenderer renderer: The renderer.
+        :param str host: Listening address.
+        :param int port: Listening port.
+        """
+        self.renderer = renderer
+        self._server = _ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.renderer = renderer
+        self._thread = None
+
+    @property
+    def port(self):
+        """The listening port."""
+        return self._server.server_address[1]
+
+    def start(self):
+        """Start serving in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the server."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,289 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Parsers of the data returned by the web API of the switch.
+
+The serial console backend converts the console output to the same dicts, so all backends share these parsers. The
+module does not depend on any HTTP library.
+"""
+
+import time
+from array import array
+
+from .mac_table import MacTable, mac_to_bin
+from .types import Capabilities, MacTableEntry, Port, PortTable, Switch
+
+__all__ = ['get_port_name', 'parse_counters', 'parse_link_states', 'parse_mac_table', 'parse_main_info',
+           'parse_port_info', 'parse_port_states', 'parse_switch', 'parse_switch_config', 'parse_system_data']
+
+
+def get_one_of(data, keys):
+    for key in keys:
+        if key in data:
+            return data[key]
+    raise KeyError("None of the keys %r found in %s" % (keys, data.keys()))
+
+
+# These are the strings coming from Zyxel API
+if_speeds = {
+    "10 Mbps": 10000000,
+    "100 Mbps": 100000000,
+    "1 Gbps": 1000000000,
+    "2.5 Gbps": 2500000000,
+    "5 Gbps": 5000000000,
+    "10 Gbps": 10000000000,
+}
+
+
+port_type_speeds = {
+    0: 10000000,
+    1: 100000000,
+    2: 1000000000,
+    3: 2500000000,
+    4: 5000000000,
+    6: 10000000000,
+}
+
+
+port_type_device_names = {
+    0: "Ethernet",
+    1: "FastEthernet",
+    2: "GigabitEthernet",
+    3: "TwoPointFiveGigabitEthernet",
+    4: "FiveGigabitEthernet",
+    6: "TenGigabitEthernet",
+}
+
+
+port_type_device_short_names = {
+    0: "et",
+    1: "fe",
+    2: "ge",
+    3: "tw",
+    4: "fe",
+    6: "tg",
+}
+
+
+def get_port_name(port_types, num, short=False):
+    port_type = port_types[num]
+    port_num = 0
+    for i in range(num):
+        if port_types[i] == port_type:
+            port_num += 1
+    device_names = port_type_device_short_names if short else port_type_device_names
+    return device_names[port_type] + str(port_num + 1)
+
+
+def parse_switch(main_data, port_data):
+    """Create the switch instance from the responses of the web API.
+    :param dict main_data: Data of the `home_main` response.
+    :param dict port_data: Data of the `port_portInfo` response.
+    :return: The populated switch instance.
+    :rtype: Switch
+    :raises: RuntimeError
+    """
+    switch = Switch()
+
+    switch.first_login = main_data["sys_first_login"] != '0'
+
+    if switch.first_login:
+        raise RuntimeError("Complete the first-time setup before accessing the switch API.")
+
+    capabilities = main_data["capability"]
+    switch.capabilities = Capabilities()
+    switch.capabilities.ssh = bool(capabilities.get("ssh", False))
+    switch.capabilities.https = bool(capabilities.get("https", False))
+    switch.capabilities.websock = bool(capabilities.get("websock", False))
+    switch.capabilities.debug_img = bool(capabilities.get("debug_img", False))
+    switch.capabilities.mgmt_vlan = bool(capabilities.get("mgmt_vlan", False))
+    switch.capabilities.overheat_protect = bool(capabilities.get("overheat_protect", False))
+
+    switch.model_name = main_data["model_name"]
+    switch.device_name = main_data["sys_dev_name"]
+    switch.firmware_version = main_data["sys_fmw_ver"]
+    switch.firmware_build_date = main_data["sys_bld_date"]
+    switch.max_mtu = 12288 if switch.model_name.startswith("XGS") else 9000
+
+    switch.mac_str = main_data["sys_MAC"].lower()
+    try:
+        switch.mac_bin = bytes.fromhex(switch.mac_str.replace(":", ""))
+    except AttributeError:  # Python 2
+        switch.mac_bin = switch.mac_str.replace(":", "").decode('hex')
+
+    switch.ip_addr = main_data["sys_IP"]
+    switch.ip_subnet = main_data["sys_sbnt_msk"]
+    switch.ip_gateway = main_data["sys_gateway"]
+    switch.dhcp_enabled = main_data["sys_dhcp_state"] != '0'
+
+    switch.description = "Zyxel %s (FW %s) at %s/%s%s" % (
+        switch.model_name, switch.firmware_version, switch.ip_addr, switch.ip_subnet,
+        " (DHCP client)" if switch.dhcp_enabled else "")
+
+    # ABTY.6 firmware renamed Max_port to max_port
+    switch.num_ports = int(get_one_of(main_data, ("Max_port", "max_port")))
+
+    switch.port_table = PortTable(switch.num_ports)
+    switch.ports = []
+    for i in range(switch.num_ports):
+        port = Port(switch.port_table.status(i))
+        port.index = i
+        port.max_speed = port_type_speeds[port_data["portType"][i]]
+        port.name = get_port_name(port_data["portType"], i, short=False)
+        port.short_name = get_port_name(port_data["portType"], i, short=True)
+        port.alias = port.name
+        port.mtu = switch.max_mtu
+        port.is_copper = bool(port_data["isCopper"])
+        port.mac_bin = switch.mac_bin
+        port.mac_str = switch.mac_str
+        port.status.enabled = bool((port_data["portState"] >> i) & 1)
+        switch.ports.append(port)
+
+    return switch
+
+
+def parse_switch_config(switch, main_data, port_data):
+    """Update semi-static configuration of the switch from the responses of the web API.
+    :param Switch switch: The switch instance to update.
+    :param dict main_data: Data of the `home_main` response.
+    :param dict port_data: Data of the `port_portInfo` response.
+    """
+    parse_main_info(switch, main_data)
+    parse_port_info(switch, port_data)
+
+
+def parse_main_info(switch, main_data):
+    """Update general information about the switch from the response of the web API.
+    :param Switch switch: The switch instance to update.
+    :param dict main_data: Data of the `home_main` response.
+    :return: Whether anything changed.
+    :rtype: bool
+    """
+    before = (switch.first_login, switch.device_name, switch.firmware_version, switch.firmware_build_date,
+              switch.mac_str, switch.ip_addr, switch.ip_subnet, switch.ip_gateway, switch.dhcp_enabled)
+
+    switch.first_login = main_data["sys_first_login"] != '0'
+    switch.device_name = main_data["sys_dev_name"]
+    switch.firmware_version = main_data["sys_fmw_ver"]
+    switch.firmware_build_date = main_data["sys_bld_date"]
+
+    mac_str = main_data["sys_MAC"].lower()
+    if mac_str != switch.mac_str:
+        switch.mac_str = mac_str
+        switch.mac_bin = mac_to_bin(mac_str)
+
+    switch.ip_addr = main_data["sys_IP"]
+    switch.ip_subnet = main_data["sys_sbnt_msk"]
+    switch.ip_gateway = main_data["sys_gateway"]
+    switch.dhcp_enabled = main_data["sys_dhcp_state"] != '0'
+
+    for port in switch.ports:
+        port.mac_bin = switch.mac_bin
+        port.mac_str = switch.mac_str
+
+    return before != (switch.first_login, switch.device_name, switch.firmware_version, switch.firmware_build_date,
+                      switch.mac_str, switch.ip_addr, switch.ip_subnet, switch.ip_gateway, switch.dhcp_enabled)
+
+
+def parse_port_info(switch, port_data):
+    """Update configuration of the switch ports from the response of the web API.
+    :param Switch switch: The switch instance to update.
+    :param dict port_data: Data of the `port_portInfo` response.
+    :return: Whether anything changed.
+    :rtype: bool
+    """
+    changed = False
+    for i in range(switch.num_ports):
+        port = switch.ports[i]
+        max_speed = port_type_speeds[port_data["portType"][i]]
+        enabled = bool((port_data["portState"] >> i) & 1)
+        changed = changed or port.max_speed != max_speed or port.status.enabled != enabled
+        port.max_speed = max_speed
+        port.mtu = switch.max_mtu
+        port.status.enabled = enabled
+    return changed
+
+
+def parse_port_states(switch, sys_data, link_data):
+    """Update dynamic status of the switch from the responses of the web API.
+    :param Switch switch: The switch instance to update.
+    :param dict sys_data: Data of the `home_systemData` response.
+    :param dict link_data: Data of the `home_linkData` response.
+    """
+    parse_system_data(switch, sys_data)
+    parse_link_states(switch, link_data)
+    parse_counters(switch, link_data)
+
+
+def parse_system_data(switch, sys_data):
+    """Update the loop status and the network configuration of the switch from the response of the web API.
+    :param Switch switch: The switch instance to update.
+    :param dict sys_data: Data of the `home_systemData` response.
+    :return: Whether anything changed.
+    :rtype: bool
+    """
+    loop_detected = switch.port_table.loop_detected
+    before = (switch.device_name, switch.mac_str, switch.ip_addr, switch.ip_subnet, switch.ip_gateway,
+              switch.dhcp_enabled, loop_detected.tolist())
+
+    switch.device_name = sys_data["sys_dev_name"]
+    # The address repeats in every response, it is only converted when it changes
+    mac_str = sys_data["sys_MAC"].lower()
+    if mac_str != switch.mac_str:
+        switch.mac_str = mac_str
+        switch.mac_bin = mac_to_bin(mac_str)
+
+    switch.ip_addr = sys_data["sys_IP"]
+    switch.ip_subnet = sys_data["sys_sbnt_msk"]
+    switch.ip_gateway = sys_data["sys_gateway"]
+    switch.dhcp_enabled = sys_data["sys_dhcp_state"] != '0'
+
+    loop_detected[:] = array('b', [s != "Normal" for s in sys_data["loop_status"][:switch.num_ports]])
+
+    return before != (switch.device_name, switch.mac_str, switch.ip_addr, switch.ip_subnet, switch.ip_gateway,
+                      switch.dhcp_enabled, loop_detected.tolist())
+
+
+def parse_link_states(switch, link_data):
+    """Update link states of the switch ports from the response of the web API.
+    :param Switch switch: The switch instance to update.
+    :param dict link_data: Data of the `home_linkData` response.
+    :return: Whether the link state, speed or overheat status of any port changed.
+    :rtype: bool
+    """
+    return switch.port_table.update_link_data(link_data, if_speeds, switch.capabilities.overheat_protect, time.time())
+
+
+def parse_counters(switch, link_data):
+    """Update packet counters of the switch ports from the response of the web API.
+
+    The raw counters of the switch are written. Wrap-arounds and resets are handled by
+    :class:`~zyxel_gs1200_api.counters.CounterEngine` in :class:`~zyxel_gs1200_api.api.ZyxelAPI`.
+
+    :param Switch switch: The switch instance to update.
+    :param dict link_data: Data of the `home_linkData` response.
+    """
+    switch.port_table.update_counters(link_data["Stats"])
+
+
+def parse_mac_table(switch, mac_data):
+    """Update the MAC address forwarding table of the switch from the response of the web API.
+    :param Switch switch: The switch instance to update.
+    :param dict mac_data: Data of the MAC table response. It is expected to contain key `macTable` with a list of dicts
+                          with keys `mac`, `vid`, `port` (1-based) and `type` (`static` or `dynamic`).
+    :return: The changes of the table since the previous update.
+    :rtype: MacTableDiff
+    """
+    entries = []
+    for item in mac_data["macTable"]:
+        entry = MacTableEntry()
+        entry.mac_str = item["mac"].lower()
+        entry.mac_bin = mac_to_bin(entry.mac_str)
+        entry.vlan = int(item.get("vid", 1))
+        entry.port_index = int(item["port"]) - 1
+        entry.is_static = str(item.get("type", "dynamic")).lower() == "static"
+        entries.append(entry)
+
+    if switch.mac_table is None:
+        switch.mac_table = MacTable()
+    return switch.mac_table.update(entries)
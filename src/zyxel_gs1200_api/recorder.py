@@ -0,0 +1,369 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Recording of the history of port statistics into fixed-size memory-mapped ring files.
+
+Each switch gets one file with two rings of samples:
+
+- The full-resolution ring stores every recorded sample.
+- The downsampled ring stores one sample per `downsample_interval` and thus covers a much longer time span.
+
+Both rings have a fixed capacity, so the file never grows and the oldest samples are overwritten. The counters are
+cumulative, so rates computed between two downsampled samples are exact averages over the interval. A query reads
+only the samples (and ports) it needs, so the history can be inspected even on a slow embedded computer::
+
+    python -m zyxel_gs1200_api.recorder /var/log/zyxel/sw1.zrec --since 3600
+"""
+
+from __future__ import print_function
+
+import argparse
+import mmap
+import os
+import re
+import struct
+import time
+
+from .types import PortRates
+
+__all__ = ['RecordedPort', 'RecordedSample', 'Recorder', 'SwitchRecorder']
+
+
+_magic = b"ZYXREC01"
+_header = struct.Struct("<8sIIIIdQQQQ")  # magic, num_ports, record size, capacities, interval, heads and counts
+_header_size = 64
+_stamp = struct.Struct("<d")
+_port = struct.Struct("<BIQQQQ")  # flags, speed in Mbps, rx/tx packets, rx/tx bytes
+
+_flag_connected = 1
+_flag_loop_detected = 2
+_flag_overheat_detected = 4
+_flag_enabled = 8
+_flag_flapped = 16
+
+
+class RecordedPort(object):
+    """Recorded status of one port."""
+    index = 0
+    """Index of the port."""
+    enabled = False
+    """Whether the port was administratively enabled."""
+    connected = False
+    """Whether the port was connected."""
+    flapped = False
+    """Whether the link state changed since the previous sample (only set in downsampled samples)."""
+    loop_detected = False
+    """Whether a loop was detected."""
+    overheat_detected = False
+    """Whether the port was overheating."""
+    speed = 0
+    """Speed of the port in bps."""
+    rx_packets = 0
+    """Total number of received packets."""
+    tx_packets = 0
+    """Total number of transmitted packets."""
+    rx_bytes = 0
+    """Total number of received bytes."""
+    tx_bytes = 0
+    """Total number of transmitted bytes."""
+    rates = None  # PortRates
+    """Rates since the previous sample returned by the same query (None for the first sample)."""
+
+
+class RecordedSample(object):
+    """One recorded sample of a switch."""
+    stamp = 0.0
+    """Time of the sample."""
+    ports = []  # List[RecordedPort]
+    """Status of the queried ports."""
+
+
+class _Ring(object):
+    """One ring of fixed-size records in the memory-mapped file."""
+
+    def __init__(self, mm, offset, capacity, record_size):
+        self.mm = mm
+        self.offset = offset
+        self.capacity = capacity
+        self.record_size = record_size
+        self.head = 0
+        """Slot where the next record will be written."""
+        self.count = 0
+        """Number of valid records."""
+
+    def slot_offset(self, index):
+        """Offset of the record with the given logical index (0 is the oldest record)."""
+        return self.offset + ((self.head - self.count + index) % self.capacity) * self.record_size
+
+    def stamp(self, index):
+        return _stamp.unpack_from(self.mm, self.slot_offset(index))[0]
+
+    def bisect(self, stamp):
+        """Logical index of the first record not older than `stamp`."""
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.stamp(mid) < stamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def append(self, record):
+        start = self.offset + self.head * self.record_size
+        self.mm[start:start + self.record_size] = record
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+
+class SwitchRecorder(object):
+    """Recorder of the port statistics of one switch into a memory-mapped ring file."""
+
+    def __init__(self, path, num_ports, capacity=36000, downsample_interval=60.0, downsampled_capacity=10080):
+        """
+        :param str path: Path to the file. An existing file with the same layout is reused, otherwise it is recreated.
+        :param int num_ports: Number of ports of the switch.
+        :param int capacity: Number of full-resolution samples kept (10 hours at 1 Hz by default).
+        :param float downsample_interval: Interval between downsampled samples (in seconds).
+        :param int downsampled_capacity: Number of downsampled samples kept (1 week at 1 sample/minute by default).
+        """
+        self.path = path
+        self.num_ports = num_ports
+        self.downsample_interval = downsample_interval
+        record_size = _stamp.size + num_ports * _port.size
+        size = _header_size + (capacity + downsampled_capacity) * record_size
+
+        header = None
+        if os.path.exists(path) and os.path.getsize(path) == size:
+            with open(path, "rb") as f:
+                header = _header.unpack(f.read(_header.size))
+            if header[:6] != (_magic, num_ports, record_size, capacity, downsampled_capacity, downsample_interval):
+                header = None
+        if header is None:
+            with open(path, "wb") as f:
+                f.truncate(size)
+
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        self.samples = _Ring(self._mm, _header_size, capacity, record_size)
+        """The full-resolution ring."""
+        self.downsampled = _Ring(self._mm, _header_size + capacity * record_size, downsampled_capacity, record_size)
+        """The downsampled ring."""
+        if header is not None:
+            self.samples.head, self.samples.count, self.downsampled.head, self.downsampled.count = header[6:]
+        self._flapped = [False] * num_ports
+        self._last_connected = None
+        self._write_header()
+
+    def _write_header(self):
+        _header.pack_into(self._mm, 0, _magic, self.num_ports, self.samples.record_size, self.samples.capacity,
+                          self.downsampled.capacity, self.downsample_interval, self.samples.head, self.samples.count,
+                          self.downsampled.head, self.downsampled.count)
+
+    def record(self, switch, stamp=None):
+        """Append a sample of the current status of the switch.
+
+        :param Switch switch: The switch updated by :meth:`ZyxelAPI.update_port_states`.
+        :param float stamp: Time of the sample. If None, current time is used.
+        """
+        if stamp is None:
+            stamp = time.time()
+        if self.samples.count > 0 and stamp < self.samples.stamp(self.samples.count - 1):
+            return  # the clock jumped back; the rings have to stay sorted
+        table = switch.port_table
+        rx, tx = table.rx, table.tx
+        record = bytearray(self.samples.record_size)
+        _stamp.pack_into(record, 0, stamp)
+        connected = table.connected.tolist()
+        for i in range(min(self.num_ports, switch.num_ports)):
+            if self._last_connected is not None and connected[i] != self._last_connected[i]:
+                self._flapped[i] = True
+            flags = (_flag_connected if connected[i] > 0 else 0) | \
+                (_flag_loop_detected if table.loop_detected[i] > 0 else 0) | \
+                (_flag_overheat_detected if table.overheat_detected[i] > 0 else 0) | \
+                (_flag_enabled if table.enabled[i] > 0 else 0)
+            _port.pack_into(
+                record, _stamp.size + i * _port.size, flags, table.speed[i] // 1000000,
+                rx.num_unicast_packets[i] + rx.num_multicast_packets[i] + rx.num_broadcast_packets[i],
+                tx.num_unicast_packets[i] + tx.num_multicast_packets[i] + tx.num_broadcast_packets[i],
+                rx.num_bytes[i], tx.num_bytes[i])
+        self._last_connected = connected
+        self.samples.append(record)
+
+        downsampled = self.downsampled
+        if downsampled.count == 0 or stamp - downsampled.stamp(downsampled.count - 1) >= self.downsample_interval:
+            for i in range(self.num_ports):
+                if self._flapped[i]:
+                    offset = _stamp.size + i * _port.size
+                    record[offset] |= _flag_flapped
+            self._flapped = [False] * self.num_ports
+            downsampled.append(record)
+        self._write_header()
+
+    def time_range(self, downsampled=False):
+        """Return the time span of the stored samples.
+
+        :param bool downsampled: Whether to return the span of the downsampled ring.
+        :return: Tuple (oldest stamp, newest stamp) or None if there are no samples.
+        :rtype: tuple
+        """
+        ring = self.downsampled if downsampled else self.samples
+        if ring.count == 0:
+            return None
+        return ring.stamp(0), ring.stamp(ring.count - 1)
+
+    def query(self, start=0.0, end=float('inf'), ports=None, downsampled=None):
+        """Return the recorded samples from the given time range.
+
+        :param float start: Start of the range (inclusive).
+        :param float end: End of the range (inclusive).
+        :param ports: Indices of the ports to return. If None, all ports are returned.
+        :type ports: list of int
+        :param bool downsampled: Whether to read the downsampled ring. If None, the full-resolution ring is used if it
+                                 reaches back to `start`, otherwise the downsampled ring is used.
+        :return: The samples ordered by time.
+        :rtype: list of RecordedSample
+        """
+        if ports is None:
+            ports = range(self.num_ports)
+        if downsampled is None:
+            downsampled = self.samples.count == 0 or self.samples.stamp(0) > start
+        ring = self.downsampled if downsampled else self.samples
+
+        samples = []
+        previous = None
+        index = ring.bisect(start)
+        while index < ring.count:
+            offset = ring.slot_offset(index)
+            stamp = _stamp.unpack_from(self._mm, offset)[0]
+            if stamp > end:
+                break
+            sample = RecordedSample()
+            sample.stamp = stamp
+            sample.ports = []
+            for i, port_index in enumerate(ports):
+                flags, speed, rx_packets, tx_packets, rx_bytes, tx_bytes = _port.unpack_from(
+                    self._mm, offset + _stamp.size + port_index * _port.size)
+                port = RecordedPort()
+                port.index = port_index
+                port.enabled = bool(flags & _flag_enabled)
+                port.connected = bool(flags & _flag_connected)
+                port.flapped = bool(flags & _flag_flapped)
+                port.loop_detected = bool(flags & _flag_loop_detected)
+                port.overheat_detected = bool(flags & _flag_overheat_detected)
+                port.speed = speed * 1000000
+                port.rx_packets, port.tx_packets, port.rx_bytes, port.tx_bytes = \
+                    rx_packets, tx_packets, rx_bytes, tx_bytes
+                duration = stamp - previous.stamp if previous is not None else 0.0
+                if duration > 0:
+                    last = previous.ports[i]
+                    port.rates = PortRates()
+                    port.rates.window = duration
+                    port.rates.rx_pps = max(rx_packets - last.rx_packets, 0) / duration
+                    port.rates.tx_pps = max(tx_packets - last.tx_packets, 0) / duration
+                    port.rates.rx_bps = max(rx_bytes - last.rx_bytes, 0) * 8 / duration
+                    port.rates.tx_bps = max(tx_bytes - last.tx_bytes, 0) * 8 / duration
+                sample.ports.append(port)
+            samples.append(sample)
+            previous = sample
+            index += 1
+        return samples
+
+    def flush(self):
+        """Flush the written samples to the disk."""
+        self._mm.flush()
+
+    def close(self):
+        """Flush and close the file."""
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._file.close()
+            self._mm = None
+
+
+class Recorder(object):
+    """Recorder of the port statistics of multiple switches, each into its own ring file in a directory."""
+
+    def __init__(self, directory, capacity=36000, downsample_interval=60.0, downsampled_capacity=10080):
+        """
+        :param str directory: The directory with the ring files. It is created if it does not exist.
+        :param int capacity: Number of full-resolution samples kept for each switch.
+        :param float downsample_interval: Interval between downsampled samples (in seconds).
+        :param int downsampled_capacity: Number of downsampled samples kept for each switch.
+        """
+        self.directory = directory
+        self.capacity = capacity
+        self.downsample_interval = downsample_interval
+        self.downsampled_capacity = downsampled_capacity
+        self.recorders = {}
+        """Recorders of the individual switches (keyed by name)."""
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def path(self, name):
+        """Return the path of the ring file of the given switch.
+        :param str name: Name of the switch.
+        :rtype: str
+        """
+        return os.path.join(self.directory, "%s.zrec" % (re.sub(r"[^\w.-]", "_", name) or "default",))
+
+    def record(self, name, switch, stamp=None):
+        """Append a sample of the current status of the switch.
+
+        :param str name: Name of the switch.
+        :param Switch switch: The switch updated by :meth:`ZyxelAPI.update_port_states`.
+        :param float stamp: Time of the sample. If None, current time is used.
+        """
+        recorder = self.recorders.get(name)
+        if recorder is None or recorder.num_ports != switch.num_ports:
+            if recorder is not None:
+                recorder.close()
+            recorder = SwitchRecorder(self.path(name), switch.num_ports, self.capacity, self.downsample_interval,
+                                      self.downsampled_capacity)
+            self.recorders[name] = recorder
+        recorder.record(switch, stamp)
+
+    def close(self):
+        """Close all ring files."""
+        for recorder in self.recorders.values():
+            recorder.close()
+        self.recorders = {}
+
+
+def _read_header(path):
+    with open(path, "rb") as f:
+        header = _header.unpack(f.read(_header.size))
+    if header[0] != _magic:
+        raise RuntimeError("%s is not a port statistics recording." % (path,))
+    return header
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print port statistics recorded by the switch SNMP agent.")
+    parser.add_argument("path", help="The ring file.")
+    parser.add_argument("--since", type=float, default=600.0, help="How many seconds back to print.")
+    parser.add_argument("--ports", type=int, nargs="+", help="Indices of the ports to print (default all).")
+    parser.add_argument("--downsampled", action="store_true", help="Read the downsampled samples.")
+    args = parser.parse_args(argv)
+
+    _, num_ports, _, capacity, downsampled_capacity, downsample_interval = _read_header(args.path)[:6]
+    recorder = SwitchRecorder(args.path, num_ports, capacity, downsample_interval, downsampled_capacity)
+    try:
+        samples = recorder.query(time.time() - args.since, ports=args.ports,
+                                 downsampled=True if args.downsampled else None)
+        print("%-19s %4s %4s %10s %12s %12s" % ("Time", "Port", "Link", "Speed", "Rx (pps)", "Tx (pps)"))
+        for sample in samples:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sample.stamp))
+            for port in sample.ports:
+                print("%-19s %4i %4s %10s %12.1f %12.1f" % (
+                    stamp, port.index + 1, ("Up" if port.connected else "Down") + ("*" if port.flapped else ""),
+                    "%i Mbps" % (port.speed // 1000000,) if port.connected else "",
+                    port.rates.rx_pps if port.rates is not None else 0.0,
+                    port.rates.tx_pps if port.rates is not None else 0.0))
+    finally:
+        recorder.close()
+
+
+if __name__ == "__main__":
+    main()
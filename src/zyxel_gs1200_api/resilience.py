@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Handling of unreachable switches: exponential backoff of reconnects and a circuit breaker.
+
+A switch that fails several polls in a row is not polled at all for a while (the circuit is *open*). After the
+backoff delay, one trial poll is allowed (*half-open*). If it succeeds, regular polling resumes (*closed*), otherwise
+the circuit opens again for a longer time. The delays grow exponentially and are randomized, so that many agents or
+many switches do not retry in lockstep.
+"""
+
+import random
+import threading
+import time
+
+__all__ = ['Backoff', 'CircuitBreaker', 'health_states']
+
+
+health_states = ("ok", "stale", "unreachable")
+"""Health of a switch as seen by the agent: the data are fresh, the last polls failed and the data are older than the
+stale timeout, or the circuit breaker of the switch is open."""
+
+
+class Backoff(object):
+    """Exponentially growing delays with random jitter."""
+
+    def __init__(self, initial=1.0, maximum=300.0, multiplier=2.0, jitter=0.5, rng=None):
+        """
+        :param float initial: The first delay (in seconds).
+        :param float maximum: Maximum delay (in seconds).
+        :param float multiplier: Each delay is this many times longer than the previous one.
+        :param float jitter: Maximum relative random shortening of each delay (0-1).
+        :param random.Random rng: The random generator (the global one is used if None).
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.attempts = 0
+        """Number of delays returned since the last reset."""
+        self._rng = rng if rng is not None else random
+
+    def next_delay(self):
+        """Return the next delay.
+        :return: The delay in seconds.
+        :rtype: float
+        """
+        delay = min(self.initial * self.multiplier ** min(self.attempts, 64), self.maximum)
+        self.attempts += 1
+        return delay * (1.0 - self.jitter * self._rng.random())
+
+    def reset(self):
+        """Start again from the initial delay."""
+        self.attempts = 0
+
+
+class CircuitBreaker(object):
+    """Circuit breaker of the polls of one switch. It is thread-safe."""
+
+    closed = "closed"
+    """Polls are allowed."""
+    open = "open"
+    """Polls are not allowed until :attr:`open_until`."""
+    half_open = "half_open"
+    """A trial poll is allowed. Its result closes or opens the circuit."""
+
+    def __init__(self, failure_threshold=3, backoff=None):
+        """
+        :param int failure_threshold: Number of consecutive failures that open the circuit.
+        :param Backoff backoff: Durations of the open state. If None, delays from 1 s to 5 min are used.
+        """
+        self.failure_threshold = failure_threshold
+        self.backoff = backoff if backoff is not None else Backoff()
+        self.state = self.closed
+        """Current state of the circuit."""
+        self.consecutive_failures = 0
+        """Number of failures since the last success."""
+        self.open_until = 0.0
+        """Time until which the circuit is open."""
+        self.num_opened = 0
+        """How many times the circuit has opened."""
+        self.num_rejected = 0
+        """Number of polls not allowed because the circuit was open."""
+        self._lock = threading.Lock()
+
+    def available(self, now=None):
+        """Whether a poll would be allowed now (does not change the state).
+
+        :param float now: Current time (:func:`time.time` if None).
+        :rtype: bool
+        """
+        with self._lock:
+            return self.state != self.open or (now if now is not None else time.time()) >= self.open_until
+
+    def allow(self, now=None):
+        """Ask for a permission to poll. An open circuit whose delay has passed becomes half-open.
+
+        :param float now: Current time (:func:`time.time` if None).
+        :return: Whether the poll may be started.
+        :rtype: bool
+        """
+        with self._lock:
+            if self.state == self.open:
+                if (now if now is not None else time.time()) < self.open_until:
+                    self.num_rejected += 1
+                    return False
+                self.state = self.half_open
+            return True
+
+    def record_success(self):
+        """Record a successful poll. It closes the circuit."""
+        with self._lock:
+            self.state = self.closed
+            self.consecutive_failures = 0
+            self.backoff.reset()
+
+    def record_failure(self, now=None):
+        """Record a failed poll. It opens the circuit if it was a trial or if there were too many failures in a row.
+
+        :param float now: Current time (:func:`time.time` if None).
+        """
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.half_open or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.open
+                self.open_until = (now if now is not None else time.time()) + self.backoff.next_delay()
+                self.num_opened += 1
+
+    def __str__(self):
+        with self._lock:
+            text = "circuit %s, failures %i, opened %i times, rejected polls %i" % (
+                self.state, self.consecutive_failures, self.num_opened, self.num_rejected)
+            if self.state == self.open:
+                text += ", retry in %.1f s" % (max(self.open_until - time.time(), 0.0),)
+            return text
@@ -0,0 +1,134 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Short-lived cache of responses of a switch shared by the calls of one poll cycle.
+
+Several API calls read the same endpoints (e.g. :meth:`ZyxelAPI.get_switch` and :meth:`ZyxelAPI.update_switch_config`
+both read `home_main` and `port_portInfo`). With the cache, each endpoint is fetched at most once per TTL, and a request
+that is already in flight is awaited instead of being sent again by another thread.
+"""
+
+import threading
+import time
+
+__all__ = ['ResponseCache']
+
+
+class _Pending(object):
+    """A fetch in flight awaited by the other threads needing the same key."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class ResponseCache(object):
+    """Cache of responses keyed by the command, with a TTL, explicit invalidation and deduplication of requests in
+    flight."""
+
+    def __init__(self, ttl=0.0, put_ttl=1.0, clock=time.time):
+        """
+        :param float ttl: How long a response is reused (in seconds). Zero only shares the responses of requests in
+                          flight.
+        :param float put_ttl: How long a value cached by :meth:`put` waits for the next :meth:`get` if `ttl` is shorter
+                              (in seconds).
+        :param clock: The function returning the current time.
+        """
+        self.ttl = ttl
+        self.put_ttl = put_ttl
+        self.num_hits = 0
+        """Number of values returned from the cache."""
+        self.num_misses = 0
+        """Number of values fetched from the switch."""
+        self.num_coalesced = 0
+        """Number of values awaited from a fetch of another thread."""
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._values = {}  # key -> (time of the fetch, value)
+        self._primed = {}  # key -> (time of the put, value) for the next get only
+        self._pending = {}  # key -> _Pending
+        self._generation = 0
+
+    def get(self, key, fetch):
+        """Return the cached value of `key` or fetch it.
+
+        :param key: The key (e.g. the `cmd` of the request).
+        :param fetch: Function without arguments returning the value. Its exceptions are raised to all callers waiting
+                      for it and nothing is cached.
+        :return: The value.
+        """
+        with self._lock:
+            primed = self._primed.pop(key, None)
+            if primed is not None and self._clock() - primed[0] < max(self.ttl, self.put_ttl):
+                self.num_hits += 1
+                return primed[1]
+            entry = self._values.get(key)
+            if entry is not None and self._clock() - entry[0] < self.ttl:
+                self.num_hits += 1
+                return entry[1]
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+                generation = self._generation
+                self.num_misses += 1
+            else:
+                self.num_coalesced += 1
+        if not owner:
+            pending.done.wait()
+            if pending.error is not None:
+                raise pending.error
+            return pending.value
+
+        fetch_time = self._clock()
+        try:
+            pending.value = fetch()
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+                # A value fetched across an invalidation may be outdated
+                if pending.error is None and self.ttl > 0 and generation == self._generation:
+                    self._values[key] = (fetch_time, pending.value)
+            pending.done.set()
+        return pending.value
+
+    def put(self, key, value):
+        """Cache a value fetched outside of :meth:`get`.
+
+        The next :meth:`get` of the key returns the value if it comes within the TTL or within `put_ttl` (whichever is
+        longer), so that a value put right before it is used is not fetched again even with a zero TTL. Later calls
+        reuse it only within the TTL. :meth:`invalidate` drops it.
+
+        :param key: The key.
+        :param value: The value.
+        """
+        with self._lock:
+            now = self._clock()
+            if self.ttl > 0:
+                self._values[key] = (now, value)
+            self._primed[key] = (now, value)
+
+    def invalidate(self, key=None):
+        """Drop a cached value so that the next :meth:`get` fetches it again.
+
+        :param key: The key to drop. If None, all values are dropped.
+        """
+        with self._lock:
+            if key is None:
+                self._values.clear()
+                self._primed.clear()
+                self._pending.clear()
+                self._generation += 1
+            else:
+                self._values.pop(key, None)
+                self._primed.pop(key, None)
+                if self._pending.pop(key, None) is not None:
+                    self._generation += 1
+
+    def __str__(self):
+        return "response cache: hits %i, misses %i, coalesced %i" % (self.num_hits, self.num_misses, self.num_coalesced)
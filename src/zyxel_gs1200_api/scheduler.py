@@ -0,0 +1,208 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Adaptive scheduling of polls of the individual data sources of a switch."""
+
+import random
+import time
+
+from .backend import data_sources
+
+__all__ = ['PollScheduler', 'SourceSchedule', 'default_intervals']
+
+
+default_intervals = {
+    "link": (1.0, 10.0),
+    "counters": (2.0, 10.0),
+    "loop": (2.0, 30.0),
+    "main": (60.0, 600.0),
+    "port_info": (30.0, 300.0),
+}
+"""Default (minimum, maximum) poll intervals of the data sources in seconds."""
+
+
+class SourceSchedule(object):
+    """Schedule and statistics of one data source."""
+
+    def __init__(self, name, min_interval, max_interval):
+        """
+        :param str name: Name of the data source.
+        :param float min_interval: Poll interval used while the data keep changing (in seconds).
+        :param float max_interval: Poll interval the schedule backs off to when nothing changes (in seconds).
+        """
+        self.name = name
+        """Name of the data source."""
+        self.min_interval = min_interval
+        """Poll interval used while the data keep changing (in seconds)."""
+        self.max_interval = max(min_interval, max_interval)
+        """Poll interval the schedule backs off to when nothing changes (in seconds)."""
+        self.interval = min_interval
+        """Current poll interval (in seconds)."""
+        self.next_time = 0.0
+        """Time of the next poll."""
+        self.last_time = 0.0
+        """Time of the last poll."""
+        self.last_change_time = 0.0
+        """Time of the last poll that found a change."""
+        self.num_polls = 0
+        """Number of polls."""
+        self.num_changes = 0
+        """Number of polls that found a change."""
+
+    def __str__(self):
+        return "%s: interval %.1f s (%.1f-%.1f s), polls %i, changed %i, last change %s" % (
+            self.name, self.interval, self.min_interval, self.max_interval, self.num_polls, self.num_changes,
+            "%.0f s ago" % (time.time() - self.last_change_time,) if self.last_change_time > 0 else "never")
+
+
+class PollScheduler(object):
+    """Adaptive scheduling of polls of the individual data sources of a switch.
+
+    Each data source (see :data:`~zyxel_gs1200_api.backend.data_sources`) has its own poll interval between a minimum
+    and a maximum. When a poll finds a change (e.g. a flapping link or a change of the traffic rates), the interval is
+    multiplied by `speedup` (down to the minimum). When nothing changes, it is multiplied by `backoff` (up to the
+    maximum). Each interval is randomly prolonged or shortened by up to `jitter` (relative), so that polls of many
+    switches started at the same time do not stay synchronized.
+
+    Counters move with any traffic, so the `counters` source counts as changed only if the packet or bit rate of a port
+    differs from the rate of the last change by more than `rate_threshold` (relative) and `min_packet_rate_change` or
+    `min_bit_rate_change` (absolute), see :meth:`rates_changed`.
+    """
+
+    def __init__(self, intervals=None, jitter=0.1, backoff=1.5, speedup=0.25, rate_threshold=0.2,
+                 min_packet_rate_change=10.0, min_bit_rate_change=10000.0):
+        """
+        :param dict intervals: Maps data source names to tuples (min_interval, max_interval) in seconds. Sources not
+                               mentioned get :data:`default_intervals`.
+        :param float jitter: Maximum relative random change of each interval.
+        :param float backoff: Multiplier of the interval after a poll that found no change.
+        :param float speedup: Multiplier of the interval after a poll that found a change.
+        :param float rate_threshold: Relative change of the traffic rate of a port that counts as a change of counters.
+        :param float min_packet_rate_change: Smaller changes of the packet rate of a port do not count as a change of
+                                             counters (in packets per second).
+        :param float min_bit_rate_change: Smaller changes of the bit rate of a port do not count as a change of counters
+                                          (in bits per second). Some backends do not read the byte counters, their bit
+                                          rates stay zero.
+        """
+        merged = dict(default_intervals)
+        if intervals is not None:
+            merged.update(intervals)
+        self.sources = dict((name, SourceSchedule(name, *merged[name])) for name in data_sources if name in merged)
+        """Schedules of the data sources (keyed by name)."""
+        self.jitter = jitter
+        self.backoff = backoff
+        self.speedup = speedup
+        self.rate_threshold = rate_threshold
+        self.min_packet_rate_change = min_packet_rate_change
+        self.min_bit_rate_change = min_bit_rate_change
+        self._random = random.Random()
+        self._reference_rates = None
+
+    @classmethod
+    def for_update_rate(cls, update_rate, adaptive=True, jitter=0.1, intervals=None):
+        """Create the scheduler of a node polling the switch at the given rate.
+
+        Link states, counters and loop status are polled at `update_rate`, the configuration 30 times less often. With
+        `adaptive`, the intervals back off to 10 times longer while the data do not change.
+
+        :param float update_rate: The fastest polling rate of link states, counters and loop status (in Hz).
+        :param bool adaptive: If False, each data source is polled at its fastest rate.
+        :param float jitter: Maximum relative random change of each interval.
+        :param dict intervals: Maps data source names to lists [min_interval, max_interval] in seconds overriding the
+                               intervals derived from `update_rate`.
+        :return: The scheduler.
+        :rtype: PollScheduler
+        :raises ValueError: If `intervals` contain an unknown data source.
+        """
+        dynamic_interval = 1.0 / update_rate
+        config_interval = 30.0 / update_rate
+        merged = {
+            "link": (dynamic_interval, 10 * dynamic_interval),
+            "counters": (dynamic_interval, 10 * dynamic_interval),
+            "loop": (dynamic_interval, 10 * dynamic_interval),
+            "main": (config_interval, 10 * config_interval),
+            "port_info": (config_interval, 10 * config_interval),
+        }
+        for source, interval in (intervals or {}).items():
+            if source not in data_sources:
+                raise ValueError("Unknown data source '%s'. Valid sources are: %s." % (source, ", ".join(data_sources)))
+            merged[source] = (float(interval[0]), float(interval[1]))
+        if not adaptive:
+            merged = dict((source, (interval[0], interval[0])) for source, interval in merged.items())
+        return cls(merged, jitter=jitter)
+
+    def start(self, now=None):
+        """Schedule the first polls of all data sources as if they had just been polled.
+
+        :param float now: Current time. If None, :func:`time.time` is used.
+        """
+        if now is None:
+            now = time.time()
+        for source in self.sources.values():
+            source.interval = source.min_interval
+            source.next_time = now + source.interval * (1.0 + self._random.uniform(-self.jitter, self.jitter))
+
+    def due(self, now=None):
+        """Return the data sources that should be polled now.
+
+        :param float now: Current time. If None, :func:`time.time` is used.
+        :return: Names of the sources.
+        :rtype: list
+        """
+        if now is None:
+            now = time.time()
+        return [name for name, source in self.sources.items() if source.next_time <= now]
+
+    def next_time(self):
+        """Return the time when the next poll of any data source is due.
+        :rtype: float
+        """
+        return min(s.next_time for s in self.sources.values()) if len(self.sources) > 0 else float('inf')
+
+    def rates_changed(self, rates):
+        """Tell whether the traffic rates changed enough to poll the counters faster.
+
+        The rates are compared to the rates of the last change, so that slow drifts are found, too.
+
+        :param rates: Traffic rates of the ports, tuples (packets per second, bits per second).
+        :type rates: list of tuple
+        :rtype: bool
+        """
+        reference = self._reference_rates
+        if reference is not None and len(reference) == len(rates) and all(
+                abs(new_pps - old_pps) <= max(self.min_packet_rate_change, self.rate_threshold * old_pps) and
+                abs(new_bps - old_bps) <= max(self.min_bit_rate_change, self.rate_threshold * old_bps)
+                for (old_pps, old_bps), (new_pps, new_bps) in zip(reference, rates)):
+            return False
+        self._reference_rates = list(rates)
+        return True
+
+    def record(self, name, changed, now=None):
+        """Record a finished poll of a data source and schedule the next one.
+
+        :param str name: Name of the source.
+        :param bool changed: Whether the poll found a change.
+        :param float now: Time of the poll. If None, :func:`time.time` is used.
+        """
+        if now is None:
+            now = time.time()
+        source = self.sources.get(name)
+        if source is None:
+            return
+        source.num_polls += 1
+        source.last_time = now
+        if changed:
+            source.num_changes += 1
+            source.last_change_time = now
+            source.interval = max(source.min_interval, source.interval * self.speedup)
+        else:
+            source.interval = min(source.max_interval, source.interval * self.backoff)
+        source.next_time = now + source.interval * (1.0 + self._random.uniform(-self.jitter, self.jitter))
+
+    def report(self):
+        """Return a human-readable report of the schedule of all data sources.
+
+        :return: One line per data source.
+        :rtype: list
+        """
+        return [str(self.sources[name]) for name in data_sources if name in self.sources]
@@ -0,0 +1,487 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Low-level backend of Zyxel (X)GS-1200 series switches utilizing the serial console.
+
+The console is driven by `show` commands. All commands needed by one update are written at once (pipelined), so the
+update costs a single round trip over the serial line instead of one per command. The output is parsed line by line as
+it arrives, so long tables (e.g. the MAC address table) are never held in memory as a whole. The parsed data have the
+structure of the web API responses and fill the switch by the same functions as :class:`WebBackend`.
+"""
+
+import os
+import re
+import select
+import threading
+import time
+
+from .backend import Backend
+from .parsing import parse_counters, parse_link_states, parse_mac_table, parse_main_info, parse_port_info, \
+    parse_port_states, parse_switch, parse_switch_config, parse_system_data
+from .resilience import Backoff
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = tty = None
+
+__all__ = ['SerialBackend', 'console_port_types']
+
+
+console_port_types = {
+    0: "10M",
+    1: "100M",
+    2: "1G",
+    3: "2.5G",
+    4: "5G",
+    6: "10G",
+}
+"""Names of the port types (as in `portType` of the web API) in the output of `show interfaces config`."""
+
+_system_information_keys = {
+    "Product Model": "model_name",
+    "System Name": "sys_dev_name",
+    "Firmware Version": "sys_fmw_ver",
+    "Build Date": "sys_bld_date",
+    "MAC Address": "sys_MAC",
+    "IP Address": "sys_IP",
+    "Subnet Mask": "sys_sbnt_msk",
+    "Default Gateway": "sys_gateway",
+}
+
+_prompt_re = re.compile(r"^[^\s#]+# $")
+_password_prompt = "Password: "
+
+
+class _SessionExpired(Exception):
+    """The console asked for the password in the middle of a command (the idle timeout logged it out)."""
+
+
+class _CommandOutput(object):
+    """Incremental parser of the output of one console command."""
+
+    def __init__(self, command):
+        self.command = command
+        self.error = None
+        """The error message printed by the console (a line starting with `%`)."""
+        self.data = self.initial_data()
+        """The parsed data in the structure of the corresponding web API response."""
+
+    def initial_data(self):
+        """The data before any output is parsed."""
+        return {}
+
+    def reset(self):
+        """Forget the parsed output (before the command is sent again)."""
+        self.error = None
+        self.data = self.initial_data()
+
+    def feed(self, line):
+        """Parse one line of the output.
+
+        :param str line: The line without the line ending.
+        """
+        pass
+
+
+class _SystemInformation(_CommandOutput):
+    """`show system-information`: lines `Key : value` with the data of `home_main`."""
+
+    def __init__(self):
+        super(_SystemInformation, self).__init__("show system-information")
+
+    def initial_data(self):
+        return {"sys_first_login": "0", "capability": {}}
+
+    def feed(self, line):
+        label, sep, value = line.partition(" : ")
+        if len(sep) == 0:
+            return
+        label = label.strip()
+        value = value.strip()
+        if label in _system_information_keys:
+            self.data[_system_information_keys[label]] = value
+        elif label == "DHCP Client":
+            self.data["sys_dhcp_state"] = "1" if value == "Enabled" else "0"
+        elif label == "Number of Ports":
+            self.data["Max_port"] = int(value)
+        elif label == "Capabilities":
+            self.data["capability"] = dict((c, 1) for c in value.split())
+
+
+class _Table(_CommandOutput):
+    """Output with a table whose rows follow a line of dashes under the header."""
+
+    def __init__(self, command):
+        super(_Table, self).__init__(command)
+        self._in_rows = False
+
+    def reset(self):
+        super(_Table, self).reset()
+        self._in_rows = False
+
+    def feed(self, line):
+        if not self._in_rows:
+            self._in_rows = line.startswith("---")
+            return
+        fields = line.split()
+        if len(fields) == 0:
+            return
+        try:
+            self.row(fields)
+        except (IndexError, KeyError, ValueError):
+            self.error = "Unexpected row '%s'" % (line,)
+
+    def row(self, fields):
+        """Parse one row of the table.
+
+        :param list fields: The whitespace-separated fields of the row.
+        """
+        raise NotImplementedError()
+
+    def check_port(self, fields, num_rows):
+        """Check that the rows are ordered by the port number in the first field."""
+        if int(fields[0]) != num_rows + 1:
+            raise ValueError()
+
+
+class _InterfacesConfig(_Table):
+    """`show interfaces config`: port type, medium and administrative state with the data of `port_portInfo`."""
+
+    _types = dict((name, port_type) for port_type, name in console_port_types.items())
+
+    def __init__(self):
+        super(_InterfacesConfig, self).__init__("show interfaces config")
+
+    def initial_data(self):
+        return {"portType": [], "isCopper": [], "portState": 0}
+
+    def row(self, fields):
+        self.check_port(fields, len(self.data["portType"]))
+        port_type = self._types[fields[1]]
+        self.data["isCopper"].append(1 if fields[2] == "copper" else 0)
+        if fields[3] == "Enabled":
+            self.data["portState"] |= 1 << len(self.data["portType"])
+        self.data["portType"].append(port_type)
+
+
+class _InterfacesStatus(_Table):
+    """`show interfaces status`: link state, speed, overheat status and packet counters with the data of
+    `home_linkData`."""
+
+    def __init__(self):
+        super(_InterfacesStatus, self).__init__("show interfaces status")
+
+    def initial_data(self):
+        return {"portstatus": [], "speed": [], "overheat": [], "Stats": []}
+
+    def row(self, fields):
+        # The speed has two words (e.g. `1 Gbps`), or is `-` if the link is down
+        self.check_port(fields, len(self.data["portstatus"]))
+        speed = " ".join(fields[2:-3])
+        self.data["Stats"].append([int(fields[-2]), int(fields[-1])])
+        self.data["overheat"].append(1 if fields[-3] == "Overheat" else 0)
+        self.data["speed"].append(speed if speed != "-" else "auto")
+        self.data["portstatus"].append(fields[1])
+
+
+class _LoopGuard(_Table):
+    """`show loop-guard`: loop status with the `loop_status` field of `home_systemData`."""
+
+    def __init__(self):
+        super(_LoopGuard, self).__init__("show loop-guard")
+
+    def initial_data(self):
+        return {"loop_status": []}
+
+    def row(self, fields):
+        self.check_port(fields, len(self.data["loop_status"]))
+        self.data["loop_status"].append(fields[1])
+
+
+class _MacAddressTable(_Table):
+    """`show mac address-table`: the MAC address table with the data of `mac_macTable`."""
+
+    def __init__(self):
+        super(_MacAddressTable, self).__init__("show mac address-table")
+
+    def initial_data(self):
+        return {"macTable": []}
+
+    def row(self, fields):
+        self.data["macTable"].append({"mac": fields[0], "vid": int(fields[1]), "port": int(fields[2]),
+                                      "type": fields[3]})
+
+
+class SerialBackend(Backend):
+    """Low-level backend of Zyxel (X)GS-1200 series switches utilizing the serial console.
+
+    The console has to be at its password prompt or already logged in. One backend instance has to be the only user of
+    the serial port.
+    """
+
+    def __init__(self, address, password, baudrate=115200, max_login_attempts=3, instrumentation=None,
+                 request_timeout=10.0):
+        """
+        :param str address: Path of the serial port (e.g. `/dev/ttyUSB0` or `/dev/serial/by-id/...`, optionally prefixed
+                            with `file://`).
+        :param str password: Password of the console.
+        :param int baudrate: Speed of the serial port.
+        :param int max_login_attempts: Maximum number of login retries before an exception is raised. The retries are
+                                       delayed by an exponential backoff.
+        :param Instrumentation instrumentation: If set, durations of the round trips of pipelined commands
+                                                (`serial.round_trip`) and re-logins caused by the idle timeout of the
+                                                console (`serial.relogin`) are recorded here.
+        :param float request_timeout: Timeout of a single round trip (in seconds).
+        """
+        super(SerialBackend, self).__init__()
+
+        if termios is None:
+            raise NotImplementedError("Serial console backend requires a POSIX system")
+
+        self.address = address
+        self.path = address[len("file://"):] if address.startswith("file://") else address
+        self.password = password
+        self.baudrate = baudrate
+
+        self.max_login_attempts = max_login_attempts
+        self.login_backoff = Backoff(initial=1.0, maximum=10.0)
+        """Delays between the login attempts."""
+        self.request_timeout = request_timeout
+        self.instrumentation = instrumentation
+
+        self.logged_in = False
+        self.num_round_trips = 0
+        """Number of round trips to the console (each can contain several commands)."""
+        self.num_commands = 0
+        """Number of commands sent to the console."""
+
+        self._fd = None
+        self._prompt = None
+        self._buffer = b""  # the received part of the last line
+        self._lock = threading.Lock()
+
+    def _open(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        try:
+            tty.setraw(fd)
+            attrs = termios.tcgetattr(fd)
+            speed = getattr(termios, "B%i" % (self.baudrate,))
+            attrs[2] |= termios.CLOCAL | termios.CREAD
+            attrs[4] = attrs[5] = speed
+            termios.tcsetattr(fd, termios.TCSANOW, attrs)
+            termios.tcflush(fd, termios.TCIOFLUSH)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._buffer = b""
+
+    def _close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        self.logged_in = False
+
+    def _write(self, text):
+        data = text.encode("ascii")
+        while len(data) > 0:
+            select.select([], [self._fd], [], self.request_timeout)
+            data = data[os.write(self._fd, data):]
+
+    def _read_lines(self, deadline):
+        """Wait for more output and split it into lines.
+
+        :param float deadline: Time when the wait fails.
+        :return: The complete lines received (decoded, without line endings). The incomplete last line (e.g. a prompt)
+                 stays in :attr:`_buffer`.
+        :rtype: list of str
+        :raises RuntimeError: On timeout or when the console is closed.
+        """
+        timeout = deadline - time.time()
+        if timeout <= 0 or len(select.select([self._fd], [], [], timeout)[0]) == 0:
+            raise RuntimeError("Timeout waiting for the console at " + self.path)
+        try:
+            chunk = os.read(self._fd, 4096)
+        except OSError as e:
+            raise RuntimeError("Reading the console at %s failed: %s" % (self.path, e))
+        if len(chunk) == 0:
+            raise RuntimeError("The console at %s was closed" % (self.path,))
+        lines = (self._buffer + chunk).split(b"\n")
+        self._buffer = lines.pop()
+        return [line.rstrip(b"\r").decode("ascii", "replace") for line in lines]
+
+    @property
+    def _partial_line(self):
+        return self._buffer.rstrip(b"\r").decode("ascii", "replace")
+
+    def _wait_for_prompt(self, deadline):
+        """Skip the output until the console shows the command or password prompt.
+
+        :return: Whether the command prompt (and not the password prompt) is shown.
+        :rtype: bool
+        """
+        errors = []
+        while True:
+            errors.extend(line for line in self._read_lines(deadline) if line.startswith("%"))
+            partial = self._partial_line
+            if _prompt_re.match(partial):
+                self._prompt = partial
+                self._buffer = b""
+                return True
+            if partial.endswith(_password_prompt):
+                if errors:
+                    raise RuntimeError("Login failed: " + errors[-1].lstrip("% "))
+                return False
+
+    def login(self):
+        print("Logging in the console at " + self.path)
+        if self._fd is None:
+            self._open()
+        # Drop any output left from before (e.g. of commands interrupted by a timeout)
+        termios.tcflush(self._fd, termios.TCIFLUSH)
+        self._buffer = b""
+        deadline = time.time() + self.request_timeout
+        self._write("\r")
+        if not self._wait_for_prompt(deadline):
+            self._write(self.password + "\r")
+            if not self._wait_for_prompt(deadline):
+                raise RuntimeError("Login failed: Invalid password")
+        self.logged_in = True
+        # Long tables must not stop at a "--More--" prompt
+        self._execute([_CommandOutput("terminal length 0")])
+        print("Logged in the console of " + self._prompt[:-2])
+
+    def auto_login(self):
+        """Log in the console if it is needed.
+
+        :raises RuntimeError:
+        """
+        if self.logged_in:
+            return
+        self.login_backoff.reset()
+        for attempt in range(self.max_login_attempts):
+            try:
+                self.login()
+                return
+            except Exception as e:
+                self._close()
+                if "Invalid password" in str(e) or attempt + 1 == self.max_login_attempts:
+                    raise
+                print(e)
+                time.sleep(self.login_backoff.next_delay())
+
+    def logout(self):
+        with self._lock:
+            if self.logged_in:
+                self._write("exit\r")
+            self._close()
+        print("Logged out")
+
+    def execute(self, outputs):
+        """Send the commands of the given parsers in one round trip and feed their output to them.
+
+        :param outputs: The parsers of the outputs of the commands.
+        :type outputs: list of _CommandOutput
+        :raises RuntimeError: If the console does not respond or a command fails.
+        """
+        with self._lock:
+            self.auto_login()
+            try:
+                self._execute(outputs)
+            except _SessionExpired:
+                if self.instrumentation is not None:
+                    self.instrumentation.increment("serial.relogin")
+                self.logged_in = False
+                self.auto_login()
+                for output in outputs:
+                    output.reset()
+                self._execute(outputs)
+            except Exception:
+                # The rest of the output would be mistaken for the output of the next commands
+                self._close()
+                raise
+        for output in outputs:
+            if output.error is not None:
+                raise RuntimeError("Command '%s' failed: %s" % (output.command, output.error))
+
+    def _execute(self, outputs):
+        start = time.time()
+        failed = True
+        try:
+            self._write("".join(output.command + "\r" for output in outputs))
+            deadline = start + self.request_timeout
+            # Each command is echoed. The echo of the first one follows the prompt that was already read, the echoes
+            # of the next ones follow the prompts ending the output of the previous command.
+            index = 0
+            echoed = False
+            while True:
+                for line in self._read_lines(deadline):
+                    if line.startswith(self._prompt):
+                        index += 1
+                    elif index == 0 and not echoed and line == outputs[0].command:
+                        echoed = True
+                    elif line.startswith("%"):
+                        outputs[index].error = line.lstrip("% ")
+                    else:
+                        outputs[index].feed(line)
+                partial = self._partial_line
+                if partial.endswith(_password_prompt):
+                    raise _SessionExpired()
+                if index == len(outputs) - 1 and partial == self._prompt:
+                    self._buffer = b""
+                    break
+            failed = False
+        finally:
+            self.num_round_trips += 1
+            self.num_commands += len(outputs)
+            if self.instrumentation is not None:
+                self.instrumentation.observe("serial.round_trip", time.time() - start, failed)
+
+    def get_switch(self):
+        main, port_info = _SystemInformation(), _InterfacesConfig()
+        self.execute([main, port_info])
+        return parse_switch(main.data, port_info.data)
+
+    def update_switch_config(self, switch):
+        main, port_info = _SystemInformation(), _InterfacesConfig()
+        self.execute([main, port_info])
+        parse_switch_config(switch, main.data, port_info.data)
+
+    def update_port_states(self, switch):
+        main, loop, status = _SystemInformation(), _LoopGuard(), _InterfacesStatus()
+        self.execute([main, loop, status])
+        main.data.update(loop.data)
+        parse_port_states(switch, main.data, status.data)
+
+    def update_mac_table(self, switch):
+        mac_table = _MacAddressTable()
+        self.execute([mac_table])
+        return parse_mac_table(switch, mac_table.data)
+
+    def update_sources(self, switch, sources):
+        main = _SystemInformation() if "main" in sources or "loop" in sources else None
+        port_info = _InterfacesConfig() if "port_info" in sources else None
+        loop = _LoopGuard() if "loop" in sources else None
+        status = _InterfacesStatus() if "link" in sources or "counters" in sources else None
+        outputs = [output for output in (main, port_info, loop, status) if output is not None]
+        if len(outputs) == 0:
+            return set()
+        self.execute(outputs)
+
+        changed = set()
+        if "main" in sources and parse_main_info(switch, main.data):
+            changed.add("main")
+        if port_info is not None and parse_port_info(switch, port_info.data):
+            changed.add("port_info")
+        if loop is not None:
+            main.data.update(loop.data)
+            if parse_system_data(switch, main.data):
+                changed.add("loop")
+        if "link" in sources and parse_link_states(switch, status.data):
+            changed.add("link")
+        if "counters" in sources:
+            changed.add("counters")
+            parse_counters(switch, status.data)
+        return changed
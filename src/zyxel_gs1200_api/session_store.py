@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""On-disk store of web API sessions allowing a restarted process to reuse the previous session."""
+
+import os
+import threading
+import time
+
+from .json_file import read_json_file, write_json_file
+
+__all__ = ['SessionStore']
+
+
+class SessionStore(object):
+    """On-disk store of web API sessions allowing a restarted process to reuse the previous session.
+
+    The store is a JSON file readable only by its owner. It maps switch addresses to the session cookie. One file can be
+    shared by several switches.
+    """
+
+    def __init__(self, path):
+        """
+        :param str path: Path to the store file. It will be created if it does not exist.
+        """
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    def load(self, address):
+        """Load the stored session of a switch.
+
+        :param str address: Address of the switch.
+        :return: Dict with keys `session_id` and `time` or None if no session is stored.
+        :rtype: dict or None
+        """
+        with self._lock:
+            return self._read().get(address)
+
+    def save(self, address, session_id):
+        """Store the session of a switch.
+
+        :param str address: Address of the switch.
+        :param str session_id: Value of the `HTTP_SESSID` cookie.
+        """
+        with self._lock:
+            data = self._read()
+            data[address] = {"session_id": session_id, "time": time.time()}
+            self._write(data)
+
+    def clear(self, address):
+        """Remove the stored session of a switch.
+
+        :param str address: Address of the switch.
+        """
+        with self._lock:
+            data = self._read()
+            if address in data:
+                del data[address]
+                self._write(data)
+
+    def _read(self):
+        return read_json_file(self.path)
+
+    def _write(self, data):
+        write_json_file(self.path, data, mode=0o600)
+
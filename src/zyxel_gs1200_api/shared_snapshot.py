@@ -0,0 +1,370 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Snapshots of a polled switch in shared memory, so that several local processes can read one poller.
+
+The poller (e.g. `snmp_agent` with `~shared_snapshot`) publishes each polled :class:`Switch` with
+:class:`SnapshotWriter`. Consumers read it with :class:`SnapshotReader` (or
+:class:`~zyxel_gs1200_api.snapshot_backend.SnapshotBackend`, selected by `ZyxelAPI("shm://<name>")`) without
+contacting the switch.
+
+The segment is a file in `/dev/shm` mapped to memory. It starts with a header with a sequence number, which is odd while
+the writer changes the segment (a seqlock). A reader copies the header and the sections it needs and checks that the
+sequence number did not change in the meantime, otherwise it reads again. The writer never waits for the readers. The
+sections are:
+
+- the static description of the switch as JSON (see :func:`~zyxel_gs1200_api.descriptor_cache.switch_descriptor`),
+- the columns of :class:`~zyxel_gs1200_api.types.PortTable` as raw arrays,
+- the MAC address table as fixed-size binary records.
+
+The description and the MAC table have generation numbers that change only when their contents change, so readers copy
+and decode them only after a change.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from array import array
+
+from .descriptor_cache import switch_descriptor
+
+__all__ = ['Snapshot', 'SnapshotReader', 'SnapshotWriter', 'column_fields', 'snapshot_path']
+
+
+_magic = b"ZYXSNAP1"
+# Magic, sequence number, generation and length of the description, number of ports, generation and length of the MAC
+# table, time of the publish, PID of the writer and flags
+_header = struct.Struct("=8sQIIIIIdII")
+_header_size = 64
+_seq = struct.Struct("=Q")
+_mac_entry = struct.Struct("=6sHh?")  # MAC address, VLAN, port index, static
+_no_mac_table = 0xffffffff
+_flag_closed = 1
+_flag_moved = 2
+
+column_fields = (("enabled", "b"), ("connected", "b"), ("loop_detected", "b"), ("overheat_detected", "b"),
+                 ("speed", "Q"), ("last_change_time", "d"), ("last_packet_jump_back_time", "d")) + \
+    tuple(("rx." + f, "Q") for f in ("num_bytes", "num_unicast_packets", "num_multicast_packets",
+                                     "num_broadcast_packets", "num_discards", "num_errors")) + \
+    tuple(("tx." + f, "Q") for f in ("num_bytes", "num_unicast_packets", "num_multicast_packets",
+                                     "num_broadcast_packets", "num_discards", "num_errors"))
+"""Columns of :class:`~zyxel_gs1200_api.types.PortTable` stored in the snapshot (attribute paths and array types)."""
+
+
+def snapshot_path(name):
+    """Path of the shared memory segment of a snapshot.
+
+    :param str name: Name of the snapshot (e.g. the name of the switch). A name containing `/` is used as the path.
+    :rtype: str
+    """
+    if "/" in name:
+        return name
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "zyxel_gs1200_api." + name)
+
+
+def _to_bytes(a):
+    try:
+        return a.tobytes()
+    except AttributeError:  # Python 2
+        return a.tostring()
+
+
+def _from_bytes(typecode, data):
+    a = array(typecode)
+    try:
+        a.frombytes(data)
+    except AttributeError:  # Python 2
+        a.fromstring(data)
+    return a
+
+
+def _column(table, field):
+    obj = table
+    for part in field.split("."):
+        obj = getattr(obj, part)
+    return obj
+
+
+class Snapshot(object):
+    """One consistent read of a shared snapshot."""
+
+    def __init__(self, seq, update_time, num_ports, descriptor_generation, descriptor, columns, mac_generation,
+                 mac_entries, pid):
+        self.seq = seq
+        """Sequence number of the snapshot (grows with each publish)."""
+        self.time = update_time
+        """Time of the publish."""
+        self.num_ports = num_ports
+        """Number of ports of the switch."""
+        self.descriptor_generation = descriptor_generation
+        """Generation of the static description."""
+        self.descriptor = descriptor
+        """The decoded static description or None if it was not read."""
+        self.columns = columns
+        """Raw port table columns (bytes) or None if they were not read."""
+        self.mac_generation = mac_generation
+        """Generation of the MAC table (0 if the poller does not read the table)."""
+        self.mac_entries = mac_entries
+        """Raw MAC table records (bytes) or None if they were not read or the poller does not read the table."""
+        self.pid = pid
+        """PID of the writer."""
+
+    def apply_columns(self, table):
+        """Copy the port table columns into a port table.
+
+        :param PortTable table: The table (with :attr:`num_ports` ports).
+        """
+        offset = 0
+        for field, typecode in column_fields:
+            column = _column(table, field)
+            size = column.itemsize * self.num_ports
+            column[:] = _from_bytes(typecode, self.columns[offset:offset + size])
+            offset += size
+
+    def column_bytes(self, *fields):
+        """Return the raw bytes of some columns (e.g. to detect their changes).
+
+        :param fields: Names of the columns (items of :data:`column_fields`).
+        :rtype: bytes
+        """
+        chunks = []
+        offset = 0
+        for field, typecode in column_fields:
+            size = array(typecode).itemsize * self.num_ports
+            if field in fields:
+                chunks.append(self.columns[offset:offset + size])
+            offset += size
+        return b"".join(chunks)
+
+    def mac_table_entries(self):
+        """Decode the MAC table records.
+
+        :return: Tuples (MAC address as 6 bytes, VLAN, port index, is static).
+        :rtype: list of tuple
+        """
+        if self.mac_entries is None:
+            return []
+        return [_mac_entry.unpack_from(self.mac_entries, i)
+                for i in range(0, len(self.mac_entries), _mac_entry.size)]
+
+
+class SnapshotWriter(object):
+    """Publisher of the snapshots of one switch into shared memory."""
+
+    def __init__(self, name, capacity=1 << 18):
+        """
+        :param str name: Name of the snapshot (see :func:`snapshot_path`).
+        :param int capacity: Initial size of the segment in bytes. A larger segment is created when needed.
+        """
+        self.path = snapshot_path(name)
+        self.num_publishes = 0
+        """Number of published snapshots."""
+        self._file = None
+        self._map = None
+        self._seq = 0
+        self._descriptor = None
+        self._descriptor_generation = 0
+        self._mac_entries = None
+        self._mac_generation = 0
+        self._create(capacity)
+
+    def _create(self, capacity, write=None):
+        # The new segment is prepared under a temporary name and then replaces the old one, so readers never see a
+        # segment without a header. A grown segment gets the snapshot before it replaces the old one, so readers
+        # following the move never see it empty.
+        tmp_path = "%s.%i.tmp" % (self.path, os.getpid())
+        f = open(tmp_path, "w+b")
+        f.truncate(max(capacity, _header_size))
+        m = mmap.mmap(f.fileno(), max(capacity, _header_size))
+        m[0:_header_size] = _header.pack(_magic, 0, 0, 0, 0, 0, _no_mac_table, 0.0, os.getpid(), 0).ljust(
+            _header_size, b"\0")
+        if write is not None:
+            write(m)
+        os.rename(tmp_path, self.path)
+        old_file, old_map = self._file, self._map
+        self._file, self._map = f, m
+        if old_map is not None:
+            self._set_flags(old_map, _flag_moved)
+            old_map.close()
+            old_file.close()
+
+    def publish(self, switch):
+        """Publish the current state of a switch.
+
+        :param Switch switch: The switch (populated by :meth:`ZyxelAPI.get_switch`).
+        """
+        descriptor = json.dumps(switch_descriptor(switch), sort_keys=True).encode("utf-8")
+        if descriptor != self._descriptor:
+            self._descriptor = descriptor
+            self._descriptor_generation += 1
+        table = switch.port_table
+        columns = b"".join(_to_bytes(_column(table, field)) for field, _ in column_fields)
+        mac_entries = None
+        if switch.mac_table is not None:
+            mac_entries = b"".join(_mac_entry.pack(e.mac_bin, e.vlan, e.port_index, e.is_static)
+                                   for e in switch.mac_table)
+        if mac_entries != self._mac_entries:
+            self._mac_entries = mac_entries
+            self._mac_generation += 1
+
+        size = _header_size + len(descriptor) + len(columns) + (len(mac_entries) if mac_entries is not None else 0)
+        if size > len(self._map):
+            self._create(2 * size, lambda m: self._write(m, switch.num_ports, descriptor, columns, mac_entries))
+        else:
+            self._write(self._map, switch.num_ports, descriptor, columns, mac_entries)
+        self.num_publishes += 1
+
+    def _write(self, m, num_ports, descriptor, columns, mac_entries):
+        self._seq += 1  # odd: readers retry
+        _seq.pack_into(m, 8, self._seq)
+        offset = _header_size
+        m[offset:offset + len(descriptor)] = descriptor
+        offset += len(descriptor)
+        m[offset:offset + len(columns)] = columns
+        offset += len(columns)
+        if mac_entries is not None:
+            m[offset:offset + len(mac_entries)] = mac_entries
+        mac_count = len(mac_entries) // _mac_entry.size if mac_entries is not None else _no_mac_table
+        m[0:_header.size] = _header.pack(_magic, self._seq, self._descriptor_generation, len(descriptor),
+                                         num_ports, self._mac_generation, mac_count, time.time(), os.getpid(), 0)
+        self._seq += 1  # even: consistent
+        _seq.pack_into(m, 8, self._seq)
+
+    @staticmethod
+    def _set_flags(m, flags):
+        header = list(_header.unpack_from(m, 0))
+        header[-1] |= flags
+        m[0:_header.size] = _header.pack(*header)
+
+    def close(self, remove=True):
+        """Stop publishing. Readers get an error on their next read.
+
+        :param bool remove: Whether to remove the segment.
+        """
+        if self._map is None:
+            return
+        self._set_flags(self._map, _flag_closed)
+        self._map.close()
+        self._file.close()
+        self._map = self._file = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class SnapshotReader(object):
+    """Read-only view of the snapshots of one switch in shared memory."""
+
+    def __init__(self, name, max_retries=1000):
+        """
+        :param str name: Name of the snapshot (see :func:`snapshot_path`).
+        :param int max_retries: Maximum number of reads interrupted by the writer before an error is raised.
+        :raises RuntimeError: If no snapshot of this name is published.
+        """
+        self.path = snapshot_path(name)
+        self.max_retries = max_retries
+        self.num_retries = 0
+        """Number of reads repeated because the writer changed the segment meanwhile."""
+        self.num_reopens = 0
+        """Number of times the segment was replaced by a new writer (e.g. a restarted poller) and opened again. The
+        generations of the description and the MAC table of the new writer are not comparable with the old ones."""
+        self._file = None
+        self._map = None
+        self._open()
+
+    def _open(self):
+        try:
+            f = open(self.path, "rb")
+        except (IOError, OSError):
+            raise RuntimeError("No snapshot is published at " + self.path)
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, mmap.error):
+            f.close()
+            raise RuntimeError("Invalid snapshot at " + self.path)
+        self.close()
+        self._file, self._map = f, m
+
+    def reopen_if_replaced(self):
+        """Open the segment again if a new writer has replaced it (e.g. after the poller restarted or crashed).
+
+        :return: Whether the segment was replaced and opened again.
+        :rtype: bool
+        """
+        if self._file is None:
+            return False
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except OSError:
+            return False  # not published again yet
+        if replaced:
+            self._open()
+            self.num_reopens += 1
+        return replaced
+
+    def read(self, descriptor_generation=None, mac_generation=None, columns=True):
+        """Read a consistent snapshot.
+
+        :param int descriptor_generation: The description is only read if its generation differs from this one.
+        :param int mac_generation: The MAC table is only read if its generation differs from this one.
+        :param bool columns: Whether to read the port table columns.
+        :return: The snapshot.
+        :rtype: Snapshot
+        :raises RuntimeError: If the writer has stopped or keeps interrupting the read.
+        """
+        for _ in range(self.max_retries):
+            m = self._map
+            if m is None:
+                raise RuntimeError("Snapshot reader is closed")
+            seq = _seq.unpack_from(m, 8)[0]
+            if seq & 1:
+                self.num_retries += 1
+                time.sleep(0)
+                continue
+            magic, _, descriptor_gen, descriptor_len, num_ports, mac_gen, mac_count, update_time, pid, flags = \
+                _header.unpack_from(m, 0)
+            if magic != _magic:
+                raise RuntimeError("Invalid snapshot at " + self.path)
+            if flags & _flag_moved:
+                self._open()
+                continue
+            if flags & _flag_closed:
+                if self.reopen_if_replaced():
+                    # The generations of the old writer say nothing about the new one
+                    descriptor_generation = mac_generation = None
+                    continue
+                raise RuntimeError("Snapshot at %s is no longer published" % (self.path,))
+            if descriptor_gen == 0:
+                raise RuntimeError("No snapshot has been published at %s yet" % (self.path,))
+            offset = _header_size
+            descriptor = None
+            if descriptor_gen != descriptor_generation:
+                descriptor = m[offset:offset + descriptor_len]
+            offset += descriptor_len
+            columns_size = sum(array(typecode).itemsize for _, typecode in column_fields) * num_ports
+            column_data = m[offset:offset + columns_size] if columns else None
+            offset += columns_size
+            mac_entries = None
+            if mac_count != _no_mac_table and mac_gen != mac_generation:
+                mac_entries = m[offset:offset + mac_count * _mac_entry.size]
+            if _seq.unpack_from(m, 8)[0] != seq:
+                self.num_retries += 1
+                continue
+            if descriptor is not None:
+                descriptor = json.loads(descriptor.decode("utf-8"))
+            return Snapshot(seq, update_time, num_ports, descriptor_gen, descriptor, column_data,
+                            mac_gen if mac_count != _no_mac_table else 0, mac_entries, pid)
+        raise RuntimeError("Snapshot at %s is changing too fast to be read" % (self.path,))
+
+    def close(self):
+        """Unmap the segment."""
+        if self._map is not None:
+            self._map.close()
+            self._file.close()
+        self._map = self._file = None
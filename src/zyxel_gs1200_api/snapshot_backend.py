@@ -0,0 +1,161 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Low-level backend reading the snapshots of a switch published in shared memory by another process.
+
+Addresses `shm://<name>` select this backend in :class:`ZyxelAPI`. The poller publishes the switch with
+:class:`~zyxel_gs1200_api.shared_snapshot.SnapshotWriter` (e.g. `snmp_agent` with `~shared_snapshot`). Any number of
+local processes can then read the switch without logging in to it or sending it any request.
+"""
+
+import time
+
+from .backend import Backend
+from .descriptor_cache import switch_from_descriptor
+from .mac_table import MacTable, MacTableDiff
+from .shared_snapshot import SnapshotReader
+from .types import MacTableEntry
+
+__all__ = ['SnapshotBackend']
+
+
+class SnapshotBackend(Backend):
+    """Low-level backend reading the snapshots of a switch published in shared memory by another process."""
+
+    def __init__(self, address, max_age=60.0, instrumentation=None):
+        """
+        :param str address: `shm://<name>` where `name` is the name of the snapshot given to the writer (or a path).
+        :param float max_age: Snapshots older than this are reported as errors (in seconds), e.g. when the poller cannot
+                              reach the switch. None disables the check.
+        :param Instrumentation instrumentation: If set, the reads of the snapshots (`shm.read`) are recorded here.
+        """
+        super(SnapshotBackend, self).__init__()
+        self.address = address
+        self.name = address[len("shm://"):] if address.startswith("shm://") else address
+        self.max_age = max_age
+        self.instrumentation = instrumentation
+        self.reader = None
+        """The reader of the shared memory segment (None until :meth:`login`)."""
+        self._descriptor_generation = None
+        self._mac_generation = None
+        self._num_reopens = 0
+        self._last_seq = None
+        self._last_link = None
+        self._last_loop = None
+
+    def login(self):
+        if self.reader is None:
+            self.reader = SnapshotReader(self.name)
+
+    def logout(self):
+        if self.reader is not None:
+            self.reader.close()
+        self.reader = None
+        self._forget_generations()
+
+    def _forget_generations(self):
+        self._descriptor_generation = None
+        self._mac_generation = None
+        self._num_reopens = self.reader.num_reopens if self.reader is not None else 0
+
+    def _read(self, descriptor=False, mac_table=False, columns=True):
+        self.login()
+        start = time.time()
+        failed = True
+        try:
+            snapshot = self.reader.read(None if descriptor else self._descriptor_generation,
+                                        None if mac_table else self._mac_generation, columns)
+            # A crashed poller leaves its segment unchanged, a restarted one replaces it
+            if snapshot.seq == self._last_seq and self.reader.reopen_if_replaced():
+                snapshot = self.reader.read(None, None, columns)
+            self._last_seq = snapshot.seq
+            failed = False
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.observe("shm.read", time.time() - start, failed)
+        if self.reader.num_reopens != self._num_reopens:
+            self._forget_generations()
+        if self.max_age is not None and time.time() - snapshot.time > self.max_age:
+            raise RuntimeError("Snapshot %s is %.0f s old, its poller does not update it" % (
+                self.name, time.time() - snapshot.time))
+        return snapshot
+
+    def get_switch(self):
+        snapshot = self._read(descriptor=True)
+        switch = switch_from_descriptor(snapshot.descriptor)
+        self._descriptor_generation = snapshot.descriptor_generation
+        self._apply_columns(switch, snapshot)
+        return switch
+
+    def update_switch_config(self, switch):
+        snapshot = self._read(columns=False)
+        self._apply_descriptor(switch, snapshot)
+
+    def _apply_descriptor(self, switch, snapshot):
+        """Update the configuration of the switch if the description in the snapshot changed.
+
+        :return: Whether the description changed.
+        :rtype: bool
+        """
+        if snapshot.descriptor is None:
+            return False
+        self._descriptor_generation = snapshot.descriptor_generation
+        new = switch_from_descriptor(snapshot.descriptor)
+        if new.num_ports != switch.num_ports:
+            raise RuntimeError("Switch %s changed its number of ports, reconnect it" % (self.name,))
+        for field in ("model_name", "device_name", "firmware_version", "firmware_build_date", "description",
+                      "mac_str", "mac_bin", "ip_addr", "ip_subnet", "ip_gateway", "dhcp_enabled", "max_mtu",
+                      "capabilities"):
+            setattr(switch, field, getattr(new, field))
+        for port, new_port in zip(switch.ports, new.ports):
+            for field in ("name", "short_name", "max_speed", "mtu", "is_copper", "mac_bin", "mac_str"):
+                setattr(port, field, getattr(new_port, field))
+        return True
+
+    def _apply_columns(self, switch, snapshot):
+        if snapshot.num_ports != switch.num_ports:
+            raise RuntimeError("Switch %s changed its number of ports, reconnect it" % (self.name,))
+        snapshot.apply_columns(switch.port_table)
+
+    def update_port_states(self, switch):
+        self._apply_columns(switch, self._read())
+
+    def update_mac_table(self, switch):
+        snapshot = self._read(columns=False)
+        if snapshot.mac_entries is None:
+            # The table did not change since the last read (or the poller does not read it)
+            return MacTableDiff()
+        self._mac_generation = snapshot.mac_generation
+        entries = []
+        for mac_bin, vlan, port_index, is_static in snapshot.mac_table_entries():
+            entry = MacTableEntry()
+            entry.mac_bin = mac_bin
+            entry.mac_str = ":".join("%02x" % (b,) for b in bytearray(mac_bin))
+            entry.vlan = vlan
+            entry.port_index = port_index
+            entry.is_static = is_static
+            entries.append(entry)
+        if switch.mac_table is None:
+            switch.mac_table = MacTable()
+        return switch.mac_table.update(entries)
+
+    def update_sources(self, switch, sources):
+        # One read gives all sources, only their changes are told apart
+        snapshot = self._read()
+        changed = set()
+        if ("main" in sources or "port_info" in sources) and self._apply_descriptor(switch, snapshot):
+            changed.update(set(sources) & {"main", "port_info"})
+        self._apply_columns(switch, snapshot)
+        link = snapshot.column_bytes("connected", "speed", "overheat_detected")
+        loop = snapshot.column_bytes("loop_detected")
+        if "link" in sources and link != self._last_link:
+            changed.add("link")
+        if "counters" in sources:
+            changed.add("counters")
+        if "loop" in sources and loop != self._last_loop:
+            changed.add("loop")
+        self._last_link, self._last_loop = link, loop
+        return changed
+
+    def __str__(self):
+        return "snapshot %s, retried reads %i" % (self.name, self.reader.num_retries if self.reader is not None else 0)
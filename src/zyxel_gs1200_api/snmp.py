@@ -0,0 +1,580 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Building blocks of the external SNMP agent publishing :class:`~zyxel_gs1200_api.types.Switch` data as IF-MIB and
+BRIDGE-MIB."""
+
+import platform
+import time
+
+from pysnmp.entity import config
+from pysnmp.entity.rfc3413 import cmdrsp
+from pysnmp.proto.api import v2c
+from pysnmp.smi import builder, instrum
+
+from .mib_snapshot import MibSnapshot, SnapshotMibInstrumController
+from .resilience import health_states
+
+__all__ = ['SwitchMib', 'add_community', 'add_context', 'add_responders', 'default_private_oid', 'snapshot_subtrees']
+
+
+default_private_oid = (1, 3, 6, 1, 3, 1206)
+"""Default root of the private subtree with the status of the agent (in the experimental branch of the OID tree)."""
+
+private_mib_module = 'ZYXEL-GS1200-AGENT-MIB'
+
+snapshot_subtrees = ((1, 3, 6, 1, 2, 1, 2, 2), (1, 3, 6, 1, 2, 1, 31, 1, 1))
+"""Subtrees served from the snapshots published by :class:`SwitchMib` (IF-MIB `ifTable` and `ifXTable`)."""
+
+
+def add_context(snmp_context, context_name):
+    """Create a new MIB tree in the given SNMP context.
+
+    The interface tables of the context are served from snapshots (see :data:`snapshot_subtrees`).
+
+    :param snmp_context: The SNMP context.
+    :type snmp_context: pysnmp.entity.rfc3413.context.SnmpContext
+    :param str context_name: Name of the SNMP context. Empty string denotes the default context.
+    :return: The MIB instrumentation controller of the context.
+    :rtype: SnapshotMibInstrumController
+    """
+    if len(context_name) == 0:
+        # The default context shares the MIB tree of the SNMP engine, only the requests go through the snapshot
+        mib_instrum = SnapshotMibInstrumController(snmp_context.getMibInstrum(), snapshot_subtrees)
+        snmp_context.unregisterContextName(v2c.OctetString(context_name))
+    else:
+        mib_instrum = SnapshotMibInstrumController(instrum.MibInstrumController(builder.MibBuilder()),
+                                                   snapshot_subtrees)
+    snmp_context.registerContextName(v2c.OctetString(context_name), mib_instrum)
+    return mib_instrum
+
+
+def add_community(snmp_engine, community, context_name, snmpv1=True, snmpv2c=True):
+    """Allow read-only access to the given SNMP context via SNMPv1/v2c community.
+
+    :param snmp_engine: The SNMP engine.
+    :type snmp_engine: pysnmp.entity.engine.SnmpEngine
+    :param str community: The community name.
+    :param str context_name: Name of the SNMP context. Empty string denotes the default context.
+    :param bool snmpv1: Whether to allow SNMPv1 access.
+    :param bool snmpv2c: Whether to allow SNMPv2c access.
+    """
+    area = 'area-' + context_name if len(context_name) > 0 else 'my-area'
+    config.addV1System(snmp_engine, area, community, contextName=context_name)
+    if snmpv1:
+        config.addRoUser(snmp_engine, 1, area, 'noAuthNoPriv', (1, 3, 6), contextName=context_name)
+    if snmpv2c:
+        config.addRoUser(snmp_engine, 2, area, 'noAuthNoPriv', (1, 3, 6), contextName=context_name)
+
+
+class _ResponderMixin(object):
+    """Command responder calling a refresh callback before the request is handled and measuring its duration.
+
+    If the refresh callback returns a future that is not done yet, the request is handled when the future finishes, so
+    the dispatcher can serve other requests in the meantime.
+    """
+
+    refresh = None
+    instrumentation = None
+    pdu_name = ''
+
+    def __init__(self, *args, **kwargs):
+        super(_ResponderMixin, self).__init__(*args, **kwargs)
+        self._start_times = {}  # stateReference -> time when the request was received
+
+    def processPdu(self, snmpEngine, messageProcessingModel, securityModel, securityName, securityLevel,
+                   contextEngineId, contextName, pduVersion, PDU, maxSizeResponseScopedPDU, stateReference):
+        args = (snmpEngine, messageProcessingModel, securityModel, securityName, securityLevel, contextEngineId,
+                contextName, pduVersion, PDU, maxSizeResponseScopedPDU, stateReference)
+        self._start_times[stateReference] = time.time()
+        pending = None
+        if self.refresh is not None:
+            try:
+                pending = self.refresh(contextName.asOctets().decode('utf-8'))
+            except Exception:
+                self._start_times.pop(stateReference, None)
+                raise
+        if pending is not None and hasattr(pending, 'add_done_callback') and not pending.done():
+            # The access control of the deferred request needs the context of the received message
+            exec_context = snmpEngine.observer.getExecutionContext('rfc3412.receiveMessage:request')
+            pending.add_done_callback(lambda _: self._process_deferred(exec_context, args))
+        else:
+            super(_ResponderMixin, self).processPdu(*args)
+
+    def _process_deferred(self, exec_context, args):
+        snmp_engine = args[0]
+        snmp_engine.observer.storeExecutionContext(snmp_engine, 'rfc3412.receiveMessage:request', exec_context)
+        try:
+            super(_ResponderMixin, self).processPdu(*args)
+        finally:
+            snmp_engine.observer.clearExecutionContext(snmp_engine, 'rfc3412.receiveMessage:request')
+
+    def handleMgmtOperation(self, snmpEngine, stateReference, contextName, PDU, acInfo):
+        start = self._start_times.pop(stateReference, None) or time.time()
+        failed = True
+        try:
+            super(_ResponderMixin, self).handleMgmtOperation(snmpEngine, stateReference, contextName, PDU, acInfo)
+            failed = False
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.observe("snmp." + self.pdu_name, time.time() - start, failed)
+
+
+class _GetCommandResponder(_ResponderMixin, cmdrsp.GetCommandResponder):
+    pdu_name = 'get'
+
+
+class _NextCommandResponder(_ResponderMixin, cmdrsp.NextCommandResponder):
+    pdu_name = 'getnext'
+
+
+class _BulkCommandResponder(_ResponderMixin, cmdrsp.BulkCommandResponder):
+    pdu_name = 'getbulk'
+
+
+def add_responders(snmp_engine, snmp_context, refresh=None, instrumentation=None):
+    """Register read-only command responders (GET, GETNEXT and GETBULK) at the SNMP engine.
+
+    :param snmp_engine: The SNMP engine.
+    :type snmp_engine: pysnmp.entity.engine.SnmpEngine
+    :param snmp_context: The SNMP context.
+    :type snmp_context: pysnmp.entity.rfc3413.context.SnmpContext
+    :param refresh: If set, this callable is called with the SNMP context name before each request is handled. It can
+                    block until the data of the context are fresh enough, or it can return a future (e.g. from
+                    :meth:`~zyxel_gs1200_api.fleet.OnDemandPolling.request_future`). The request is then handled
+                    when the future is done, without blocking the transport dispatcher.
+    :type refresh: callable or None
+    :param Instrumentation instrumentation: If set, the number and duration of the handled requests are recorded here
+                                            (`snmp.get`, `snmp.getnext` and `snmp.getbulk`).
+    :return: The responders.
+    :rtype: list
+    """
+    if refresh is None and instrumentation is None:
+        classes = (cmdrsp.GetCommandResponder, cmdrsp.NextCommandResponder, cmdrsp.BulkCommandResponder)
+    else:
+        classes = (_GetCommandResponder, _NextCommandResponder, _BulkCommandResponder)
+    responders = []
+    for cls in classes:
+        responder = cls(snmp_engine, snmp_context)
+        if refresh is not None:
+            responder.refresh = refresh
+        if instrumentation is not None:
+            responder.instrumentation = instrumentation
+        responders.append(responder)
+    return responders
+
+
+class SwitchMib(object):
+    """IF-MIB, BRIDGE-MIB and SNMPv2-MIB system group instrumentation of a single switch."""
+
+    def __init__(self, mib_instrum, private_oid=default_private_oid):
+        """
+        :param mib_instrum: The MIB instrumentation controller this switch should be published in (see
+                            :func:`add_context`). A plain pysnmp controller is wrapped, and then :attr:`mib_instrum`
+                            is what has to be registered in the SNMP context.
+        :type mib_instrum: SnapshotMibInstrumController or pysnmp.smi.instrum.MibInstrumController
+        :param tuple private_oid: Root of the private subtree with the status of the agent.
+        """
+        if not isinstance(mib_instrum, SnapshotMibInstrumController):
+            mib_instrum = SnapshotMibInstrumController(mib_instrum)
+        for subtree in snapshot_subtrees:
+            mib_instrum.add_subtree(subtree)
+        self.mib_instrum = mib_instrum
+        """The MIB instrumentation controller. `ifTable` and `ifXTable` are published in it as snapshots."""
+        self.private_oid = tuple(private_oid)
+        """Root of the private subtree with the status of the agent."""
+        self.start_time = time.time()
+        """Time of creation of the MIB (approximately the zero of sysUpTime, used for TimeStamp objects)."""
+        self.data_time = 0.0
+        """Time when the data published in the MIB were read from the switch (0 if no data have been published)."""
+        self.health = "ok"
+        """Health of the switch (one of :data:`~zyxel_gs1200_api.resilience.health_states`), see :meth:`set_health`."""
+        self.stale = False
+        """Whether the published port states have been marked unknown because the data are not fresh."""
+        self.recovery_time = 0.0
+        """Time when fresh data were published after a period of stale data (0 if that has not happened)."""
+        self._oids = ()  # OIDs of all instances of the interface tables in the snapshot order
+        self._columns = {}  # column OID -> (raw values of all ports, their syntax objects)
+        mib_builder = mib_instrum.getMibBuilder()
+
+        (Integer32, MibScalarInstance) = mib_builder.importSymbols('SNMPv2-SMI', 'Integer32', 'MibScalarInstance')
+
+        (
+            self.sysDescr, self.sysName, self.sysLocation, self.sysServices
+        ) = mib_builder.importSymbols('SNMPv2-MIB',
+            'sysDescr', 'sysName', 'sysLocation', 'sysServices'  # noqa: E128
+        )  # noqa: E124
+
+        # Import instances of the variables
+        mib_builder.importSymbols('__SNMPv2-MIB',
+            'sysDescr', 'sysName', 'sysLocation', 'sysServices'  # noqa: E128
+        )  # noqa: E124
+
+        (
+            self.ifNumber, self.ifEntry, self.ifIndex, self.ifDescr, self.ifType, self.ifMtu, self.ifSpeed,
+            self.ifPhysAddress, self.ifAdminStatus, self.ifOperStatus, self.ifLastChange,
+            self.ifInOctets, self.ifInUcastPkts, self.ifInNUcastPkts, self.ifInDiscards, self.ifInErrors,
+            self.ifInUnknownProtos,
+            self.ifOutOctets, self.ifOutUcastPkts, self.ifOutNUcastPkts, self.ifOutDiscards, self.ifOutErrors,
+            self.ifOutQLen, self.ifSpecific,
+            self.ifXEntry, self.ifName,
+            self.ifInMulticastPkts, self.ifInBroadcastPkts, self.ifOutMulticastPkts, self.ifOutBroadcastPkts,
+            self.ifHCInOctets, self.ifHCInUcastPkts, self.ifHCInMulticastPkts, self.ifHCInBroadcastPkts,
+            self.ifHCOutOctets, self.ifHCOutUcastPkts, self.ifHCOutMulticastPkts, self.ifHCOutBroadcastPkts,
+            self.ifLinkUpDownTrapEnable, self.ifHighSpeed, self.ifPromiscuousMode, self.ifConnectorPresent,
+            self.ifAlias, self.ifCounterDiscontinuityTime
+        ) = mib_builder.importSymbols('IF-MIB',
+            'ifNumber', 'ifEntry', 'ifIndex', 'ifDescr', 'ifType', 'ifMtu', 'ifSpeed',  # noqa: E128
+            'ifPhysAddress', 'ifAdminStatus', 'ifOperStatus', 'ifLastChange',  # noqa: E128
+            'ifInOctets', 'ifInUcastPkts', 'ifInNUcastPkts', 'ifInDiscards', 'ifInErrors',  # noqa: E128
+            'ifInUnknownProtos',  # noqa: E128
+            'ifOutOctets', 'ifOutUcastPkts', 'ifOutNUcastPkts', 'ifOutDiscards', 'ifOutErrors',  # noqa: E128
+            'ifOutQLen', 'ifSpecific',  # noqa: E128
+            'ifXEntry', 'ifName',  # noqa: E128
+            'ifInMulticastPkts', 'ifInBroadcastPkts', 'ifOutMulticastPkts', 'ifOutBroadcastPkts',  # noqa: E128
+            'ifHCInOctets', 'ifHCInUcastPkts', 'ifHCInMulticastPkts', 'ifHCInBroadcastPkts',  # noqa: E128
+            'ifHCOutOctets', 'ifHCOutUcastPkts', 'ifHCOutMulticastPkts', 'ifHCOutBroadcastPkts',  # noqa: E128
+            'ifLinkUpDownTrapEnable', 'ifHighSpeed', 'ifPromiscuousMode', 'ifConnectorPresent',  # noqa: E128
+            'ifAlias', 'ifCounterDiscontinuityTime',  # noqa: E128
+        )  # noqa: E124
+
+        (
+            self.dot1dBaseBridgeAddress, self.dot1dBaseNumPorts, self.dot1dBaseType,
+            self.dot1dBasePortEntry, self.dot1dBasePort, self.dot1dBasePortIfIndex, self.dot1dBasePortCircuit,
+            self.dot1dBasePortDelayExceededDiscards, self.dot1dBasePortMtuExceededDiscards,
+            self.dot1dTpFdbEntry, self.dot1dTpFdbAddress, self.dot1dTpFdbPort, self.dot1dTpFdbStatus
+        ) = mib_builder.importSymbols('BRIDGE-MIB',
+            'dot1dBaseBridgeAddress', 'dot1dBaseNumPorts', 'dot1dBaseType',  # noqa: E128
+            'dot1dBasePortEntry', 'dot1dBasePort', 'dot1dBasePortIfIndex', 'dot1dBasePortCircuit',  # noqa: E128
+            'dot1dBasePortDelayExceededDiscards', 'dot1dBasePortMtuExceededDiscards',  # noqa: E128
+            'dot1dTpFdbEntry', 'dot1dTpFdbAddress', 'dot1dTpFdbPort', 'dot1dTpFdbStatus',  # noqa: E128
+        )  # noqa: E124
+
+        (
+            self.dot1qTpFdbEntry, self.dot1qTpFdbAddress, self.dot1qTpFdbPort, self.dot1qTpFdbStatus
+        ) = mib_builder.importSymbols('Q-BRIDGE-MIB',
+            'dot1qTpFdbEntry', 'dot1qTpFdbAddress', 'dot1qTpFdbPort', 'dot1qTpFdbStatus',  # noqa: E128
+        )  # noqa: E124
+
+        # Create instances of scalars
+        mib_builder.exportSymbols('IF-MIB', MibScalarInstance(self.ifNumber.name, (0,), Integer32()))
+        mib_builder.exportSymbols('BRIDGE-MIB', *[MibScalarInstance(o.name, (0,), o.syntax.clone()) for o in (
+            self.dot1dBaseBridgeAddress, self.dot1dBaseNumPorts, self.dot1dBaseType)])
+
+        # Private subtree: <private_oid>.1.1.0 is the age of the published data
+        (TimeTicks,) = mib_builder.importSymbols('SNMPv2-SMI', 'TimeTicks')
+        self.add_private_scalar('dataAge', (1, 1), TimeTicks(), self.get_data_age)
+        # <private_oid>.1.2.0 is the health of the switch: ok(1), stale(2), unreachable(3)
+        self.add_private_scalar('switchHealth', (1, 2), Integer32(), lambda: health_states.index(self.health) + 1)
+
+        # Private subtree: <private_oid>.2.1 is the table of statistics of the agent (see update_statistics())
+        (MibTable, MibTableRow, MibTableColumn, Counter64, Gauge32) = mib_builder.importSymbols(
+            'SNMPv2-SMI', 'MibTable', 'MibTableRow', 'MibTableColumn', 'Counter64', 'Gauge32')
+        (DisplayString,) = mib_builder.importSymbols('SNMPv2-TC', 'DisplayString')
+        table_oid = self.private_oid + (2, 1)
+        self.agentStatTable = MibTable(table_oid).setMaxAccess('notaccessible')
+        self.agentStatEntry = MibTableRow(table_oid + (1,)).setMaxAccess('notaccessible').setIndexNames(
+            (0, private_mib_module, 'agentStatIndex'))
+        self.agentStatIndex = MibTableColumn(table_oid + (1, 1), Integer32()).setMaxAccess('readonly')
+        self.agentStatName = MibTableColumn(table_oid + (1, 2), DisplayString()).setMaxAccess('readonly')
+        self.agentStatCount = MibTableColumn(table_oid + (1, 3), Counter64()).setMaxAccess('readonly')
+        self.agentStatErrors = MibTableColumn(table_oid + (1, 4), Counter64()).setMaxAccess('readonly')
+        self.agentStatTotalTime = MibTableColumn(table_oid + (1, 5), Counter64()).setMaxAccess('readonly')
+        self.agentStatMaxTime = MibTableColumn(table_oid + (1, 6), Gauge32()).setMaxAccess('readonly')
+        self.agentStatP95Time = MibTableColumn(table_oid + (1, 7), Gauge32()).setMaxAccess('readonly')
+        mib_builder.exportSymbols(
+            private_mib_module, agentStatTable=self.agentStatTable, agentStatEntry=self.agentStatEntry,
+            agentStatIndex=self.agentStatIndex, agentStatName=self.agentStatName, agentStatCount=self.agentStatCount,
+            agentStatErrors=self.agentStatErrors, agentStatTotalTime=self.agentStatTotalTime,
+            agentStatMaxTime=self.agentStatMaxTime, agentStatP95Time=self.agentStatP95Time)
+
+        # Columns of the interface tables in the order of their OIDs
+        self._if_columns = sorted((
+            self.ifIndex, self.ifDescr, self.ifType, self.ifMtu, self.ifSpeed, self.ifPhysAddress, self.ifAdminStatus,
+            self.ifOperStatus, self.ifLastChange, self.ifInOctets, self.ifInUcastPkts, self.ifInNUcastPkts,
+            self.ifInDiscards, self.ifInErrors, self.ifInUnknownProtos, self.ifOutOctets, self.ifOutUcastPkts,
+            self.ifOutNUcastPkts, self.ifOutDiscards, self.ifOutErrors, self.ifOutQLen, self.ifSpecific,
+            self.ifName, self.ifInMulticastPkts, self.ifInBroadcastPkts, self.ifOutMulticastPkts,
+            self.ifOutBroadcastPkts, self.ifHCInOctets, self.ifHCInUcastPkts, self.ifHCInMulticastPkts,
+            self.ifHCInBroadcastPkts, self.ifHCOutOctets, self.ifHCOutUcastPkts, self.ifHCOutMulticastPkts,
+            self.ifHCOutBroadcastPkts, self.ifLinkUpDownTrapEnable, self.ifHighSpeed, self.ifPromiscuousMode,
+            self.ifConnectorPresent, self.ifAlias, self.ifCounterDiscontinuityTime,
+        ), key=lambda column: column.name)
+        self._in_counter_columns = (
+            self.ifInOctets, self.ifInUcastPkts, self.ifInNUcastPkts, self.ifInMulticastPkts, self.ifInBroadcastPkts,
+            self.ifInDiscards, self.ifInErrors, self.ifHCInOctets, self.ifHCInUcastPkts, self.ifHCInMulticastPkts,
+            self.ifHCInBroadcastPkts)
+        self._out_counter_columns = (
+            self.ifOutOctets, self.ifOutUcastPkts, self.ifOutNUcastPkts, self.ifOutMulticastPkts,
+            self.ifOutBroadcastPkts, self.ifOutDiscards, self.ifOutErrors, self.ifHCOutOctets, self.ifHCOutUcastPkts,
+            self.ifHCOutMulticastPkts, self.ifHCOutBroadcastPkts)
+
+        # We do not want to fill out ifTestEntry
+        del self.ifEntry.augmentingRows[("IF-MIB", "ifTestEntry")]
+
+        # We do not want to fill out the augmentations of dot1dBasePortEntry (e.g. Q-BRIDGE-MIB dot1qPortVlanEntry)
+        self.dot1dBasePortEntry.augmentingRows.clear()
+
+    def add_private_scalar(self, name, sub_oid, syntax, getter):
+        """Add a read-only scalar to the private subtree whose value is computed on each read.
+
+        :param str name: Name of the object.
+        :param tuple sub_oid: OID of the object relative to :attr:`private_oid` (without the trailing instance zero).
+        :param syntax: The SNMP type of the object (e.g. `Gauge32()`).
+        :param getter: Callable returning the current value.
+        """
+        mib_builder = self.mib_instrum.getMibBuilder()
+        (MibScalar, MibScalarInstance) = mib_builder.importSymbols('SNMPv2-SMI', 'MibScalar', 'MibScalarInstance')
+
+        class DynamicScalarInstance(MibScalarInstance):
+            def getValue(self, name, idx):
+                return self.syntax.clone(getter())
+
+        scalar = MibScalar(self.private_oid + tuple(sub_oid), syntax).setMaxAccess('readonly')
+        instance = DynamicScalarInstance(scalar.name, (0,), syntax.clone())
+        mib_builder.exportSymbols(private_mib_module, **{name: scalar, name + 'Instance': instance})
+
+    def get_data_age(self):
+        """Age of the published data in hundredths of a second (since the creation of the MIB if there are no data).
+        :rtype: int
+        """
+        since = self.data_time if self.data_time > 0 else self.start_time
+        return min(max(int((time.time() - since) * 100), 0), 4294967295)
+
+    def set_health(self, health, switch=None):
+        """Publish the health of the switch.
+
+        When the health changes from "ok", `ifOperStatus` of all ports is set to `unknown` (the rest of the last good
+        data is still served). The next :meth:`update` restores the port states and sets `ifCounterDiscontinuityTime`
+        of all ports to the time of the recovery, because counter wraps or resets during the outage could have been
+        missed.
+
+        :param str health: One of :data:`~zyxel_gs1200_api.resilience.health_states`.
+        :param Switch switch: The switch published in the MIB (None if it has not been connected yet).
+        """
+        self.health = health
+        if health == "ok" or self.stale or switch is None or self.data_time == 0:
+            return
+        self.stale = True
+        self._set_column(self.ifOperStatus, ["unknown"] * switch.num_ports)
+        self._publish()
+
+    def _set_column(self, column, raw_values):
+        """Set the values of a column of the interface tables for the next snapshot.
+
+        Syntax objects of unchanged values are reused from the previous snapshot.
+        """
+        old_raw_values, old_values = self._columns.get(column.name, ((), ()))
+        clone = column.syntax.clone
+        self._columns[column.name] = (raw_values, [
+            old_values[i] if i < len(old_raw_values) and old_raw_values[i] == value else clone(value)
+            for i, value in enumerate(raw_values)])
+
+    def _publish(self):
+        values = []
+        for column in self._if_columns:
+            values.extend(self._columns[column.name][1])
+        self.mib_instrum.publish(MibSnapshot(self._oids, values))
+
+    def update_statistics(self, instrumentation):
+        """Write the statistics of the agent into the private table `<private_oid>.2.1`.
+
+        Each histogram is one row (indexed in the order of creation of the histograms) with columns name, count,
+        errors, total time (microseconds), maximum time and 95th percentile of the time (microseconds).
+
+        :param Instrumentation instrumentation: The statistics.
+        """
+        for i, histogram in enumerate(instrumentation.histograms()):
+            instance_id = self.agentStatEntry.getInstIdFromIndices(i + 1)
+            self.mib_instrum.writeVars((
+                (self.agentStatIndex.name + instance_id, i + 1),
+                (self.agentStatName.name + instance_id, histogram.name),
+                (self.agentStatCount.name + instance_id, histogram.count),
+                (self.agentStatErrors.name + instance_id, histogram.errors),
+                (self.agentStatTotalTime.name + instance_id, int(histogram.total * 1000000)),
+                (self.agentStatMaxTime.name + instance_id, min(int(histogram.max * 1000000), 4294967295)),
+                (self.agentStatP95Time.name + instance_id,
+                 min(int(histogram.percentile(0.95) * 1000000), 4294967295)),
+            ))
+
+    def init_switch(self, switch, port_info=None, cached=False):
+        """Write the static part of the switch information into the MIB.
+
+        :param Switch switch: The switch returned by :meth:`ZyxelAPI.get_switch`.
+        :param dict port_info: Extra configuration of switch ports. Keys are port names (e.g. `GigabitEthernet1`) and
+                               values are dicts. Key `name` of these dicts sets an alias of the port.
+        :param bool cached: Whether the switch was created from a cached descriptor (see
+                            :class:`~zyxel_gs1200_api.descriptor_cache.DescriptorCache`) and the switch has not been
+                            reached yet. The port states are then published as "unknown" instead of "down".
+        """
+        if port_info is None:
+            port_info = {}
+
+        self.mib_instrum.writeVars((
+            (self.sysDescr.name + (0,), switch.description),
+            (self.sysLocation.name + (0,), platform.node()),
+            (self.sysName.name + (0,), switch.device_name),
+            (self.sysServices.name + (0,), (2 << (2 - 1))),  # OSI layer 2
+        ))
+
+        self.mib_instrum.writeVars(((self.ifNumber.name + (0,), switch.num_ports),))
+
+        n = switch.num_ports
+        for port in switch.ports:
+            port.alias = port_info.get(port.name, {}).get("name", port.name)
+
+        # The OIDs only change with the number of ports, so they are computed here and shared by all snapshots
+        self._oids = tuple(column.name + (i + 1,) for column in self._if_columns for i in range(n))
+        self._columns = {}
+        static_columns = (
+            (self.ifIndex, [i + 1 for i in range(n)]),
+            (self.ifDescr, [port.name for port in switch.ports]),
+            (self.ifType, ["ethernetCsmacd"] * n),
+            (self.ifMtu, [port.mtu for port in switch.ports]),
+            (self.ifPhysAddress, [port.mac_bin for port in switch.ports]),
+            (self.ifAdminStatus, ["up" if port.status.enabled else "down" for port in switch.ports]),
+            (self.ifInUnknownProtos, [0] * n),
+            (self.ifOutQLen, [0] * n),
+            (self.ifSpecific, [(0, 0)] * n),
+            (self.ifName, [port.short_name for port in switch.ports]),
+            (self.ifLinkUpDownTrapEnable, [1] * n),
+            (self.ifPromiscuousMode, ["false"] * n),
+            (self.ifAlias, [port.alias for port in switch.ports]),
+        )
+        for column, raw_values in static_columns:
+            self._set_column(column, raw_values)
+        # The dynamic columns are published as "down" (or "unknown") with zero counters until the first update()
+        self._set_column(self.ifOperStatus, ["unknown" if cached else "down"] * n)
+        self._set_column(self.ifConnectorPresent, ["false"] * n)
+        self._set_column(self.ifSpeed, [min(port.max_speed, 4294967295) for port in switch.ports])
+        self._set_column(self.ifHighSpeed, [int(port.max_speed / 1000000) for port in switch.ports])
+        for column in self._if_columns:
+            if column.name not in self._columns:
+                self._set_column(column, [0] * n)
+        self._publish()
+
+    def update(self, switch, data_time=None):
+        """Publish the dynamic status of the switch as a new snapshot of the interface tables.
+
+        :param Switch switch: The switch updated by :meth:`ZyxelAPI.update_port_states`.
+        :param float data_time: Time when the data were read from the switch (used for reporting the data age). If
+                                None, current time is used.
+        """
+        if self.stale:
+            self.stale = False
+            self.recovery_time = time.time()
+
+        n = switch.num_ports
+        table = switch.port_table
+        now = time.time()
+        speed = table.speed[:n]
+        connected = [c > 0 for c in table.connected[:n]]
+        set_column = self._set_column
+
+        set_column(self.ifSpeed, [min(v, 4294967295) for v in speed])
+        set_column(self.ifHighSpeed, [int(v / 1000000) for v in speed])
+        set_column(self.ifOperStatus, [
+            ("up" if c else "dormant") if e > 0 else "down" for e, c in zip(table.enabled[:n], connected)])
+        set_column(self.ifConnectorPresent, ["true" if c else "false" for c in connected])
+        set_column(self.ifLastChange, [
+            int((now - t) * 100) if t != 0 else 0 for t in table.last_change_time[:n]])
+        recovery_time = self.recovery_time
+        start_time = self.start_time
+        set_column(self.ifCounterDiscontinuityTime, [
+            int((max(t, recovery_time) - start_time) * 100) if max(t, recovery_time) > start_time else 0
+            for t in table.last_packet_jump_back_time[:n]])
+
+        # The counters are 64-bit (extended by CounterEngine), Counter32 objects get their lower 32 bits
+        for counters, columns in ((table.rx, self._in_counter_columns), (table.tx, self._out_counter_columns)):
+            octets, ucast, nucast, mcast, bcast, discards, errors, hc_octets, hc_ucast, hc_mcast, hc_bcast = columns
+            multicast = counters.num_multicast_packets[:n]
+            broadcast = counters.num_broadcast_packets[:n]
+            for column, hc_column, values in ((octets, hc_octets, counters.num_bytes[:n]),
+                                              (ucast, hc_ucast, counters.num_unicast_packets[:n]),
+                                              (mcast, hc_mcast, multicast),
+                                              (bcast, hc_bcast, broadcast)):
+                set_column(column, [v & 0xFFFFFFFF for v in values])
+                set_column(hc_column, values.tolist())
+            set_column(nucast, [(m + b) & 0xFFFFFFFF for m, b in zip(multicast, broadcast)])
+            set_column(discards, [v & 0xFFFFFFFF for v in counters.num_discards[:n]])
+            set_column(errors, [v & 0xFFFFFFFF for v in counters.num_errors[:n]])
+
+        self._publish()
+        self.data_time = data_time if data_time is not None else time.time()
+
+    def init_bridge(self, switch):
+        """Write the static part of BRIDGE-MIB into the MIB.
+
+        :param Switch switch: The switch returned by :meth:`ZyxelAPI.get_switch`.
+        """
+        self.mib_instrum.writeVars((
+            (self.dot1dBaseBridgeAddress.name + (0,), switch.mac_bin),
+            (self.dot1dBaseNumPorts.name + (0,), switch.num_ports),
+            (self.dot1dBaseType.name + (0,), "transparent-only"),
+        ))
+        for i in range(switch.num_ports):
+            instance_id = self.dot1dBasePortEntry.getInstIdFromIndices(i + 1)
+            self.mib_instrum.writeVars((
+                (self.dot1dBasePort.name + instance_id, i + 1),
+                (self.dot1dBasePortIfIndex.name + instance_id, i + 1),
+                (self.dot1dBasePortCircuit.name + instance_id, (0, 0)),
+                (self.dot1dBasePortDelayExceededDiscards.name + instance_id, 0),
+                (self.dot1dBasePortMtuExceededDiscards.name + instance_id, 0),
+            ))
+
+    def update_mac_table(self, switch, diff):
+        """Apply the changes of the MAC table to BRIDGE-MIB `dot1dTpFdbTable` and Q-BRIDGE-MIB `dot1qTpFdbTable`.
+
+        Only the rows that changed are written or removed.
+
+        :param Switch switch: The switch updated by :meth:`ZyxelAPI.update_mac_table`.
+        :param MacTableDiff diff: The changes returned by :meth:`ZyxelAPI.update_mac_table`.
+        """
+        for entry in diff.removed:
+            self._remove_mac_table_row(switch, entry)
+        for entry in diff.changed:
+            self._write_mac_table_row(switch, entry, False)
+        for entry in diff.added:
+            self._write_mac_table_row(switch, entry, True)
+
+    def _write_mac_table_row(self, switch, entry, is_new):
+        port = entry.port_index + 1 if entry.port_index >= 0 else 0
+        if entry.mac_bin == switch.mac_bin:
+            status = "self"
+        elif entry.is_static:
+            status = "mgmt"
+        else:
+            status = "learned"
+
+        q_instance_id = self.dot1qTpFdbEntry.getInstIdFromIndices(entry.vlan, entry.mac_bin)
+        self.mib_instrum.writeVars((
+            (self.dot1qTpFdbPort.name + q_instance_id, port),
+            (self.dot1qTpFdbStatus.name + q_instance_id, status),
+        ))
+        if is_new:
+            # Creating the row also instantiates the not-accessible index column, which would break GETNEXT
+            self.dot1qTpFdbAddress.unregisterSubtrees(self.dot1qTpFdbAddress.name + q_instance_id)
+
+        # dot1dTpFdbTable is indexed only by MAC address, so it shows the entry from the lowest VLAN
+        entries = switch.mac_table.lookup_mac(entry.mac_bin)
+        if min(e.vlan for e in entries) == entry.vlan:
+            instance_id = self.dot1dTpFdbEntry.getInstIdFromIndices(entry.mac_bin)
+            self.mib_instrum.writeVars((
+                (self.dot1dTpFdbAddress.name + instance_id, entry.mac_bin),
+                (self.dot1dTpFdbPort.name + instance_id, port),
+                (self.dot1dTpFdbStatus.name + instance_id, status),
+            ))
+
+    def _remove_mac_table_row(self, switch, entry):
+        q_instance_id = self.dot1qTpFdbEntry.getInstIdFromIndices(entry.vlan, entry.mac_bin)
+        for column in (self.dot1qTpFdbPort, self.dot1qTpFdbStatus):
+            column.unregisterSubtrees(column.name + q_instance_id)
+
+        entries = switch.mac_table.lookup_mac(entry.mac_bin)
+        if len(entries) > 0:
+            # The address is still known in another VLAN
+            self._write_mac_table_row(switch, min(entries, key=lambda e: e.vlan), False)
+        else:
+            instance_id = self.dot1dTpFdbEntry.getInstIdFromIndices(entry.mac_bin)
+            for column in (self.dot1dTpFdbAddress, self.dot1dTpFdbPort, self.dot1dTpFdbStatus):
+                column.unregisterSubtrees(column.name + instance_id)
@@ -70,6 +70,17 @@ class TestBackend(WebBackend):
             }
             data.update(base_sys_data)
             return JsonWrapper(data)
+        elif cmd == "mac_macTable":
+            return JsonWrapper({
+                'macTable': [
+                    {'mac': '00:E0:4C:00:00:01', 'vid': 1, 'port': 0, 'type': 'static'},
+                    {'mac': '3C:52:82:6A:11:02', 'vid': 1, 'port': 5, 'type': 'dynamic'},
+                    {'mac': '3C:52:82:6A:11:03', 'vid': 1, 'port': 6, 'type': 'dynamic'},
+                    {'mac': '3C:52:82:6A:11:04', 'vid': 1, 'port': 7, 'type': 'dynamic'},
+                    {'mac': '48:B0:2D:15:0A:7E', 'vid': 1, 'port': 9, 'type': 'dynamic'},
+                    {'mac': '1C:69:7A:0B:C4:51', 'vid': 1, 'port': 10, 'type': 'dynamic'},
+                    {'mac': '48:B0:2D:2E:91:3C', 'vid': 1, 'port': 11, 'type': 'dynamic'},
+                ]})
 
     def set(self, cmd, *args, **kwargs):
         pass
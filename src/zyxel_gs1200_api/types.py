@@ -3,13 +3,48 @@
 
 """Data types provided by the high-level API."""
 
+from array import array
+
 try:
     from dataclasses import dataclass
 except ImportError:
     def dataclass(f):
         return f
 
-__all__ = ['Capabilities', 'PacketCounter', 'Port', 'PortStatus', 'Switch']
+__all__ = ['Capabilities', 'CounterColumns', 'MacTableEntry', 'PacketCounter', 'Port', 'PortRates', 'PortStatus',
+           'PortTable', 'Switch']
+
+
+class _Column(object):
+    """Descriptor exposing one element of a column of a :class:`PortTable` as an attribute of a view."""
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        return getattr(view._columns, self.name)[view._index]
+
+    def __set__(self, view, value):
+        getattr(view._columns, self.name)[view._index] = value
+
+
+class _BoolColumn(_Column):
+    """Column of booleans stored as bytes. Negative values (see :attr:`PortTable.unknown`) are read as None."""
+
+    __slots__ = ()
+
+    def __get__(self, view, owner):
+        if view is None:
+            return self
+        value = getattr(view._columns, self.name)[view._index]
+        return None if value < 0 else bool(value)
+
+    def __set__(self, view, value):
+        getattr(view._columns, self.name)[view._index] = PortTable.unknown if value is None else bool(value)
 
 
 @dataclass
@@ -29,44 +64,215 @@ class Capabilities(object):
     """Whether SSH is supported."""
 
 
+class CounterColumns(object):
+    """Packet counters of all ports of a switch in one direction, one contiguous 64-bit column per counter."""
+
+    fields = ("num_bytes", "num_unicast_packets", "num_multicast_packets", "num_broadcast_packets", "num_discards",
+              "num_errors")
+    """Names of the counters (same as the attributes of :class:`PacketCounter`)."""
+
+    __slots__ = fields
+
+    def __init__(self, num_ports=0):
+        """
+        :param int num_ports: Number of ports.
+        """
+        for field in self.fields:
+            setattr(self, field, array('Q', [0]) * num_ports)
+
+
 @dataclass
 class PacketCounter(object):
-    """Counter of packets flowing through a switch port in one direction."""
-    num_bytes = 0
+    """Counter of packets flowing through a switch port in one direction.
+
+    The counter is a view of one row of :class:`CounterColumns`. A counter created without columns gets its own.
+    """
+
+    __slots__ = ('_columns', '_index')
+
+    def __init__(self, columns=None, index=0):
+        """
+        :param CounterColumns columns: The columns to view. If None, new columns for a single port are created.
+        :param int index: Index of the port in the columns.
+        """
+        self._columns = columns if columns is not None else CounterColumns(1)
+        self._index = index
+
+    num_bytes = _Column("num_bytes")
     """Total number of bytes."""
-    num_unicast_packets = 0
+    num_unicast_packets = _Column("num_unicast_packets")
     """Total number of unicast packets."""
-    num_multicast_packets = 0
+    num_multicast_packets = _Column("num_multicast_packets")
     """Total number of multicast packets."""
-    num_broadcast_packets = 0
+    num_broadcast_packets = _Column("num_broadcast_packets")
     """Total number of broadcast packets."""
-    num_discards = 0
+    num_discards = _Column("num_discards")
     """Total number of discarded packets."""
-    num_errors = 0
+    num_errors = _Column("num_errors")
     """Total number of errors."""
 
+    def assign(self, other):
+        """Copy all counters from another counter.
+        :param PacketCounter other: The counter to copy.
+        """
+        for field in CounterColumns.fields:
+            setattr(self, field, getattr(other, field))
+
+
+@dataclass
+class PortRates(object):
+    """Traffic rates of a switch port averaged over a time window."""
+    window = 0.0
+    """Real length of the window in seconds (can be shorter than requested if there is not enough history)."""
+    rx_pps = 0.0
+    """Received packets per second."""
+    tx_pps = 0.0
+    """Transmitted packets per second."""
+    rx_bps = 0.0
+    """Received bits per second."""
+    tx_bps = 0.0
+    """Transmitted bits per second."""
+
+
+class PortTable(object):
+    """Dynamic status of all ports of a switch stored column-wise.
+
+    Each status field is one contiguous array indexed by the port index, so that backends can update all ports at
+    once and many switches can be held in one process cheaply. :class:`PortStatus` and :class:`PacketCounter` objects
+    are lightweight views of one row of the table.
+    """
+
+    unknown = -1
+    """Value of boolean columns representing None (e.g. the link state before the first update)."""
+
+    __slots__ = ('num_ports', 'enabled', 'connected', 'speed', 'last_change_time', 'loop_detected',
+                 'overheat_detected', 'last_packet_jump_back_time', 'rates', 'rx', 'tx', '_views')
+
+    def __init__(self, num_ports=0):
+        """
+        :param int num_ports: Number of ports.
+        """
+        self.num_ports = num_ports
+        self.enabled = array('b', [0]) * num_ports
+        self.connected = array('b', [self.unknown]) * num_ports
+        self.speed = array('Q', [0]) * num_ports
+        self.last_change_time = array('d', [0.0]) * num_ports
+        self.loop_detected = array('b', [0]) * num_ports
+        self.overheat_detected = array('b', [0]) * num_ports
+        self.last_packet_jump_back_time = array('d', [0.0]) * num_ports
+        self.rates = [{} for _ in range(num_ports)]
+        self.rx = CounterColumns(num_ports)
+        """Counters of received packets."""
+        self.tx = CounterColumns(num_ports)
+        """Counters of transmitted packets."""
+        self._views = [PortStatus(self, i) for i in range(num_ports)]
+
+    def status(self, index):
+        """Return the view of one port.
+        :param int index: Index of the port.
+        :rtype: PortStatus
+        """
+        return self._views[index]
+
+    def update_link_data(self, link_data, speed_names, overheat_protect=False, now=0.0):
+        """Update link states, speeds and overheat status of all ports from the `home_linkData` response.
+
+        :param dict link_data: Data of the `home_linkData` response.
+        :param dict speed_names: Maps the speed names used in the response to speeds in bps.
+        :param bool overheat_protect: Whether the response contains the overheat status.
+        :param float now: Time of the update (stored as the last change time of ports whose link state changed).
+        :return: Whether the link state, speed or overheat status of any port changed.
+        :rtype: bool
+        """
+        n = self.num_ports
+        connected = array('b', [s == "Up" for s in link_data["portstatus"][:n]])
+        speed = array('Q', [speed_names[s] if c else 0 for s, c in zip(link_data["speed"][:n], connected)])
+        changed = speed != self.speed
+        for i in range(n):
+            if 0 <= self.connected[i] != connected[i]:
+                self.last_change_time[i] = now
+                changed = True
+        self.connected[:] = connected
+        self.speed[:] = speed
+        if overheat_protect:
+            overheat_detected = array('b', [bool(o) for o in link_data["overheat"][:n]])
+            changed = changed or overheat_detected != self.overheat_detected
+            self.overheat_detected[:] = overheat_detected
+        return changed
+
+    def update_counters(self, stats):
+        """Update the unicast packet counters of all ports from the `Stats` field of the `home_linkData` response.
+
+        :param list stats: List of [rx, tx] counters of the ports.
+        :return: Whether any counter changed.
+        :rtype: bool
+        """
+        n = self.num_ports
+        rx = array('Q', [s[0] for s in stats[:n]])
+        tx = array('Q', [s[1] for s in stats[:n]])
+        changed = rx != self.rx.num_unicast_packets or tx != self.tx.num_unicast_packets
+        self.rx.num_unicast_packets[:] = rx
+        self.tx.num_unicast_packets[:] = tx
+        return changed
+
 
 @dataclass
 class PortStatus(object):
-    """Dynamic status of a switch port."""
-    enabled = False
+    """Dynamic status of a switch port.
+
+    The status is a view of one row of :class:`PortTable`. A status created without a table gets its own.
+    """
+
+    __slots__ = ('_columns', '_index', '_rx_packets', '_tx_packets')
+
+    def __init__(self, table=None, index=0):
+        """
+        :param PortTable table: The table to view. If None, a new table with a single port is created.
+        :param int index: Index of the port in the table.
+        """
+        self._columns = table if table is not None else PortTable(1)
+        self._index = index
+        self._rx_packets = PacketCounter(self._columns.rx, index)
+        self._tx_packets = PacketCounter(self._columns.tx, index)
+
+    enabled = _BoolColumn("enabled")
     """Whether the port is administratively enabled."""
-    connected = None
+    connected = _BoolColumn("connected")
     """Whether the port is connected."""
-    speed = 0
+    speed = _Column("speed")
     """Speed of the port in bps."""
-    last_change_time = 0
+    last_change_time = _Column("last_change_time")
     """Last time a change to the connected state was detected."""
-    loop_detected = False
+    loop_detected = _BoolColumn("loop_detected")
     """Whether is loop is currently detected between this port and another one."""
-    overheat_detected = False
+    overheat_detected = _BoolColumn("overheat_detected")
     """Whether this port is overheating."""
-    rx_packets = PacketCounter()
-    """Counter of received packets."""
-    tx_packets = PacketCounter()
-    """Counter of transmitted packets."""
-    last_packet_jump_back_time = 0
-    """Last time when `rx_packets` or `tx_packets` counters jumped back."""
+    last_packet_jump_back_time = _Column("last_packet_jump_back_time")
+    """Last time when `rx_packets` or `tx_packets` counters jumped back (i.e. the last counter discontinuity)."""
+    rates = _Column("rates")  # Dict[float, PortRates]
+    """Traffic rates of the port keyed by the requested window length (in seconds)."""
+
+    @property
+    def rx_packets(self):
+        """Counter of received packets.
+        :rtype: PacketCounter
+        """
+        return self._rx_packets
+
+    @rx_packets.setter
+    def rx_packets(self, counter):
+        self._rx_packets.assign(counter)
+
+    @property
+    def tx_packets(self):
+        """Counter of transmitted packets.
+        :rtype: PacketCounter
+        """
+        return self._tx_packets
+
+    @tx_packets.setter
+    def tx_packets(self, counter):
+        self._tx_packets.assign(counter)
 
 
 @dataclass
@@ -90,8 +296,29 @@ class Port(object):
     """Binary representation of the port's MAC address."""
     mac_str = ''
     """String representation of the port's MAC address."""
-    status = PortStatus()
-    """Dynamic status of the port."""
+    status = None  # PortStatus
+    """Dynamic status of the port (a view of :attr:`Switch.port_table`)."""
+
+    def __init__(self, status=None):
+        """
+        :param PortStatus status: The dynamic status. If None, a standalone status is created.
+        """
+        self.status = status if status is not None else PortStatus()
+
+
+@dataclass
+class MacTableEntry(object):
+    """One entry of the MAC address forwarding table."""
+    mac_bin = b''
+    """Binary representation of the MAC address."""
+    mac_str = ''
+    """String representation of the MAC address."""
+    vlan = 1
+    """VLAN ID the address was seen in."""
+    port_index = 0
+    """Index of the port the address was seen on (same as :attr:`Port.index`, -1 for the switch itself)."""
+    is_static = False
+    """Whether the entry is configured statically or learned dynamically."""
 
 
 @dataclass
@@ -129,3 +356,18 @@ class Switch(object):
     """Capabilities of the switch."""
     ports = []  # List[Port]
     """List of switch ports (ordered by port index)."""
+    port_table = None  # PortTable
+    """Dynamic status of all ports stored column-wise (:attr:`Port.status` are views of its rows)."""
+    mac_table = None  # MacTable
+    """MAC address forwarding table (None until :meth:`ZyxelAPI.update_mac_table` is called)."""
+
+    def __init__(self, num_ports=0):
+        """
+        :param int num_ports: Number of switch ports. The ports and their statuses are created.
+        """
+        self.num_ports = num_ports
+        self.capabilities = Capabilities()
+        self.port_table = PortTable(num_ports)
+        self.ports = [Port(self.port_table.status(i)) for i in range(num_ports)]
+        for i, port in enumerate(self.ports):
+            port.index = i
@@ -5,15 +5,48 @@
 
 import base64
 import hashlib
+import json
 import requests
-import rsa
+import threading
 import time
 from urllib3.util import parse_url
 
 from .backend import Backend
-from .types import PacketCounter, Port, PortStatus, Switch
+from .parsing import parse_counters, parse_link_states, parse_mac_table, parse_main_info, parse_port_info, \
+    parse_port_states, parse_switch, parse_switch_config, parse_system_data
+from .resilience import Backoff
+from .response_cache import ResponseCache
+
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from ujson import loads as json_loads
+    except ImportError:
+        json_loads = json.loads
+
+__all__ = ['LoginStatistics', 'WebBackend', 'decode_json', 'json_loads']
+
 
-__all__ = ['WebBackend']
+def decode_json(resp):
+    """Decode the JSON body of a HTTP response just once.
+
+    The fastest available parser is used (`orjson` or `ujson` if installed). Bodies that do not start like a JSON
+    object or array are not parsed at all. The decoded value is cached in the response, so further calls of
+    `resp.json()` return it without parsing the body again.
+
+    :param requests.Response resp: The response.
+    :return: The decoded body or None if the body is not JSON.
+    """
+    content = resp.content.lstrip()
+    if content[:1] not in (b"{", b"["):
+        return None
+    try:
+        data = json_loads(content)
+    except ValueError:
+        return None
+    resp.json = lambda **kwargs: data
+    return data
 
 
 def formalize_request(r):
@@ -28,71 +61,94 @@ def formalize_request(r):
     return r
 
 
-def get_one_of(data, keys):
-    for key in keys:
-        if key in data:
-            return data[key]
-    raise KeyError("None of the keys %r found in %s" % (keys, data.keys()))
-
-
-# These are the strings coming from Zyxel API
-if_speeds = {
-    "10 Mbps": 10000000,
-    "100 Mbps": 100000000,
-    "1 Gbps": 1000000000,
-    "2.5 Gbps": 2500000000,
-    "5 Gbps": 5000000000,
-    "10 Gbps": 10000000000,
-}
-
-
-port_type_speeds = {
-    0: 10000000,
-    1: 100000000,
-    2: 1000000000,
-    3: 2500000000,
-    4: 5000000000,
-    6: 10000000000,
-}
-
-
-port_type_device_names = {
-    0: "Ethernet",
-    1: "FastEthernet",
-    2: "GigabitEthernet",
-    3: "TwoPointFiveGigabitEthernet",
-    4: "FiveGigabitEthernet",
-    6: "TenGigabitEthernet",
-}
-
-
-port_type_device_short_names = {
-    0: "et",
-    1: "fe",
-    2: "ge",
-    3: "tw",
-    4: "fe",
-    6: "tg",
-}
-
-
-def get_port_name(port_types, num, short=False):
-    port_type = port_types[num]
-    port_num = 0
-    for i in range(num):
-        if port_types[i] == port_type:
-            port_num += 1
-    device_names = port_type_device_short_names if short else port_type_device_names
-    return device_names[port_type] + str(port_num + 1)
+def encrypt_password(password, modulus):
+    """Encrypt the password the same way the web GUI does it.
+    :param str password: The password.
+    :param str modulus: Hex representation of the RSA public key modulus returned by `home_loginInfo`.
+    :return: The encrypted password ready to be put in the `home_loginAuth` request.
+    :rtype: str
+    """
+    import rsa  # only needed at login, importing it takes longer than the rest of the module
+
+    key = rsa.PublicKey(n=int(modulus, 16), e=0x10001)
+    encrypted = rsa.encrypt(password.encode("ascii"), key)
+    try:
+        enc_pass = base64.encodebytes(encrypted)
+    except AttributeError:
+        enc_pass = base64.encodestring(encrypted)
+    enc_pass = enc_pass.replace(b"\n", b"").replace(b"+", b"%2B").replace(b"=", b"%3D")
+    return enc_pass.decode("ascii")
+
+
+def login_auth_payload(enc_pass):
+    """JSON body of the `home_loginAuth` request.
+    :param str enc_pass: The password encrypted by :func:`encrypt_password`.
+    :rtype: dict
+    """
+    return {"_ds=1&password=" + enc_pass + "&xsrfToken=fa9358fbd291c3bd&_de=1": {}}
+
+
+def login_status_payload(auth_id):
+    """JSON body of the `home_loginStatus` request.
+    :param str auth_id: The `authId` returned by `home_loginAuth`.
+    :rtype: dict
+    """
+    return {"_ds=1&authId=" + auth_id + "&xsrfToken=fa9358fbd291c3bd&_de=1": {}}
+
+
+class LoginStatistics(object):
+    """Statistics of logins to the web API."""
+
+    def __init__(self):
+        self.num_logins = 0
+        """Number of successful full logins."""
+        self.num_failed_logins = 0
+        """Number of failed login attempts."""
+        self.num_reused_sessions = 0
+        """Number of sessions restored from the session store instead of a full login."""
+        self.num_expired_sessions = 0
+        """Number of times the switch reported an expired session."""
+        self.num_coalesced_logins = 0
+        """Number of login requests satisfied by a login performed concurrently by another thread."""
+        self.last_login_duration = 0.0
+        """Duration of the last successful full login in seconds."""
+        self.total_login_duration = 0.0
+        """Total duration of all successful full logins in seconds."""
+
+    @property
+    def avg_login_duration(self):
+        """Average duration of a successful full login in seconds."""
+        return self.total_login_duration / self.num_logins if self.num_logins > 0 else 0.0
+
+    def __str__(self):
+        return "logins %i (avg %.3f s), failed %i, reused sessions %i, expired sessions %i, coalesced %i" % (
+            self.num_logins, self.avg_login_duration, self.num_failed_logins, self.num_reused_sessions,
+            self.num_expired_sessions, self.num_coalesced_logins)
 
 
 class WebBackend(Backend):
     """Low-level backend of Zyxel (X)GS-1200 series switches utilizing the web browser API."""
-    def __init__(self, address, password, max_login_attempts=3):
+
+    mac_table_cmd = "mac_macTable"
+    """The `cmd` used to read the MAC address table."""
+
+    def __init__(self, address, password, max_login_attempts=3, session_store=None, instrumentation=None,
+                 request_timeout=10.0, response_ttl=0.0):
         """
         :param str address: The HTTP(S) address of the switch API.
         :param str password: Password for the switch administration.
-        :param int max_login_attempts: Maximum number of login retries before an exception is raised.
+        :param int max_login_attempts: Maximum number of login retries before an exception is raised. The retries are
+                                       delayed by an exponential backoff. Set to 1 to leave the retries to the caller
+                                       (e.g. a :class:`~zyxel_gs1200_api.resilience.CircuitBreaker`).
+        :param SessionStore session_store: If set, the session is stored in this store after login and the next login
+                                           first tries to reuse the stored session. :meth:`logout` then keeps the
+                                           session alive.
+        :param Instrumentation instrumentation: If set, latencies of the requests (`http.<cmd>`) and re-logins caused
+                                                by expired sessions (`http.relogin`) are recorded here.
+        :param float request_timeout: Timeout of a single request (in seconds). None means no timeout.
+        :param float response_ttl: How long the data read by :meth:`get_data` are reused by further calls (in seconds),
+                                   so that endpoints needed by several API calls of one poll cycle are only read once.
+                                   Concurrent reads of the same endpoint share one request even if this is zero.
         """
         super(WebBackend, self).__init__()
 
@@ -101,10 +157,25 @@ class WebBackend(Backend):
 
         self.max_login_attempts = max_login_attempts
         self.failed_login_attempts = 0
+        self.login_backoff = Backoff(initial=1.0, maximum=10.0)
+        """Delays between the login attempts."""
+        self.request_timeout = request_timeout
+
+        self.session_store = session_store
+        self.login_stats = LoginStatistics()
+        """Statistics of logins to the switch."""
+        self.instrumentation = instrumentation
+        self.response_cache = ResponseCache(response_ttl)
+        """Cache of the data read by :meth:`get_data`. Call its `invalidate()` to force reading fresh data."""
 
         self.session = requests.Session()
         self.logged_in = False
 
+        self._login_lock = threading.Lock()
+        self._login_generation = 0
+        self._enc_pass = None  # (modulus, password encrypted with it)
+        self._stored_session_checked = False
+
     def send_request(self, method, url, *args, **kwargs):
         """Send a HTTP request to the switch API.
         :param str method: GET or POST
@@ -122,29 +193,40 @@ class WebBackend(Backend):
         if auto_login and not self.logged_in:
             self.auto_login()
 
-        url = self.address + "/" + url
-        req = requests.Request(method=method, url=url, *args, **kwargs)
+        login_generation = self._login_generation
+        req = requests.Request(method=method, url=self.address + "/" + url, *args, **kwargs)
         req = formalize_request(req)
         req = self.session.prepare_request(req)
-        resp = self.session.send(req)
-        resp.raise_for_status()
-
-        # Some non-existent pages return empty page
-        if resp.content == b"\n":
-            resp.status_code = 400
-            resp.reason = "Not found"
+        start = time.time()
+        failed = True
+        try:
+            resp = self.session.send(req, timeout=self.request_timeout)
             resp.raise_for_status()
 
-        try:
-            if "logout" in resp.json():
-                self.logged_in = False
-                if auto_login:
-                    self.auto_login()
-                    return self.send_request(method, url, auto_login=False, *args, **kwargs)
-                else:
-                    raise RuntimeError("Authentication session has expired")
-        except requests.exceptions.JSONDecodeError:
-            pass  # The response is not a JSON
+            # Some non-existent pages return empty page
+            if resp.content == b"\n":
+                resp.status_code = 400
+                resp.reason = "Not found"
+                resp.raise_for_status()
+            failed = False
+        finally:
+            if self.instrumentation is not None:
+                self.instrumentation.observe("http." + url.split("cmd=", 1)[-1], time.time() - start, failed)
+
+        data = decode_json(resp)  # The decoded body is cached in resp.json()
+        if isinstance(data, dict) and "logout" in data:
+            self.login_stats.num_expired_sessions += 1
+            if self.instrumentation is not None:
+                self.instrumentation.increment("http.relogin")
+            if auto_login and login_generation != self._login_generation:
+                # Another thread has logged in again while this request was in flight
+                return self.send_request(method, url, auto_login=False, *args, **kwargs)
+            self.logged_in = False
+            if auto_login:
+                self.auto_login()
+                return self.send_request(method, url, auto_login=False, *args, **kwargs)
+            else:
+                raise RuntimeError("Authentication session has expired")
         return resp
 
     def get(self, cmd, *args, **kwargs):
@@ -159,6 +241,25 @@ class WebBackend(Backend):
         """
         return self.send_request("GET", "cgi/get.cgi?cmd=" + cmd, *args, **kwargs)
 
+    def get_data(self, cmd, *args, **kwargs):
+        """Perform a get action on the API and return the `data` field of the decoded response.
+
+        Calls without extra arguments go through :attr:`response_cache`. The returned data must not be modified.
+
+        :param cmd: The command to execute (`cmd` argument of the URL).
+        :param args: Passed to :meth:`get`.
+        :param kwargs: Passed to :meth:`get`.
+        :return: The `data` field of the response.
+        :rtype: dict
+        :raises requests.exceptions.RequestException:
+        :raises RuntimeError:
+        """
+        if len(args) > 0 or len(kwargs) > 0:
+            return self.get(cmd, *args, **kwargs).json()["data"]
+        if not self.logged_in:
+            self.auto_login()  # a reused session caches home_main
+        return self.response_cache.get(cmd, lambda: self.get(cmd).json()["data"])
+
     def set(self, cmd, *args, **kwargs):
         """Perform a set action on the API.
         :param cmd: The command to execute (`cmd` argument of the URL).
@@ -169,187 +270,164 @@ class WebBackend(Backend):
         :raises requests.exceptions.RequestException:
         :raises RuntimeError:
         """
+        # The action may change any of the cached data
+        self.response_cache.invalidate()
         return self.send_request("POST", "cgi/set.cgi?cmd=" + cmd, *args, **kwargs)
 
     def auto_login(self):
         """Automatically log in the web API if it is needed.
+
+        Concurrent callers wait for a single login instead of each of them logging in.
+
         :raises requests.exceptions.RequestException:
         :raises RuntimeError:
         """
-        self.failed_login_attempts = 0
-        while self.failed_login_attempts < self.max_login_attempts:
-            try:
-                self.login()
+        login_generation = self._login_generation
+        with self._login_lock:
+            if self.logged_in and login_generation != self._login_generation:
+                self.login_stats.num_coalesced_logins += 1
                 return
-            except Exception as e:
-                if "errLoginPwdInvalid" in str(e):
-                    self.failed_login_attempts = self.max_login_attempts
-                    raise RuntimeError("Login failed: Invalid password")
-                self.failed_login_attempts += 1
-                print(e)
-                time.sleep(1)
-        raise RuntimeError("Login failed too many times, exiting")
+            self.failed_login_attempts = 0
+            self.login_backoff.reset()
+            while self.failed_login_attempts < self.max_login_attempts:
+                try:
+                    self.login()
+                    return
+                except Exception as e:
+                    self.login_stats.num_failed_logins += 1
+                    if "errLoginPwdInvalid" in str(e):
+                        self.failed_login_attempts = self.max_login_attempts
+                        raise RuntimeError("Login failed: Invalid password")
+                    self.failed_login_attempts += 1
+                    print(e)
+                    if self.failed_login_attempts < self.max_login_attempts:
+                        time.sleep(self.login_backoff.next_delay())
+            raise RuntimeError("Login failed too many times, exiting")
 
     def login(self):
+        if self.reuse_stored_session():
+            return
+
         print("Authenticating {}/{}".format(self.failed_login_attempts + 1, self.max_login_attempts))
-        modulus = self.get("home_loginInfo", auto_login=False).json()["data"]["modulus"]
+        start = time.time()
+
+        # The switch generates a new key when it reboots, so the modulus is always fetched. Only the slow pure-Python
+        # RSA encryption is skipped while the key stays the same.
+        modulus = self.get_data("home_loginInfo", auto_login=False)["modulus"]
+        if self._enc_pass is None or self._enc_pass[0] != modulus:
+            self._enc_pass = (modulus, encrypt_password(self.password, modulus))
+        enc_pass = self._enc_pass[1]
 
-        key = rsa.PublicKey(n=int(modulus, 16), e=0x10001)
-        encrypted = rsa.encrypt(self.password.encode("ascii"), key)
         try:
-            enc_pass = base64.encodebytes(encrypted)
-        except AttributeError:
-            enc_pass = base64.encodestring(encrypted)
-        enc_pass = enc_pass.replace(b"\n", b"").replace(b"+", b"%2B").replace(b"=", b"%3D")
-        enc_pass = enc_pass.decode("ascii")
-
-        auth_id = self.set('home_loginAuth',
-                           json={"_ds=1&password=" + enc_pass + "&xsrfToken=fa9358fbd291c3bd&_de=1": {}},
-                           auto_login=False).json()["authId"]
-        resp = self.set("home_loginStatus",
-                        json={"_ds=1&authId=" + auth_id + "&xsrfToken=fa9358fbd291c3bd&_de=1": {}},
-                        auto_login=False).json()
-
-        if resp["data"]["status"] != "ok":
-            raise RuntimeError("Login failed: {}".format(resp["data"]))
-        print("Successfully authenticated with session ID " + self.session.cookies["HTTP_SESSID"])
+            auth_id = self.set('home_loginAuth', json=login_auth_payload(enc_pass), auto_login=False).json()["authId"]
+            resp = self.set("home_loginStatus", json=login_status_payload(auth_id), auto_login=False).json()
+            if resp["data"]["status"] != "ok":
+                raise RuntimeError("Login failed: {}".format(resp["data"]))
+        except Exception:
+            self._enc_pass = None
+            raise
+        session_id = self.session.cookies["HTTP_SESSID"]
+        print("Successfully authenticated with session ID " + session_id)
+
+        self._set_logged_in()
+        self.login_stats.num_logins += 1
+        self.login_stats.last_login_duration = time.time() - start
+        self.login_stats.total_login_duration += self.login_stats.last_login_duration
+
+        if self.session_store is not None:
+            self.session_store.save(self.address, session_id)
+
+    def reuse_stored_session(self):
+        """Try to restore the session saved in the session store by a previous process.
+
+        This is only tried once for each backend instance.
+
+        :return: Whether the stored session is still valid and has been restored.
+        :rtype: bool
+        """
+        if self.session_store is None or self._stored_session_checked:
+            return False
+        self._stored_session_checked = True
+
+        stored = self.session_store.load(self.address)
+        if stored is None:
+            return False
 
+        self.session.cookies.set("HTTP_SESSID", stored["session_id"])
+        try:
+            # This raises RuntimeError if the session has expired
+            main_data = self.get("home_main", auto_login=False).json()["data"]
+        except Exception:
+            self.session.cookies.clear()
+            self.session_store.clear(self.address)
+            return False
+
+        print("Reusing stored session ID " + stored["session_id"])
+        self.response_cache.put("home_main", main_data)  # the following get_switch() needs the data
+        self._set_logged_in()
+        self.login_stats.num_reused_sessions += 1
+        return True
+
+    def _set_logged_in(self):
         self.logged_in = True
         self.failed_login_attempts = 0
+        self._login_generation += 1
+
+    def logout(self, forget_session=None):
+        """Log out of the switch or detach from the session.
 
-    def logout(self):
+        :param bool forget_session: Whether to end the session on the switch. If False, the session stays alive and
+                                    stored in the session store, so that the next process (or the next login of this
+                                    backend) reuses it. If None, the session is kept only if there is a session store.
+        """
+        if forget_session is None:
+            forget_session = self.session_store is None
+        if not forget_session:
+            self.logged_in = False
+            self.failed_login_attempts = 0
+            self._stored_session_checked = False
+            print("Detached from the session, it is kept in the session store")
+            return
         self.set("home_logout", data={})
+        if self.session_store is not None:
+            self.session_store.clear(self.address)
         self.logged_in = False
         self.failed_login_attempts = 0
         print("Logged out")
 
     def get_switch(self):
-        switch = Switch()
-
-        main_data = self.get("home_main").json()["data"]
-        switch.first_login = main_data["sys_first_login"] != '0'
-
-        if switch.first_login:
-            raise RuntimeError("Complete the first-time setup before accessing the switch API.")
-
-        capabilities = main_data["capability"]
-        switch.capabilities.ssh = bool(capabilities.get("ssh", False))
-        switch.capabilities.https = bool(capabilities.get("https", False))
-        switch.capabilities.websock = bool(capabilities.get("websock", False))
-        switch.capabilities.debug_img = bool(capabilities.get("debug_img", False))
-        switch.capabilities.mgmt_vlan = bool(capabilities.get("mgmt_vlan", False))
-        switch.capabilities.overheat_protect = bool(capabilities.get("overheat_protect", False))
-
-        switch.model_name = main_data["model_name"]
-        switch.device_name = main_data["sys_dev_name"]
-        switch.firmware_version = main_data["sys_fmw_ver"]
-        switch.firmware_build_date = main_data["sys_bld_date"]
-        switch.max_mtu = 12288 if switch.model_name.startswith("XGS") else 9000
-
-        switch.mac_str = main_data["sys_MAC"].lower()
-        try:
-            switch.mac_bin = bytes.fromhex(switch.mac_str.replace(":", ""))
-        except AttributeError:  # Python 2
-            switch.mac_bin = switch.mac_str.replace(":", "").decode('hex')
-
-        switch.ip_addr = main_data["sys_IP"]
-        switch.ip_subnet = main_data["sys_sbnt_msk"]
-        switch.ip_gateway = main_data["sys_gateway"]
-        switch.dhcp_enabled = main_data["sys_dhcp_state"] != '0'
-
-        switch.description = "Zyxel %s (FW %s) at %s/%s%s" % (
-            switch.model_name, switch.firmware_version, switch.ip_addr, switch.ip_subnet,
-            " (DHCP client)" if switch.dhcp_enabled else "")
-
-        # ABTY.6 firmware renamed Max_port to max_port
-        switch.num_ports = int(get_one_of(main_data, ("Max_port", "max_port")))
-
-        port_data = self.get("port_portInfo").json()["data"]
-
-        for i in range(switch.num_ports):
-            port = Port()
-            port.index = i
-            port.max_speed = port_type_speeds[port_data["portType"][i]]
-            port.name = get_port_name(port_data["portType"], i, short=False)
-            port.short_name = get_port_name(port_data["portType"], i, short=True)
-            port.alias = port.name
-            port.mtu = switch.max_mtu
-            port.is_copper = bool(port_data["isCopper"])
-            port.mac_bin = switch.mac_bin
-            port.mac_str = switch.mac_str
-            port.status = PortStatus()
-            port.status.rx_packets = PacketCounter()
-            port.status.tx_packets = PacketCounter()
-            port.status.enabled = bool((port_data["portState"] >> i) & 1)
-            switch.ports.append(port)
-
-        return switch
+        main_data = self.get_data("home_main")
+        port_data = self.get_data("port_portInfo")
+        return parse_switch(main_data, port_data)
 
     def update_switch_config(self, switch):
-        main_data = self.get("home_main").json()["data"]
-
-        switch.first_login = main_data["sys_first_login"] != '0'
-        switch.device_name = main_data["sys_dev_name"]
-        switch.firmware_version = main_data["sys_fmw_ver"]
-        switch.firmware_build_date = main_data["sys_bld_date"]
-
-        switch.mac_str = main_data["sys_MAC"].lower()
-        switch.mac_bin = bytes.fromhex(switch.mac_str.replace(":", ""))
-
-        switch.ip_addr = main_data["sys_IP"]
-        switch.ip_subnet = main_data["sys_sbnt_msk"]
-        switch.ip_gateway = main_data["sys_gateway"]
-        switch.dhcp_enabled = main_data["sys_dhcp_state"] != '0'
-
-        port_data = self.get("port_portInfo").json()["data"]
-
-        for i in range(switch.num_ports):
-            port = switch.ports[i]
-            port.max_speed = port_type_speeds[port_data["portType"][i]]
-            port.mtu = switch.max_mtu
-            port.mac_bin = switch.mac_bin
-            port.mac_str = switch.mac_str
-            port.status.enabled = bool((port_data["portState"] >> i) & 1)
+        main_data = self.get_data("home_main")
+        port_data = self.get_data("port_portInfo")
+        parse_switch_config(switch, main_data, port_data)
 
     def update_port_states(self, switch):
-        sys_data = self.get("home_systemData").json()["data"]
-        link_data = self.get("home_linkData").json()["data"]
-
-        switch.device_name = sys_data["sys_dev_name"]
-        switch.mac_str = sys_data["sys_MAC"].lower()
-        try:
-            switch.mac_bin = bytes.fromhex(switch.mac_str.replace(":", ""))
-        except AttributeError:  # Python2
-            switch.mac_bin = switch.mac_str.replace(":", "").decode('hex')
-            
-        switch.ip_addr = sys_data["sys_IP"]
-        switch.ip_subnet = sys_data["sys_sbnt_msk"]
-        switch.ip_gateway = sys_data["sys_gateway"]
-        switch.dhcp_enabled = sys_data["sys_dhcp_state"] != '0'
-
-        for i in range(switch.num_ports):
-            port = switch.ports[i]
-            status = port.status
-            assert isinstance(status, PortStatus)
-
-            connected = link_data["portstatus"][i] == "Up"
-
-            if status.connected is None:
-                status.connected = connected
-            elif status.connected != connected:
-                status.last_change_time = time.time()
-            status.connected = connected
-
-            status.speed = if_speeds[link_data["speed"][i]] if status.connected else 0
-            status.loop_detected = sys_data["loop_status"][i] != "Normal"
-
-            if switch.capabilities.overheat_protect:
-                status.overheat_detected = bool(link_data["overheat"][i])
-
-            rx_packets = link_data["Stats"][i][0]
-            tx_packets = link_data["Stats"][i][1]
-            if rx_packets < status.rx_packets.num_unicast_packets or tx_packets < status.tx_packets.num_unicast_packets:
-                status.last_packet_jump_back_time = time.time()
-
-            status.rx_packets.num_unicast_packets = rx_packets
-            status.tx_packets.num_unicast_packets = tx_packets
+        sys_data = self.get_data("home_systemData")
+        link_data = self.get_data("home_linkData")
+        parse_port_states(switch, sys_data, link_data)
+
+    def update_mac_table(self, switch):
+        mac_data = self.get_data(self.mac_table_cmd)
+        return parse_mac_table(switch, mac_data)
+
+    def update_sources(self, switch, sources):
+        changed = set()
+        if "main" in sources and parse_main_info(switch, self.get_data("home_main")):
+            changed.add("main")
+        if "port_info" in sources and parse_port_info(switch, self.get_data("port_portInfo")):
+            changed.add("port_info")
+        if "loop" in sources and parse_system_data(switch, self.get_data("home_systemData")):
+            changed.add("loop")
+        if "link" in sources or "counters" in sources:
+            # Link states and counters share one endpoint
+            link_data = self.get_data("home_linkData")
+            if "link" in sources and parse_link_states(switch, link_data):
+                changed.add("link")
+            if "counters" in sources:
+                changed.add("counters")
+                parse_counters(switch, link_data)
+        return changed
@@ -0,0 +1,368 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Low-level backend of Zyxel (X)GS-1200 series switches receiving the port states over a WebSocket.
+
+Switches with the `websock` capability push the data of `home_linkData` and `home_systemData` over a WebSocket
+instead of answering a request for each poll. The first message of each subscribed command contains its full data, the
+following ones only the changed items. The changes are merged as they arrive, so reading the link states, counters and
+loop status costs no request to the switch. Without the capability, or while the WebSocket is not connected, the data
+are polled over HTTP like by :class:`WebBackend`.
+
+The WebSocket client (RFC 6455) only uses the standard library.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+
+from urllib3.util import parse_url
+
+from .resilience import Backoff
+from .web_backend import WebBackend, json_loads
+
+__all__ = ['WebSocketBackend', 'accept_key', 'decode_frame', 'encode_frame', 'merge_update', 'pushed_commands']
+
+
+pushed_commands = ("home_linkData", "home_systemData")
+"""Commands whose data are pushed by the switch over the WebSocket."""
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+_websocket_guid = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def accept_key(key):
+    """Compute the `Sec-WebSocket-Accept` header of the handshake response.
+
+    :param str key: The `Sec-WebSocket-Key` header of the handshake request.
+    :rtype: str
+    """
+    return base64.b64encode(hashlib.sha1(key.encode("ascii") + _websocket_guid).digest()).decode("ascii")
+
+
+def encode_frame(opcode, payload, mask=True):
+    """Encode a single (final) WebSocket frame.
+
+    :param int opcode: The opcode (e.g. :data:`OP_TEXT`).
+    :param bytes payload: The payload.
+    :param bool mask: Whether to mask the payload (required for frames sent by clients).
+    :rtype: bytes
+    """
+    length = len(payload)
+    mask_bit = 0x80 if mask else 0
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, mask_bit | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, mask_bit | 127, length)
+    if not mask:
+        return header + payload
+    key = os.urandom(4)
+    return header + key + _apply_mask(key, payload)
+
+
+def _apply_mask(key, payload):
+    key = bytearray(key)
+    data = bytearray(payload)
+    for i in range(len(data)):
+        data[i] ^= key[i & 3]
+    return bytes(data)
+
+
+def decode_frame(read):
+    """Read one WebSocket message. Fragmented messages are joined.
+
+    :param read: Function returning exactly the given number of bytes (or raising an exception).
+    :type read: callable
+    :return: Tuple (opcode, payload).
+    :rtype: tuple
+    """
+    payload = b""
+    opcode = None
+    while True:
+        first, second = struct.unpack("!BB", read(2))
+        length = second & 0x7f
+        if length == 126:
+            length = struct.unpack("!H", read(2))[0]
+        elif length == 127:
+            length = struct.unpack("!Q", read(8))[0]
+        key = read(4) if second & 0x80 else None
+        data = read(length) if length > 0 else b""
+        if key is not None:
+            data = _apply_mask(key, data)
+        frame_opcode = first & 0x0f
+        if frame_opcode >= OP_CLOSE:
+            # Control frames can come in the middle of a fragmented message
+            return frame_opcode, data
+        if frame_opcode != OP_CONTINUATION:
+            opcode = frame_opcode
+        payload += data
+        if first & 0x80:
+            return opcode, payload
+
+
+def merge_update(data, update):
+    """Merge an incremental update into the data of a command.
+
+    :param dict data: The data of the command (modified in place).
+    :param dict update: The changes. Keys are the keys of the data. Values are either dicts mapping indices of list
+                        items (as strings) to their new values, or new values of the whole keys.
+    :return: The changed keys.
+    :rtype: set
+    """
+    for key, changes in update.items():
+        if isinstance(changes, dict) and isinstance(data.get(key), list):
+            items = list(data[key])  # readers hold the previous list
+            for index, value in changes.items():
+                items[int(index)] = value
+            data[key] = items
+        else:
+            data[key] = changes
+    return set(update)
+
+
+class WebSocketBackend(WebBackend):
+    """Low-level backend of Zyxel (X)GS-1200 series switches receiving the port states over a WebSocket.
+
+    The WebSocket is connected by the first update after :meth:`get_switch` has found the `websock` capability. When
+    it disconnects, the data are polled until a reconnect succeeds. Reconnects are delayed by an exponential backoff.
+    """
+
+    websocket_path = "ws"
+    """Path of the WebSocket endpoint relative to the address of the switch."""
+
+    def __init__(self, address, password, max_login_attempts=3, session_store=None, instrumentation=None,
+                 request_timeout=10.0, response_ttl=0.0, on_update=None):
+        """
+        :param str address: The HTTP(S) address of the switch API.
+        :param str password: Password for the switch administration.
+        :param int max_login_attempts: Maximum number of login retries before an exception is raised.
+        :param SessionStore session_store: If set, the session is stored in this store after login and the next login
+                                           first tries to reuse the stored session.
+        :param Instrumentation instrumentation: If set, latencies of the HTTP requests, connects of the WebSocket
+                                                (`ws.connect`) and received updates (`ws.update`) are recorded here.
+        :param float request_timeout: Timeout of a single request or of the WebSocket handshake (in seconds).
+        :param float response_ttl: How long the polled data are reused by further calls (in seconds). The pushed data
+                                   are always current.
+        :param on_update: If set, it is called with the name of the command after each pushed update (from the
+                          receiving thread), e.g. to process a link change right away.
+        :type on_update: callable
+        """
+        super(WebSocketBackend, self).__init__(address, password, max_login_attempts, session_store, instrumentation,
+                                               request_timeout, response_ttl)
+        self.on_update = on_update
+        self.websock = False
+        """Whether the switch has the `websock` capability (known after :meth:`get_switch`)."""
+        self.reconnect_backoff = Backoff(initial=1.0, maximum=60.0)
+        """Delays between the connection attempts of the WebSocket."""
+        self.num_updates = 0
+        """Number of received updates."""
+        self.num_connects = 0
+        """Number of successful connects of the WebSocket."""
+        self.num_polled_fallbacks = 0
+        """Number of reads of the pushed commands that had to be polled because the WebSocket was not connected."""
+
+        self._socket = None
+        self._data = {}  # command -> data merged from the updates
+        self._data_lock = threading.Condition()
+        self._next_connect_time = 0.0
+        self._connect_lock = threading.Lock()
+
+    @property
+    def connected(self):
+        """Whether the WebSocket is connected and the pushed data are available."""
+        return self._socket is not None and len(self._data) == len(pushed_commands)
+
+    def get_switch(self):
+        switch = super(WebSocketBackend, self).get_switch()
+        self.websock = switch.capabilities.websock
+        return switch
+
+    def get_data(self, cmd, *args, **kwargs):
+        if cmd in pushed_commands and self.websock:
+            if not self.connected:
+                self.connect()
+            with self._data_lock:
+                data = self._data.get(cmd)
+                if data is not None:
+                    # Shallow copy, the merged updates replace whole lists
+                    return dict(data)
+            self.num_polled_fallbacks += 1
+        return super(WebSocketBackend, self).get_data(cmd, *args, **kwargs)
+
+    def connect(self):
+        """Connect the WebSocket and subscribe to the pushed commands, unless the previous attempt failed recently.
+
+        Errors are not raised, the data are polled instead.
+
+        :return: Whether the WebSocket is connected.
+        :rtype: bool
+        """
+        with self._connect_lock:
+            if self.connected or time.time() < self._next_connect_time:
+                return self.connected
+            start = time.time()
+            try:
+                self._connect()
+            except Exception as e:
+                self._disconnect()
+                self._next_connect_time = time.time() + self.reconnect_backoff.next_delay()
+                print("WebSocket connection to %s failed: %s" % (self.address, e))
+                if self.instrumentation is not None:
+                    self.instrumentation.observe("ws.connect", time.time() - start, True)
+                return False
+            self.reconnect_backoff.reset()
+            self.num_connects += 1
+            if self.instrumentation is not None:
+                self.instrumentation.observe("ws.connect", time.time() - start)
+            return True
+
+    def _connect(self):
+        if not self.logged_in:
+            self.auto_login()
+        url = parse_url(self.address)
+        secure = url.scheme == "https"
+        port = url.port or (443 if secure else 80)
+        sock = socket.create_connection((url.host, port), self.request_timeout)
+        if secure:
+            context = ssl.create_default_context()
+            if not self.session.verify:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            sock = context.wrap_socket(sock, server_hostname=url.host)
+        self._socket = sock
+
+        key = base64.b64encode(os.urandom(16)).decode("ascii")
+        path = (url.path or "").rstrip("/") + "/" + self.websocket_path
+        request = "\r\n".join((
+            "GET %s HTTP/1.1" % (path,),
+            "Host: %s:%i" % (url.host, port),
+            "Upgrade: websocket",
+            "Connection: Upgrade",
+            "Sec-WebSocket-Key: " + key,
+            "Sec-WebSocket-Version: 13",
+            "Cookie: HTTP_SESSID=" + self.session.cookies.get("HTTP_SESSID", ""),
+            "", ""))
+        sock.sendall(request.encode("ascii"))
+
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = sock.recv(4096)
+            if len(chunk) == 0:
+                raise RuntimeError("Connection closed during the WebSocket handshake")
+            response += chunk
+        head, _, rest = response.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        if lines[0].split(" ")[1:2] != ["101"]:
+            raise RuntimeError("WebSocket handshake failed: " + lines[0])
+        headers = dict((k.strip().lower(), v.strip()) for k, _, v in (line.partition(":") for line in lines[1:]))
+        if headers.get("sec-websocket-accept") != accept_key(key):
+            raise RuntimeError("WebSocket handshake failed: wrong Sec-WebSocket-Accept")
+
+        with self._data_lock:
+            self._data = {}
+        sock.sendall(encode_frame(OP_TEXT, json.dumps({"cmd": "subscribe", "topics": list(pushed_commands)})
+                                  .encode("utf8")))
+        sock.settimeout(None)
+        thread = threading.Thread(target=self._receive, args=(sock, rest))
+        thread.daemon = True
+        thread.start()
+
+        # The first message of each command contains its full data
+        deadline = time.time() + self.request_timeout
+        with self._data_lock:
+            while len(self._data) < len(pushed_commands) and self._socket is sock and time.time() < deadline:
+                self._data_lock.wait(deadline - time.time())
+        if self._socket is not sock or len(self._data) < len(pushed_commands):
+            raise RuntimeError("The switch did not send the subscribed data")
+
+    def _receive(self, sock, buffered):
+        buffer = [buffered]
+
+        def read(n):
+            data = buffer[0]
+            while len(data) < n:
+                chunk = sock.recv(max(n - len(data), 4096))
+                if len(chunk) == 0:
+                    raise EOFError()
+                data += chunk
+            buffer[0] = data[n:]
+            return data[:n]
+
+        try:
+            while self._socket is sock:
+                opcode, payload = decode_frame(read)
+                if opcode == OP_TEXT:
+                    self._process(json_loads(payload))
+                elif opcode == OP_PING:
+                    sock.sendall(encode_frame(OP_PONG, payload))
+                elif opcode == OP_CLOSE:
+                    break
+        except Exception as e:
+            if self._socket is sock:
+                print("WebSocket connection to %s lost: %s" % (self.address, e if str(e) else type(e).__name__))
+        self._disconnect(sock)
+
+    def _process(self, message):
+        start = time.time()
+        if "logout" in message:
+            # The session expired, the next request logs in again
+            self.logged_in = False
+            raise RuntimeError("Authentication session has expired")
+        cmd = message["cmd"]
+        with self._data_lock:
+            if "data" in message:
+                self._data[cmd] = message["data"]
+            elif cmd in self._data:
+                merge_update(self._data[cmd], message["update"])
+            self._data_lock.notify_all()
+        self.num_updates += 1
+        if self.instrumentation is not None:
+            self.instrumentation.observe("ws.update", time.time() - start)
+        if self.on_update is not None:
+            self.on_update(cmd)
+
+    def _disconnect(self, sock=None):
+        """Close the WebSocket and forget the pushed data.
+
+        :param socket.socket sock: If set, the WebSocket is only closed if it is still this socket.
+        """
+        with self._data_lock:
+            if sock is not None and self._socket is not sock:
+                return
+            sock = self._socket
+            self._socket = None
+            self._data = {}
+            self._data_lock.notify_all()
+        if sock is not None:
+            try:
+                sock.sendall(encode_frame(OP_CLOSE, b""))
+            except Exception:
+                pass
+            sock.close()
+
+    def close(self):
+        """Close the WebSocket (the data are polled until it is connected again)."""
+        with self._connect_lock:
+            self._disconnect()
+
+    def logout(self, forget_session=None):
+        self.close()
+        super(WebSocketBackend, self).logout(forget_session)
+
+    def __str__(self):
+        return "websocket %s, connects %i, updates %i, polled fallbacks %i" % (
+            "connected" if self.connected else ("disconnected" if self.websock else "not supported"),
+            self.num_connects, self.num_updates, self.num_polled_fallbacks)
@@ -0,0 +1,34 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Tests of the cache of switch responses."""
+
+import unittest
+
+from zyxel_gs1200_api.response_cache import ResponseCache
+
+
+class TestPut(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = ResponseCache(ttl=0.0, put_ttl=1.0, clock=lambda: self.now)
+
+    def test_put_is_used_once(self):
+        self.cache.put("a", 1)
+        self.assertEqual(self.cache.get("a", lambda: 2), 1)
+        self.assertEqual(self.cache.get("a", lambda: 3), 3)
+
+    def test_put_expires(self):
+        self.cache.put("a", 1)
+        self.now = 60.0
+        self.assertEqual(self.cache.get("a", lambda: 2), 2)
+
+    def test_put_invalidated(self):
+        self.cache.put("a", 1)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get("a", lambda: 2), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Tests of the adaptive scheduling of polls."""
+
+import time
+import unittest
+
+from zyxel_gs1200_api import ZyxelAPI
+from zyxel_gs1200_api.counters import CounterEngine
+from zyxel_gs1200_api.emulator import EmulatorServer
+from zyxel_gs1200_api.scheduler import PollScheduler
+
+
+class TestRatesChanged(unittest.TestCase):
+
+    def test_thresholds(self):
+        scheduler = PollScheduler()
+        self.assertTrue(scheduler.rates_changed([(1000.0, 0.0), (0.0, 0.0)]))
+        self.assertFalse(scheduler.rates_changed([(1100.0, 0.0), (5.0, 0.0)]))
+        self.assertFalse(scheduler.rates_changed([(1150.0, 0.0), (0.0, 0.0)]))
+        self.assertTrue(scheduler.rates_changed([(1300.0, 0.0), (0.0, 0.0)]))
+        self.assertTrue(scheduler.rates_changed([(1300.0, 1e6), (0.0, 0.0)]))
+
+
+class TestCounterSchedule(unittest.TestCase):
+
+    def test_traffic_drop_speeds_up_polls(self):
+        with EmulatorServer(1, password="pw", key_bits=512) as server:
+            api = ZyxelAPI(server.addresses[0], "pw", counter_engine=CounterEngine(windows=(0.5,)))
+            switch = api.get_switch()
+            scheduler = PollScheduler({"counters": (0.1, 1.0)}, jitter=0.0)
+            source = scheduler.sources["counters"]
+
+            def poll_until_change(num_polls):
+                for _ in range(num_polls):
+                    time.sleep(0.1)
+                    if "counters" in api.update_scheduled(switch, scheduler, ("counters",))[1]:
+                        return True
+                return False
+
+            for _ in range(2):
+                poll_until_change(1)  # the first samples have no rates yet
+            self.assertFalse(poll_until_change(15))  # steady traffic backs off the interval
+            self.assertEqual(source.interval, source.max_interval)
+            virtual_switch, _ = server.switches[0]
+            virtual_switch._pps = [[0, 0] for _ in range(virtual_switch.num_ports)]
+            self.assertTrue(poll_until_change(10))
+            self.assertLess(source.interval, source.max_interval)
+
+
+if __name__ == '__main__':
+    unittest.main()
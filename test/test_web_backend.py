@@ -0,0 +1,62 @@
+# SPDX-License-Identifier: BSD-3-Clause
+# SPDX-FileCopyrightText: Czech Technical University in Prague
+
+"""Tests of the login and session handling of the web backend against the emulated switch."""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from zyxel_gs1200_api import ZyxelAPI
+from zyxel_gs1200_api.emulator import EmulatorServer
+from zyxel_gs1200_api.session_store import SessionStore
+
+
+class TestLogin(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.server = EmulatorServer(1, password="pw", key_bits=512).start()
+
+    def tearDown(self):
+        self.server.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def reboot(self):
+        """Restart the emulated switch on the same port, so it forgets its sessions and generates a new key."""
+        port = self.server.port
+        self.server.stop()
+        self.server = EmulatorServer(1, port=port, password="pw", key_bits=512).start()
+
+    def test_relogin_after_reboot(self):
+        api = ZyxelAPI(self.server.addresses[0], "pw")
+        switch = api.get_switch()
+        self.reboot()
+        api.update_port_states(switch)
+        _, sessions = self.server.switches[0]
+        self.assertEqual(sessions.num_logins, 1)
+        self.assertEqual(sessions.num_rejected_logins, 0)
+
+    def test_stored_session_after_reboot(self):
+        store = SessionStore(os.path.join(self.tmp_dir, "sessions.json"))
+        with ZyxelAPI(self.server.addresses[0], "pw", session_store=store) as api:
+            api.get_switch()
+        self.reboot()
+        with ZyxelAPI(self.server.addresses[0], "pw", session_store=store) as api:
+            api.get_switch()
+        _, sessions = self.server.switches[0]
+        self.assertEqual(sessions.num_logins, 1)
+        self.assertEqual(sessions.num_rejected_logins, 0)
+
+    def test_stored_session_reused(self):
+        store = SessionStore(os.path.join(self.tmp_dir, "sessions.json"))
+        for _ in range(2):
+            with ZyxelAPI(self.server.addresses[0], "pw", session_store=store) as api:
+                api.get_switch()
+        _, sessions = self.server.switches[0]
+        self.assertEqual(sessions.num_logins, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()